@@ -13,9 +13,11 @@ This application provides a graphical interface to:
 import os
 import sys
 import logging
+import multiprocessing
 from pathlib import Path
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon
+from PySide6.QtCore import QTimer
 
 # Setup logging
 logging.basicConfig(
@@ -24,11 +26,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Import main application class
+# Import main application class; the processing modules it needs are loaded
+# after the window is shown
 from src.ui.main_window import ExcelProcessorApp
+from src.ui.startup import start_warmup
 
 def main():
     """Main function that initializes and runs the application."""
+    # Worker processes of a frozen executable must not start another window
+    multiprocessing.freeze_support()
+    
     # Make sure we're in the right directory for file operations
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
@@ -54,6 +61,10 @@ def main():
     window = ExcelProcessorApp()
     window.show()
     
+    # Load pandas, openpyxl and the processing modules in the background once
+    # the event loop has painted the window
+    QTimer.singleShot(0, start_warmup)
+    
     # Start the application event loop
     sys.exit(app.exec())
 
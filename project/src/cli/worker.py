@@ -5,9 +5,11 @@
 Worker module for handling Excel and CSV file operations.
 
 This module provides the main process flow by:
-1. Importing xlsx files from the source directory
-2. Reading unique stores from a CSV file in the stores directory
-3. For each store in stores.csv, finding matching columns in xlsx
+1. Importing the xlsx files matching the input patterns, by default every
+   workbook in the source directory
+2. Reading unique stores from one or more stores CSV files, by default
+   stores/stores.csv
+3. For each store in the stores files, finding matching columns in xlsx
 4. Creating new Excel files for each store containing:
    - The store-specific column
    - EANCode column
@@ -15,18 +17,37 @@ This module provides the main process flow by:
 5. Within each store file, creating separate sheets for each distinct SEASON value
 6. Creating TXT files for each store-season combination with repeated EANCode values
    based on the quantity value in the store's column
+
+Every workbook is processed for every stores file, concurrently with --jobs, and
+each workbook is parsed once for all of its stores files.
 """
 
 import sys
 import os
+import argparse
 import logging
-import pandas as pd
 from pathlib import Path
-from functions import (
-    load_xlsx_file,
-    get_xlsx_files_from_source,
-    read_stores_csv
+from typing import Dict, List, Optional
+from src.core.utils.file_utils import (
+    load_allocation_sheet,
+    find_xlsx_files,
+    read_stores_csv,
+    DEFAULT_STORES_FILE
+)
+from src.core.processors.store_processor import (
+    check_label_options,
+    EXCEL_WRITERS,
+    DEFAULT_EXCEL_WRITER
 )
+from src.core.processors.allocation_engine import process_all_stores, AllocationSheet, STATUS_FAILED
+from src.core.processors.streaming_engine import process_workbook_streaming, DEFAULT_CHUNK_ROWS
+from src.core.processors.batch_runner import BatchJob, plan_batch_jobs, run_batch_jobs
+from src.core.utils.instrumentation import RunRecorder, recording, span, format_report_table, write_report
+from src.core.utils.output_shards import ShardLimits
+from src.core.utils.label_formats import LABEL_FORMATS, DEFAULT_LABEL_FORMAT
+from src.core.utils.output_pipeline import DEFAULT_WRITER_THREADS
+from src.core.utils.profiling import RunProfiler
+from src.core.utils.xlsx_reader import UnsupportedWorkbookError
 
 
 # Configure logging
@@ -36,218 +57,295 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_INPUT_PATTERN = 'source/*.xlsx'
+DEFAULT_OUTPUT_DIR = Path('output')
+
 
-def find_store_column(df: pd.DataFrame, store_name: str) -> str:
+def parse_args(argv=None) -> argparse.Namespace:
     """
-    Find the column in the DataFrame that exactly matches the store name.
+    Parse the command-line arguments.
     
     Args:
-        df (pd.DataFrame): DataFrame to search in
-        store_name (str): Store name to find
+        argv (list, optional): Arguments to parse (default: sys.argv[1:])
     
     Returns:
-        str: Matching column name or None if not found
+        argparse.Namespace: Parsed arguments
     """
-    for col in df.columns:
-        if col == store_name:
-            return col
+    parser = argparse.ArgumentParser(
+        description="Create store-specific Excel and TXT files from PRE ALLOCATION workbooks."
+    )
+    parser.add_argument(
+        "inputs", nargs="*", metavar="WORKBOOK",
+        help=f"workbooks, directories or glob patterns such as 'source/**/*.xlsx' "
+             f"(default: {DEFAULT_INPUT_PATTERN})"
+    )
+    parser.add_argument(
+        "--stores", type=Path, action="append", metavar="CSV",
+        help=f"stores file to process every workbook for; repeat it for several stores lists "
+             f"(default: {DEFAULT_STORES_FILE})"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=DEFAULT_OUTPUT_DIR,
+        help="output root directory; with several workbooks or stores files every combination "
+             "is written to a <workbook>/<stores> subdirectory (default: output)"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="number of workbooks loaded and workbook/stores combinations processed at the same "
+             "time (0 uses all CPU cores)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="number of worker processes used to write the store files (0 uses all CPU cores)"
+    )
+    parser.add_argument(
+        "--writer-threads", type=int, default=DEFAULT_WRITER_THREADS,
+        help="threads writing the store files while the next stores are prepared, with a single "
+             f"worker (0 writes them in order; default: {DEFAULT_WRITER_THREADS})"
+    )
+    parser.add_argument(
+        "--excel-writer", choices=EXCEL_WRITERS, default=DEFAULT_EXCEL_WRITER,
+        help="write the store workbooks row by row ('streaming') or with pd.ExcelWriter ('pandas')"
+    )
+    parser.add_argument(
+        "--report", type=Path,
+        help="write a JSON run report with per-phase timings to this file"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only regenerate the stores whose data changed since the last incremental run"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue the last interrupted run, skipping the stores it completed"
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="read the workbook in chunks of rows so that memory does not grow with its size "
+             "(not with --resume, --incremental or --workers)"
+    )
+    parser.add_argument(
+        "--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+        help=f"rows per chunk in streaming mode (default: {DEFAULT_CHUNK_ROWS})"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="profile the run and save a .prof file and collapsed stacks to the output directory"
+    )
+    parser.add_argument(
+        "--max-txt-lines", type=int,
+        help="split TXT files with more lines than this into '-partNN' files"
+    )
+    parser.add_argument(
+        "--max-sheet-rows", type=int,
+        help="split store workbooks with more rows than this into '-partNN' workbooks"
+    )
+    parser.add_argument(
+        "--label-format", choices=LABEL_FORMATS, default=DEFAULT_LABEL_FORMAT,
+        help="format of the per-season label files: repeated EANCode lines ('txt'), 'EAN,qty' "
+             "lines ('csv'), compressed TXT ('gzip', 'zstd') or packed EAN/qty records ('binary'); "
+             "expand them with python -m src.core.utils.label_formats"
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error(f"--workers must be 0 or more, got {args.workers}")
+    if args.writer_threads < 0:
+        parser.error(f"--writer-threads must be 0 or more, got {args.writer_threads}")
+    if args.jobs < 0:
+        parser.error(f"--jobs must be 0 or more, got {args.jobs}")
+    if args.chunk_rows < 1:
+        parser.error(f"--chunk-rows must be 1 or more, got {args.chunk_rows}")
+    if args.stream:
+        # Streaming mode writes the stores in this process and regenerates all of them
+        ignored = [option for option, used in (("--resume", args.resume), ("--incremental", args.incremental),
+                                               ("--workers", args.workers != 1)) if used]
+        if ignored:
+            parser.error(f"--stream cannot be combined with {', '.join(ignored)}")
+    args.inputs = args.inputs or [DEFAULT_INPUT_PATTERN]
+    args.stores = args.stores or [DEFAULT_STORES_FILE]
+    try:
+        args.limits = ShardLimits(max_lines=args.max_txt_lines, max_rows=args.max_sheet_rows)
+        check_label_options(args.label_format, args.limits)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def load_workbook(file_path: Path, store_names: List[str]) -> Optional[AllocationSheet]:
+    """
+    Load the PRE ALLOCATION sheet of a workbook, keeping only the columns needed
+    for the stores.
+    
+    Args:
+        file_path (Path): Path to the xlsx file
+        store_names (List[str]): Stores of all the stores files
     
-    # If exact match not found, try to find a column containing the store name
-    for col in df.columns:
-        if isinstance(col, str) and store_name in col:
-            return col
+    Returns:
+        Optional[AllocationSheet]: Sheet loaded as an allocation matrix (or a
+            DataFrame when the matrix cannot represent it), None if loading failed
+    """
+    logger.info(f"Processing file: {file_path}")
+    with span('load'):
+        xlsx_df = load_allocation_sheet(file_path, store_names=store_names)
+    if xlsx_df is None:
+        logger.error(f"Failed to load Excel file {file_path}")
+        return None
     
-    return None
+    # Log the columns to help with troubleshooting
+    logger.info(f"Available columns in {file_path.name}: {', '.join(str(col) for col in xlsx_df.columns)}")
+    return xlsx_df
 
 
-def create_txt_file_with_repeated_eancodes(df: pd.DataFrame, ean_col: str, store_col: str, output_path: Path) -> None:
+def report_job(job: BatchJob, statuses: Dict[str, str]) -> bool:
     """
-    Create a text file with repeated EANCode values based on quantity values.
+    Log the result of a job.
     
     Args:
-        df (pd.DataFrame): DataFrame containing the data
-        ean_col (str): Name of the EANCode column
-        store_col (str): Name of the store column containing quantity values
-        output_path (Path): Path to save the output text file
-    """
-    try:
-        with open(output_path, 'w') as f:
-            # For each row in the DataFrame
-            for _, row in df.iterrows():
-                # Clean and format the EANCode: remove .0 suffix if present
-                eancode = str(row[ean_col]).strip()
-                if eancode.endswith('.0'):
-                    eancode = eancode[:-2]
-                
-                # Try to get the quantity as an integer
-                try:
-                    # Handle possible non-numeric or NaN values
-                    qty = row[store_col]
-                    
-                    # Handle blank spaces as zero
-                    if pd.isna(qty) or (isinstance(qty, str) and qty.strip() in ['', ' ', '  ']):
-                        qty = 0
-                    else:
-                        qty = int(float(qty))
-                    
-                    # Write the EANCode repeated qty times
-                    for _ in range(qty):
-                        f.write(f"{eancode}\n")
-                except (ValueError, TypeError):
-                    # If conversion fails, log a warning and continue
-                    logger.warning(f"Could not convert quantity '{row[store_col]}' to integer for EANCode {eancode}")
-                    continue
-        
-        logger.info(f"Created TXT file with repeated EANCodes: {output_path}")
-    except Exception as e:
-        logger.error(f"Error creating TXT file {output_path}: {e}")
-
-
-def process_store(store_name: str, xlsx_df: pd.DataFrame, output_dir: Path) -> None:
+        job (BatchJob): Workbook, stores and output directory of the job
+        statuses (Dict[str, str]): Mapping of store name to its processing status
+    
+    Returns:
+        bool: True if no store failed
     """
-    Process a single store by finding matching column in the xlsx data,
-    extracting EANCode and SEASON data for that store, and creating sheets
-    for each distinct SEASON value in a new Excel file.
+    failed_stores = [store_name for store_name, status in statuses.items() if status == STATUS_FAILED]
+    if failed_stores:
+        logger.error(f"Processing {job.workbook.name} for {job.stores_file} finished with errors: "
+                     f"{len(failed_stores)} stores could not be written: {', '.join(failed_stores)}")
+        return False
     
-    Also creates TXT files for each store-season combination with repeated
-    EANCode values based on the quantity value in the store's column.
+    logger.info(f"Saved the store files of {job.workbook.name} for {job.stores_file} to {job.output_dir}")
+    return True
+
+
+def process_job(job: BatchJob, xlsx_df: Optional[AllocationSheet], args: argparse.Namespace) -> bool:
+    """
+    Write the store files of one workbook for the stores of one stores file.
     
     Args:
-        store_name (str): Name of the store to search for
-        xlsx_df (pd.DataFrame): DataFrame containing the Excel data
-        output_dir (Path): Directory to save the output file
+        job (BatchJob): Workbook, stores and output directory of the job
+        xlsx_df (Optional[AllocationSheet]): Shared sheet of the workbook, or None in
+            streaming mode
+        args (argparse.Namespace): Parsed command-line arguments
+    
+    Returns:
+        bool: True if every store was written
     """
-    # Find column containing the store name
-    store_col = find_store_column(xlsx_df, store_name)
-    
-    if store_col:
-        logger.info(f"Found column matching store '{store_name}': {store_col}")
-        
-        # Identify EANCode and SEASON columns
-        ean_col = None
-        season_col = None
-        
-        for col in xlsx_df.columns:
-            if isinstance(col, str):
-                if 'EANCode' in col:
-                    ean_col = col
-                elif 'SEASON' in col:
-                    season_col = col
-        
-        if not ean_col or not season_col:
-            logger.warning(f"Could not find EANCode or SEASON columns for store {store_name}")
-            return
-        
-        # Create a dataframe with the required columns
-        result_columns = [ean_col, season_col, store_col]
-        result_df = xlsx_df[result_columns].copy()
-        
-        # Filter rows where the store column has a value
-        filtered_df = result_df[result_df[store_col].notna()]
-        
-        # If we have data, create an Excel file with separate sheets for each SEASON
-        if not filtered_df.empty:
-            # Create valid filename from store name (replace invalid characters)
-            valid_filename = store_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
-            excel_file_path = output_dir / f"{valid_filename}.xlsx"
-            
-            # Get unique SEASON values
-            unique_seasons = filtered_df[season_col].dropna().unique()
-            logger.info(f"Found {len(unique_seasons)} unique SEASON values for store {store_name}")
-            
-            try:
-                # Create a Pandas ExcelWriter
-                with pd.ExcelWriter(excel_file_path, engine='openpyxl') as writer:
-                    # First, save all data to a sheet named 'ALL_SEASONS'
-                    filtered_df.to_excel(writer, sheet_name='ALL_SEASONS', index=False)
-                    
-                    # Then create a sheet for each unique SEASON
-                    for season in unique_seasons:
-                        # Filter rows for this SEASON
-                        season_df = filtered_df[filtered_df[season_col] == season]
-                        
-                        # Convert season to a valid sheet name if needed
-                        sheet_name = str(season)
-                        if len(sheet_name) > 31:  # Excel has a 31 character limit for sheet names
-                            sheet_name = sheet_name[:31]
-                        
-                        # Replace any characters that aren't allowed in Excel sheet names
-                        invalid_chars = [':', '\\', '/', '?', '*', '[', ']']
-                        for char in invalid_chars:
-                            sheet_name = sheet_name.replace(char, '_')
-                        
-                        # Save this season's data to its own sheet
-                        season_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                        logger.info(f"Added sheet '{sheet_name}' with {len(season_df)} rows")
-                        
-                        # Create TXT file with repeated EANCodes for this store-season combination
-                        season_str = str(season).replace(' ', '_').replace('.', '_')
-                        txt_filename = f"{valid_filename}-{season_str}.txt"
-                        txt_file_path = output_dir / txt_filename
-                        
-                        # Create the TXT file with repeated EANCodes
-                        create_txt_file_with_repeated_eancodes(
-                            season_df, ean_col, store_col, txt_file_path
-                        )
-                
-                logger.info(f"Saved data for store {store_name} to {excel_file_path} with {len(unique_seasons)} season sheets")
-            except PermissionError:
-                logger.error(f"Permission denied when writing to file {excel_file_path}. The file may be open in another program.")
-            except Exception as e:
-                logger.error(f"Error saving data for store {store_name}: {e}")
-        else:
-            logger.warning(f"Store '{store_name}' found, but no data available")
-    else:
-        logger.warning(f"Store '{store_name}' not found in xlsx column headers")
+    job.output_dir.mkdir(parents=True, exist_ok=True)
+    store_names = list(job.store_names)
+    
+    if xlsx_df is None:
+        try:
+            statuses = process_workbook_streaming(job.workbook, store_names, job.output_dir,
+                                                  chunk_rows=args.chunk_rows, limits=args.limits,
+                                                  label_format=args.label_format)
+            return report_job(job, statuses)
+        except UnsupportedWorkbookError as e:
+            logger.warning(f"Cannot stream {job.workbook} ({e}), loading the whole sheet instead")
+            xlsx_df = load_workbook(job.workbook, store_names)
+            if xlsx_df is None:
+                return False
+    
+    logger.info(f"Processing {len(store_names)} stores of {job.stores_file} for {job.workbook.name}...")
+    statuses = process_all_stores(
+        store_names, xlsx_df, job.output_dir,
+        workers=args.workers, excel_writer=args.excel_writer, incremental=args.incremental,
+        limits=args.limits, label_format=args.label_format, writer_threads=args.writer_threads,
+        journal=True, resume=args.resume
+    )
+    return report_job(job, statuses)
 
 
-def main():
-    """Main function to execute all tasks."""
-    # Step 1: Get all xlsx files from source directory
-    xlsx_files = get_xlsx_files_from_source()
+def run(args: argparse.Namespace) -> bool:
+    """
+    Process every workbook matching the inputs for the stores of every stores file.
+    
+    Args:
+        args (argparse.Namespace): Parsed command-line arguments
+    
+    Returns:
+        bool: True if every workbook was processed for every stores file
+    """
+    # Step 1: Find the workbooks to process
+    xlsx_files = find_xlsx_files(args.inputs)
     
     if not xlsx_files:
-        logger.error("No xlsx files found in source directory. Exiting.")
-        return
+        logger.error(f"No xlsx files found for {', '.join(args.inputs)}. Exiting.")
+        return False
     
-    # Step 2: Read unique stores from CSV
-    stores_df = read_stores_csv()
-    if stores_df is None:
-        logger.error("Failed to load stores data. Exiting.")
-        return
+    # Step 2: Read unique stores from every stores file
+    store_lists = {}
+    for stores_file in args.stores:
+        stores_df = read_stores_csv(stores_file)
+        if stores_df is None:
+            logger.error(f"Failed to load stores data from {stores_file}. Exiting.")
+            return False
+        logger.info(f"Stores data loaded successfully from {stores_file} with {len(stores_df)} unique stores")
+        store_lists[stores_file] = stores_df['store_name'].tolist()
     
-    logger.info(f"Stores data loaded successfully with {len(stores_df)} unique stores")
+    jobs = plan_batch_jobs(xlsx_files, store_lists, args.output)
+    logger.info(f"Processing {len(xlsx_files)} workbooks for {len(store_lists)} stores files "
+                f"({len(jobs)} combinations, {args.jobs} at a time)")
     
-    # Create output directory if it doesn't exist
-    output_dir = Path('output')
-    if not output_dir.exists():
-        output_dir.mkdir()
-        logger.info(f"Created output directory: {output_dir}")
+    # Streaming mode reads every workbook chunk by chunk in its own jobs
+    results = run_batch_jobs(
+        jobs, lambda job, xlsx_df: process_job(job, xlsx_df, args),
+        load_workbook=None if args.stream else load_workbook,
+        parallel=args.jobs
+    )
     
-    # Process the first (or only) xlsx file
-    file_path = xlsx_files[0]
-    logger.info(f"Processing file: {file_path}")
+    failed_jobs = [job for job, succeeded in results.items() if not succeeded]
+    if failed_jobs:
+        logger.error(f"Processing finished with errors in {len(failed_jobs)} of {len(jobs)} combinations:")
+        for job in failed_jobs:
+            logger.error(f"  {job.workbook} for {job.stores_file}")
+        return False
     
-    # Load the xlsx file (specifically the "PRE ALLOCATION" sheet)
-    xlsx_df = load_xlsx_file(file_path)
-    if xlsx_df is None:
-        logger.error(f"Failed to load Excel file. Exiting.")
-        return
+    logger.info("Processing completed successfully")
+    print(f"All store files have been saved to the '{args.output}' directory")
+    return True
+
+
+def main(argv=None) -> int:
+    """
+    Main function to execute all tasks.
     
-    # Print columns to help with troubleshooting
-    logger.info("Available columns in the Excel file:")
-    for col in xlsx_df.columns:
-        print(f"Column: {col}")
+    Args:
+        argv (list, optional): Command-line arguments (default: sys.argv[1:])
     
-    # Process each store in stores_df
-    logger.info("\nProcessing stores from stores.csv...")
-    for _, store_row in stores_df.iterrows():
-        store_name = store_row['store_name']
-        process_store(store_name, xlsx_df, output_dir)
+    Returns:
+        int: Exit status, 0 if every combination was processed and 1 otherwise
+    """
+    args = parse_args(argv)
+    args.jobs = args.jobs or os.cpu_count() or 1
+    if args.profile and args.workers != 1:
+        # Only the main process is profiled, so write the stores in it
+        logger.info("Profiling the run with a single worker")
+        args.workers = 1
+    if args.profile:
+        # Only the main thread is profiled, so write the files in it
+        args.writer_threads = 0
+        args.jobs = 1
     
-    logger.info("Processing completed successfully")
-    print(f"All store files have been saved to the '{output_dir}' directory")
+    with recording(RunRecorder()) as recorder:
+        if args.profile:
+            args.output.mkdir(parents=True, exist_ok=True)
+            with RunProfiler(args.output) as profiler:
+                succeeded = run(args)
+            for line in profiler.summary():
+                logger.info(line)
+        else:
+            succeeded = run(args)
+    
+    report = recorder.report(inputs=args.inputs, stores=[str(path) for path in args.stores],
+                             output=str(args.output), jobs=args.jobs,
+                             workers=args.workers, writer_threads=args.writer_threads,
+                             excel_writer=args.excel_writer, incremental=args.incremental, resume=args.resume)
+    for line in format_report_table(report):
+        logger.info(line)
+    if args.report and write_report(report, args.report):
+        logger.info(f"Run report saved to: {args.report}")
+    return 0 if succeeded else 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,568 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Allocation engine module for processing all stores in a single pass.
+
+This module provides functionality to:
+1. Resolve the columns of all stores in one batch, reporting ambiguous and unmatched stores
+2. Slice the stores from the allocation matrix the sheet was loaded as, or melt
+   a sheet loaded as a DataFrame into a single long (store, EAN, season, qty) table
+3. Split the stores out of it in one pass and write the per-store/per-season outputs
+4. Optionally write the store outputs in parallel across a process pool, or on
+   writer threads fed by this process while it prepares the next stores
+5. Optionally skip the stores whose data did not change since the last run
+6. Optionally journal the completed stores, so that an interrupted run can be
+   resumed from the stores it did not finish
+7. Stop a run cooperatively between stores when it is cancelled
+8. Report the work of the stores to write up front, for work-weighted progress
+"""
+
+import os
+import logging
+import multiprocessing
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional, List, Dict, Callable, Tuple, Union
+
+from src.core.processors.store_processor import (
+    identify_required_columns,
+    get_valid_filename,
+    get_store_output_files,
+    write_store_outputs,
+    plan_store_writes,
+    check_label_options,
+    StoreWriteError,
+    DEFAULT_EXCEL_WRITER
+)
+from src.core.utils.allocation_matrix import AllocationMatrix
+from src.core.utils.output_shards import ShardLimits
+from src.core.utils.label_formats import DEFAULT_LABEL_FORMAT
+from src.core.utils.output_pipeline import OutputPipeline, WriteJob
+from src.core.utils.atomic_files import remove_partial_files
+from src.core.utils.run_journal import RunJournal
+from src.core.utils.progress_model import WorkCallback, estimate_store_work
+from src.core.utils.instrumentation import RunRecorder, get_active_recorder, recording, span, format_bytes
+from src.core.utils.run_manifest import (
+    fingerprint_store,
+    load_manifest,
+    save_manifest,
+    make_manifest_entry,
+    is_store_unchanged
+)
+from src.core.utils.store_index import StoreColumnIndex, StoreResolution, log_store_resolution
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Internal column names of the long allocation table
+STORE_KEY = '__store_column__'
+QUANTITY_KEY = '__quantity__'
+
+# Per-store statuses reported by process_all_stores
+STATUS_WRITTEN = 'written'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_AMBIGUOUS = 'ambiguous'
+STATUS_EMPTY = 'empty'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_RESUMED = 'resumed'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+ProgressCallback = Callable[[str, int, int], None]
+
+# Returns True once the run is cancelled; checked before every store is written
+CancelCheck = Callable[[], bool]
+
+# Called with the store name and the error message of every store that failed
+ErrorCallback = Callable[[str, str], None]
+
+# Loaded PRE ALLOCATION sheet: an AllocationMatrix, or a DataFrame for sheets the
+# matrix cannot represent (see file_utils.load_allocation_sheet)
+AllocationSheet = Union[AllocationMatrix, pd.DataFrame]
+
+# Arguments of write_store_outputs for one store
+StoreTask = Tuple[str, pd.DataFrame, str, str, str, Path, str, Optional[ShardLimits], str]
+
+def get_worker_count(workers: Optional[int] = None) -> int:
+    """
+    Resolve the number of worker processes to use.
+
+    Args:
+        workers (Optional[int]): Requested worker count; None or 0 uses all CPU cores
+
+    Returns:
+        int: Number of worker processes (at least 1)
+    """
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, workers)
+
+def resolve_store_columns(xlsx_df: AllocationSheet, store_names: List[str]) -> StoreResolution:
+    """
+    Resolve the matching column of every store in one batch.
+
+    Ambiguous and unmatched stores are logged before any store is processed.
+
+    Args:
+        xlsx_df (AllocationSheet): Loaded sheet
+        store_names (List[str]): Store names to resolve
+
+    Returns:
+        StoreResolution: Column of every store (None if not resolved) plus the
+            ambiguous and unmatched stores
+    """
+    with span('resolve'):
+        resolution = StoreColumnIndex(list(xlsx_df.columns)).resolve_all(store_names)
+    log_store_resolution(resolution)
+    return resolution
+
+def build_allocation_table(xlsx_df: pd.DataFrame, ean_col: str, season_col: str,
+                           store_columns: List[str]) -> pd.DataFrame:
+    """
+    Melt the store columns into a long table with one row per allocated store quantity.
+
+    Rows keep the original sheet order within every store, and only rows where
+    the store column has a value are kept.
+
+    Args:
+        xlsx_df (pd.DataFrame): DataFrame containing the Excel data
+        ean_col (str): Name of the EANCode column
+        season_col (str): Name of the SEASON column
+        store_columns (List[str]): Unique store columns to melt
+
+    Returns:
+        pd.DataFrame: Long table with the EANCode, SEASON, store column and quantity columns
+    """
+    long_df = xlsx_df[[ean_col, season_col] + store_columns].melt(
+        id_vars=[ean_col, season_col],
+        value_vars=store_columns,
+        var_name=STORE_KEY,
+        value_name=QUANTITY_KEY
+    )
+    return long_df[long_df[QUANTITY_KEY].notna()]
+
+def split_store_frames(xlsx_df: AllocationSheet, ean_col: str, season_col: str,
+                       store_columns: List[str]) -> Dict[str, pd.DataFrame]:
+    """
+    Split the allocation table into one DataFrame per store column.
+
+    Every DataFrame has the EANCode, SEASON and store columns with the original
+    column names and dtypes, holding only the rows where the store has a value.
+
+    A sheet loaded as an AllocationMatrix is sliced from the sparse store
+    columns, in time proportional to their filled cells. A DataFrame is melted
+    into a long table and split with one groupby.
+
+    Args:
+        xlsx_df (AllocationSheet): Loaded sheet
+        ean_col (str): Name of the EANCode column
+        season_col (str): Name of the SEASON column
+        store_columns (List[str]): Unique store columns to split
+
+    Returns:
+        Dict[str, pd.DataFrame]: Rows of every store column that has data
+    """
+    if not store_columns:
+        return {}
+
+    with span('filter'):
+        if isinstance(xlsx_df, AllocationMatrix):
+            logger.info(f"Slicing {len(store_columns)} stores from the allocation matrix of {len(xlsx_df)} rows "
+                        f"({format_bytes(xlsx_df.nbytes)})")
+            return xlsx_df.store_frames(store_columns)
+
+        long_df = build_allocation_table(xlsx_df, ean_col, season_col, store_columns)
+        store_frames = {}
+        for store_col, group in long_df.groupby(STORE_KEY, sort=False):
+            # Restore the original column layout and dtype of the store slice
+            store_frames[store_col] = pd.DataFrame({
+                ean_col: group[ean_col],
+                season_col: group[season_col],
+                store_col: group[QUANTITY_KEY].astype(xlsx_df[store_col].dtype)
+            })
+    return store_frames
+
+def write_store_batch(tasks: List[StoreTask]) -> List[Tuple[str, bool]]:
+    """
+    Write the outputs of a batch of stores in order.
+
+    Stores whose output files share a name are always placed in the same batch,
+    so the last store in the stores list wins regardless of the worker count.
+
+    Args:
+        tasks (List[StoreTask]): Arguments of write_store_outputs for every store
+
+    Returns:
+        List[Tuple[str, bool]]: Store name and success flag for every store
+    """
+    return [(task[0], write_store_outputs(*task)) for task in tasks]
+
+def write_store_batch_recorded(tasks: List[StoreTask]) -> Tuple[List[Tuple[str, bool]], Dict[str, Dict]]:
+    """
+    Write a batch of stores in a worker process while recording its spans.
+
+    Args:
+        tasks (List[StoreTask]): Arguments of write_store_outputs for every store
+
+    Returns:
+        Tuple[List[Tuple[str, bool]], Dict[str, Dict]]: Store name and success flag
+            for every store, and the spans recorded while writing them
+    """
+    with recording(RunRecorder()) as recorder:
+        results = write_store_batch(tasks)
+    return results, recorder.spans
+
+def write_store_batch_checked(tasks: List[StoreTask]) -> None:
+    """
+    Write the outputs of a batch of stores in order, raising if any store failed.
+
+    Args:
+        tasks (List[StoreTask]): Arguments of write_store_outputs for every store
+
+    Raises:
+        StoreWriteError: If the files of a store could not be written
+    """
+    failed = [store_name for store_name, success in write_store_batch(tasks) if not success]
+    if failed:
+        raise StoreWriteError(f"Could not write the files of stores {', '.join(failed)}, see the log for details")
+
+def plan_batch_writes(batch: List[StoreTask]) -> List[WriteJob]:
+    """
+    Prepare the writes of a batch of stores for the output pipeline.
+
+    The files of a single store are written concurrently. Stores sharing output
+    files are written in order by a single write, so the last one still wins.
+
+    Args:
+        batch (List[StoreTask]): Tasks returned by batch_store_tasks
+
+    Returns:
+        List[WriteJob]: Writes of the batch
+    """
+    if len(batch) == 1:
+        return plan_store_writes(*batch[0])
+    return [(write_store_batch_checked, (batch,))]
+
+def write_batches_pipelined(batches: List[List[StoreTask]], writer_threads: int,
+                            batch_done: Callable[[List[StoreTask], Optional[BaseException]], None],
+                            cancel_check: Optional[CancelCheck] = None) -> None:
+    """
+    Write batches of stores on writer threads while preparing the next batches.
+
+    The preparation blocks while the queue of pending writes is full, so memory
+    stays bounded when the writers are slower than the preparation.
+
+    Args:
+        batches (List[List[StoreTask]]): Tasks returned by batch_store_tasks
+        writer_threads (int): Number of writer threads
+        batch_done (Callable): Called in this thread with every finished batch and
+            the first error raised while preparing or writing it, if any
+        cancel_check (Optional[CancelCheck]): Stops preparing batches once it
+            returns True; the batches already queued are still written
+    """
+    def report(completed):
+        for index, error in completed:
+            batch_done(batches[index], error)
+
+    with OutputPipeline(writer_threads) as pipeline:
+        for index, batch in enumerate(batches):
+            if cancel_check is not None and cancel_check():
+                break
+            try:
+                jobs = plan_batch_writes(batch)
+            except Exception as e:
+                logger.error(f"Error preparing the files of store {batch[0][0]}: {e}")
+                batch_done(batch, e)
+                continue
+            pipeline.submit(index, jobs)
+            report(pipeline.completed())
+        report(pipeline.close())
+
+def write_store_batches(batches: List[List[StoreTask]], workers: int, writer_threads: int,
+                        store_done: Callable[..., None], cancel_check: Optional[CancelCheck] = None) -> None:
+    """
+    Write batches of stores in this process, on writer threads or across a process pool.
+
+    Once the run is cancelled, no new batch is started and store_done is not
+    called for the batches left unwritten.
+
+    Args:
+        batches (List[List[StoreTask]]): Tasks returned by batch_store_tasks
+        workers (int): Number of worker processes (None or 0 uses all CPU cores)
+        writer_threads (int): Number of writer threads used with a single worker
+        store_done (Callable): Called with the store name, its status and the
+            error message of a failed store
+        cancel_check (Optional[CancelCheck]): Returns True once the run is cancelled
+    """
+    workers = min(get_worker_count(workers), len(batches))
+
+    if workers <= 1 and writer_threads > 0 and batches:
+        logger.info(f"Writing {sum(len(batch) for batch in batches)} stores with {writer_threads} writer threads")
+
+        def batch_done(batch: List[StoreTask], error: Optional[BaseException]) -> None:
+            for task in batch:
+                if error is None:
+                    store_done(task[0], STATUS_WRITTEN)
+                else:
+                    store_done(task[0], STATUS_FAILED, str(error))
+
+        write_batches_pipelined(batches, writer_threads, batch_done, cancel_check)
+    elif workers <= 1:
+        for batch in batches:
+            if cancel_check is not None and cancel_check():
+                break
+            for store_name, success in write_store_batch(batch):
+                store_done(store_name, STATUS_WRITTEN if success else STATUS_FAILED)
+    else:
+        logger.info(f"Writing {sum(len(batch) for batch in batches)} stores with {workers} worker processes")
+        # Spawned workers behave the same on every platform and are safe to
+        # start from the GUI worker thread
+        context = multiprocessing.get_context('spawn')
+        # Collect the spans of the worker processes when the run is instrumented
+        recorder = get_active_recorder()
+        batch_writer = write_store_batch if recorder is None else write_store_batch_recorded
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {executor.submit(batch_writer, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    results = future.result()
+                    if recorder is not None:
+                        results, worker_spans = results
+                        recorder.merge(worker_spans)
+                except Exception as e:
+                    logger.error(f"Worker process failed: {e}")
+                    for task in futures[future]:
+                        store_done(task[0], STATUS_FAILED, f"Worker process failed: {e}")
+                    continue
+                for store_name, success in results:
+                    store_done(store_name, STATUS_WRITTEN if success else STATUS_FAILED)
+                if cancel_check is not None and cancel_check():
+                    # The batches already running in the workers are still written
+                    for pending in futures:
+                        pending.cancel()
+
+def batch_store_tasks(tasks: List[StoreTask]) -> List[List[StoreTask]]:
+    """
+    Group store tasks by output filename, keeping the stores list order.
+
+    Args:
+        tasks (List[StoreTask]): Arguments of write_store_outputs for every store
+
+    Returns:
+        List[List[StoreTask]]: Batches of tasks that write to the same files
+    """
+    batches = {}
+    for task in tasks:
+        batches.setdefault(get_valid_filename(task[0]), []).append(task)
+    return list(batches.values())
+
+def process_all_stores(store_names: List[str], xlsx_df: AllocationSheet, output_dir: Path,
+                       progress_callback: Optional[ProgressCallback] = None,
+                       workers: int = 1, excel_writer: str = DEFAULT_EXCEL_WRITER,
+                       incremental: bool = False, limits: Optional[ShardLimits] = None,
+                       label_format: str = DEFAULT_LABEL_FORMAT, writer_threads: int = 0,
+                       error_callback: Optional[ErrorCallback] = None, journal: bool = False,
+                       resume: bool = False, cancel_check: Optional[CancelCheck] = None,
+                       work_callback: Optional[WorkCallback] = None) -> Dict[str, str]:
+    """
+    Process all stores at once, producing the same files as calling
+    process_store for every store.
+
+    With more than one worker, the store slices are sent to a process pool and
+    written in parallel. Otherwise, with writer threads, this process prepares
+    the workbooks and label files of the next stores while the writer threads
+    put the previous ones on disk. The output files do not depend on the worker
+    or writer thread count.
+    
+    In incremental mode, the fingerprint and output files of every written store
+    are recorded in a manifest in the output directory, and stores whose
+    fingerprint is unchanged and whose outputs all exist are skipped.
+
+    With the journal, every completed store is recorded in a journal file in the
+    output directory as soon as all of its files are confirmed on disk, and the journal is marked
+    finished once no store failed. Resuming an unfinished run skips the stores
+    the journal records with the same fingerprint and existing outputs.
+
+    A cancelled run stops before the next store is written, reports the stores
+    it did not write as cancelled and leaves the journal unfinished, so that it
+    can be resumed.
+
+    Args:
+        store_names (List[str]): Names of the stores to process
+        xlsx_df (AllocationSheet): Loaded sheet, an AllocationMatrix or a DataFrame
+        output_dir (Path): Directory to save the output files
+        progress_callback (Optional[ProgressCallback]): Called with the store name,
+            the number of processed stores and the total after each store
+        workers (int): Number of worker processes (None or 0 uses all CPU cores);
+            1 writes the stores in this process
+        excel_writer (str): Excel writer mode, "streaming" (default) or "pandas"
+        incremental (bool): Only write the stores that changed since the last run
+        limits (Optional[ShardLimits]): Size limits of the output files; oversized
+            files are split into parts listed in a per-store index file
+        label_format (str): Format of the per-season label files (see label_formats)
+        writer_threads (int): Number of writer threads used with a single worker;
+            0 writes the files in this thread
+        error_callback (Optional[ErrorCallback]): Called with the store name and
+            the error message of every store whose files could not be written
+        journal (bool): Record the completed stores in the run journal
+        resume (bool): Skip the stores completed by the interrupted run recorded in
+            the journal; implies journal
+        cancel_check (Optional[CancelCheck]): Returns True once the run is cancelled
+        work_callback (Optional[WorkCallback]): Called before the first store is
+            written with the work of every store left to write
+
+    Returns:
+        Dict[str, str]: Mapping of store name to its processing status
+
+    Raises:
+        ValueError: If the label format cannot be written with the limits
+    """
+    check_label_options(label_format, limits)
+    total_stores = len(store_names)
+    resolution = resolve_store_columns(xlsx_df, store_names)
+    store_columns = resolution.columns
+    ean_col, season_col = identify_required_columns(xlsx_df)
+
+    # Split every matched store column out of the sheet once
+    store_frames = {}
+    if ean_col and season_col:
+        matched_columns = list(dict.fromkeys(col for col in store_columns.values() if col is not None))
+        store_frames = split_store_frames(xlsx_df, ean_col, season_col, matched_columns)
+
+    statuses = {}
+    tasks = []
+    processed_count = 0
+    run_journal = None
+    # Output files of every store, known when the run is journaled or incremental
+    output_files = None
+
+    def store_done(store_name: str, status: str, error: Optional[str] = None) -> None:
+        nonlocal processed_count
+        if status == STATUS_WRITTEN and output_files is not None:
+            # Only stores whose files are all on disk are journaled and added to the manifest
+            missing = [name for name in output_files[store_name] if not (Path(output_dir) / name).exists()]
+            if missing:
+                logger.error(f"Files of store {store_name} missing after writing: {missing}")
+                status = STATUS_FAILED
+                error = f"Output files were not written: {', '.join(missing)}"
+        statuses[store_name] = status
+        if status == STATUS_FAILED and error_callback:
+            error_callback(store_name, error or "Could not write the store files, see the log for details")
+        if run_journal is not None and status in (STATUS_WRITTEN, STATUS_UNCHANGED):
+            run_journal.record(store_name, fingerprints[store_name], output_files[store_name])
+        processed_count += 1
+        if progress_callback:
+            progress_callback(store_name, processed_count, total_stores)
+
+    for store_name in store_names:
+        store_col = store_columns[store_name]
+
+        if store_name in resolution.ambiguous:
+            logger.warning(f"Store '{store_name}' skipped: it matches several columns")
+            store_done(store_name, STATUS_AMBIGUOUS)
+        elif store_col is None:
+            logger.warning(f"Store '{store_name}' not found in xlsx column headers")
+            store_done(store_name, STATUS_NOT_FOUND)
+        elif not ean_col or not season_col:
+            logger.warning(f"Could not find EANCode or SEASON columns for store {store_name}")
+            store_done(store_name, STATUS_FAILED)
+        elif store_col not in store_frames:
+            logger.warning(f"Store '{store_name}' found, but no data available")
+            store_done(store_name, STATUS_EMPTY)
+        else:
+            logger.info(f"Found column matching store '{store_name}': {store_col}")
+
+            tasks.append((store_name, store_frames[store_col], ean_col, season_col, store_col,
+                          output_dir, excel_writer, limits, label_format))
+
+    batches = batch_store_tasks(tasks)
+
+    if incremental or journal or resume:
+        # Output options that change the files are part of the fingerprint
+        options = {}
+        if limits is not None and limits.enabled:
+            options['limits'] = limits.to_dict()
+        if label_format != DEFAULT_LABEL_FORMAT:
+            options['label_format'] = label_format
+        fingerprints = {task[0]: fingerprint_store(task[0], task[1], options or None) for task in tasks}
+        output_files = {
+            task[0]: get_store_output_files(task[0], task[1], task[3], task[2], task[4], limits, label_format)
+            for task in tasks
+        }
+
+    if incremental:
+        manifest = load_manifest(output_dir)
+
+    run_journal = RunJournal(output_dir, resume) if journal or resume else None
+    try:
+        if run_journal is not None:
+            remove_partial_files(output_dir)
+
+        if run_journal is not None and run_journal.completed:
+            # Stores sharing output files are skipped or written together
+            pending_batches = []
+            for batch in batches:
+                if all(run_journal.is_completed(task[0], fingerprints[task[0]], output_files[task[0]])
+                       for task in batch):
+                    for task in batch:
+                        store_done(task[0], STATUS_RESUMED)
+                else:
+                    pending_batches.append(batch)
+            pending_count = sum(len(batch) for batch in pending_batches)
+            logger.info(f"Resumed run: {len(tasks) - pending_count} stores completed by the interrupted run "
+                        f"skipped, {pending_count} to write")
+            batches = pending_batches
+
+        if incremental:
+            # Stores sharing output files are skipped or written together
+            pending_batches = []
+            for batch in batches:
+                if all(is_store_unchanged(manifest.get(task[0]), fingerprints[task[0]],
+                                          output_files[task[0]], output_dir) for task in batch):
+                    for task in batch:
+                        store_done(task[0], STATUS_UNCHANGED)
+                else:
+                    pending_batches.append(batch)
+            pending_count = sum(len(batch) for batch in pending_batches)
+            logger.info(f"Incremental run: {len(tasks) - pending_count} unchanged stores skipped, "
+                        f"{pending_count} to write")
+            batches = pending_batches
+
+        if work_callback:
+            work_callback({task[0]: estimate_store_work(task[1], task[4]) for batch in batches for task in batch})
+
+        write_store_batches(batches, workers, writer_threads, store_done, cancel_check)
+
+        unwritten = [task[0] for batch in batches for task in batch if task[0] not in statuses]
+        if unwritten:
+            logger.info(f"Run cancelled: {len(unwritten)} stores were not written")
+            for store_name in unwritten:
+                store_done(store_name, STATUS_CANCELLED)
+
+        # A run with failed or cancelled stores stays resumable
+        if run_journal is not None and not {STATUS_FAILED, STATUS_CANCELLED} & set(statuses.values()):
+            run_journal.finish()
+    finally:
+        if run_journal is not None:
+            run_journal.close()
+
+    if incremental:
+        for task in tasks:
+            status = statuses[task[0]]
+            if status in (STATUS_WRITTEN, STATUS_RESUMED):
+                manifest[task[0]] = make_manifest_entry(fingerprints[task[0]], output_files[task[0]])
+            elif status not in (STATUS_UNCHANGED, STATUS_CANCELLED):
+                # Cancelled stores keep the files, and the entry, of the last run
+                manifest.pop(task[0], None)
+        save_manifest(output_dir, manifest)
+
+    # Report the statuses in the order of the stores list
+    return {store_name: statuses[store_name] for store_name in store_names}
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Batch runner module for processing several workbooks against several stores lists.
+
+This module provides functionality to:
+1. Plan one job per workbook and stores list combination, each with its own
+   output directory under a common output root
+2. Load every workbook once with the columns needed by all of its stores lists,
+   and share the loaded sheet between its jobs
+3. Run the jobs concurrently on a pool of threads, starting the jobs of a
+   workbook as soon as it is loaded
+"""
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from src.core.processors.store_processor import get_valid_filename
+from src.core.utils.instrumentation import get_active_recorder, recording
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class BatchJob(NamedTuple):
+    """One workbook processed for the stores of one stores list."""
+    workbook: Path
+    stores_file: Path
+    store_names: Tuple[str, ...]
+    output_dir: Path
+
+
+# Loads a workbook with the columns of the given stores, or returns None on failure
+WorkbookLoader = Callable[[Path, List[str]], Optional[pd.DataFrame]]
+
+# Processes a job with the shared sheet of its workbook and returns whether it succeeded
+JobRunner = Callable[[BatchJob, Optional[pd.DataFrame]], bool]
+
+
+def get_unique_names(paths: List[Path]) -> Dict[Path, str]:
+    """
+    Get a directory name for every path from its file name without suffix.
+
+    Paths with the same name, such as workbooks with the same name in different
+    folders, get a numbered suffix.
+
+    Args:
+        paths (List[Path]): Paths to name
+
+    Returns:
+        Dict[Path, str]: Directory name of every path
+    """
+    names = {}
+    used = set()
+    for path in paths:
+        base = get_valid_filename(path.stem)
+        name = base
+        number = 2
+        while name in used:
+            name = f"{base}-{number}"
+            number += 1
+        used.add(name)
+        names[path] = name
+    return names
+
+
+def plan_batch_jobs(workbooks: List[Path], store_lists: Dict[Path, List[str]], output_root: Path) -> List[BatchJob]:
+    """
+    Plan a job for every workbook and stores list combination.
+
+    A single combination writes straight into the output root. Otherwise every
+    job gets a subdirectory named after its workbook, its stores file, or both
+    (workbook/stores) when there are several of each.
+
+    Args:
+        workbooks (List[Path]): Workbooks to process
+        store_lists (Dict[Path, List[str]]): Store names of every stores file
+        output_root (Path): Directory under which the outputs are written
+
+    Returns:
+        List[BatchJob]: Jobs grouped by workbook
+    """
+    workbook_names = get_unique_names(workbooks)
+    stores_names = get_unique_names(list(store_lists))
+
+    jobs = []
+    for workbook in workbooks:
+        for stores_file, store_names in store_lists.items():
+            output_dir = output_root
+            if len(workbooks) > 1:
+                output_dir = output_dir / workbook_names[workbook]
+            if len(store_lists) > 1:
+                output_dir = output_dir / stores_names[stores_file]
+            jobs.append(BatchJob(workbook, stores_file, tuple(store_names), output_dir))
+    return jobs
+
+
+def get_workbook_stores(jobs: List[BatchJob]) -> Dict[Path, List[str]]:
+    """
+    Get the stores needed from every workbook by all of its jobs.
+
+    Args:
+        jobs (List[BatchJob]): Planned jobs
+
+    Returns:
+        Dict[Path, List[str]]: Store names of every workbook, without duplicates
+    """
+    workbook_stores: Dict[Path, Dict[str, None]] = {}
+    for job in jobs:
+        workbook_stores.setdefault(job.workbook, {}).update(dict.fromkeys(job.store_names))
+    return {workbook: list(stores) for workbook, stores in workbook_stores.items()}
+
+
+def run_batch_jobs(jobs: List[BatchJob], run_job: JobRunner, load_workbook: Optional[WorkbookLoader] = None,
+                   parallel: int = 1) -> Dict[BatchJob, bool]:
+    """
+    Run the jobs of a batch, loading every workbook once for all of its jobs.
+
+    Without a loader, every job gets None instead of a shared sheet and reads
+    its workbook itself, as in streaming mode.
+
+    Args:
+        jobs (List[BatchJob]): Jobs to run
+        run_job (JobRunner): Processes one job with the shared sheet of its workbook
+        load_workbook (Optional[WorkbookLoader]): Loads a workbook with the columns
+            of the given stores
+        parallel (int): Number of workbooks loaded and jobs run at the same time
+
+    Returns:
+        Dict[BatchJob, bool]: Whether every job succeeded, in the order of the jobs
+    """
+    results: Dict[BatchJob, bool] = {job: False for job in jobs}
+    # The pool threads record their spans in the caller's recorder
+    recorder = get_active_recorder()
+
+    def in_context(func, *args):
+        if recorder is None:
+            return func(*args)
+        with recording(recorder):
+            return func(*args)
+
+    def run_checked(job: BatchJob, df: Optional[pd.DataFrame]) -> bool:
+        try:
+            return run_job(job, df)
+        except Exception as e:
+            logger.error(f"Error processing {job.workbook} for {job.stores_file}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="batch") as pool:
+        job_futures = {}
+        if load_workbook is None:
+            for job in jobs:
+                job_futures[pool.submit(in_context, run_checked, job, None)] = job
+        else:
+            # Only a few workbooks are loaded ahead, and the jobs of a loaded
+            # workbook are queued before the next load, so the loaded sheets
+            # held in memory stay bounded by the parallelism
+            pending_loads = iter(get_workbook_stores(jobs).items())
+            loading = {}
+
+            def load_next_workbook():
+                for workbook, store_names in pending_loads:
+                    loading[pool.submit(in_context, load_workbook, workbook, store_names)] = workbook
+                    return
+
+            for _ in range(max(1, parallel)):
+                load_next_workbook()
+            while loading:
+                done, _ = wait(loading, return_when=FIRST_COMPLETED)
+                for load_future in done:
+                    workbook = loading.pop(load_future)
+                    try:
+                        df = load_future.result()
+                    except Exception as e:
+                        logger.error(f"Error loading {workbook}: {e}")
+                        df = None
+                    if df is None:
+                        logger.error(f"Skipping the jobs of {workbook}: the workbook could not be loaded")
+                    else:
+                        for job in jobs:
+                            if job.workbook == workbook:
+                                job_futures[pool.submit(in_context, run_checked, job, df)] = job
+                        # The sheet is released once the last job of the workbook finished
+                        del df
+                    load_next_workbook()
+
+        for job_future in as_completed(job_futures):
+            results[job_futures[job_future]] = job_future.result()
+    return results
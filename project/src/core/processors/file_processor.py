@@ -5,19 +5,46 @@
 File processor module for handling Excel and CSV file operations.
 
 This module provides functionality to:
-1. Load and read Excel (XLSX) files
+1. Load and read Excel (XLSX) files, caching the parsed sheets on disk, and load
+   the sheet of a run as a compact AllocationMatrix
 2. Read stores from a CSV file
 3. Process each store to create store-specific files
+4. Process workbooks larger than memory by streaming the sheet in chunks
+5. Parse a workbook into the cache in the background when it is selected, so
+   that the run that follows loads it from the cache
 """
 
 import os
 import logging
+import threading
 import pandas as pd
 from pathlib import Path
 from typing import Optional, List, Dict, Union
 import pandas as pd
 
-from src.core.processors.store_processor import process_store
+from src.core.processors.store_processor import process_store, create_txt_file_with_repeated_eancodes, DEFAULT_EXCEL_WRITER
+from src.core.processors.allocation_engine import (
+    process_all_stores,
+    resolve_store_columns,
+    AllocationSheet,
+    ProgressCallback,
+    ErrorCallback,
+    CancelCheck
+)
+from src.core.utils.progress_model import WorkCallback
+from src.core.processors.streaming_engine import process_workbook_streaming, DEFAULT_CHUNK_ROWS
+from src.core.utils.file_utils import (
+    load_xlsx_file,
+    load_allocation_sheet,
+    to_allocation_sheet,
+    find_matching_column,
+    select_allocation_columns
+)
+from src.core.utils.store_index import StoreResolution
+from src.core.utils.output_shards import ShardLimits
+from src.core.utils.label_formats import DEFAULT_LABEL_FORMAT
+from src.core.utils.instrumentation import span
+from src.core.utils.sheet_cache import SheetCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_BYTES
 
 # Setup logging
 logging.basicConfig(
@@ -27,65 +54,142 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class FileProcessor:
-    def __init__(self):
-        """Initialize the file processor."""
-        pass
+    def __init__(self, reader_backend: str = "xml",
+                 cache_dir: Optional[Union[str, Path]] = DEFAULT_CACHE_DIR,
+                 cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Initialize the file processor.
+        
+        Args:
+            reader_backend (str): Excel reader backend, "xml" or "pandas" (default: "xml")
+            cache_dir (Optional[Union[str, Path]]): Directory of the parsed sheet cache;
+                None disables the cache
+            cache_max_bytes (int): Size limit of the parsed sheet cache
+        """
+        self.reader_backend = reader_backend
+        self.sheet_cache = SheetCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
+        # "hit" or "miss" for the last cached load, None if the cache was not used
+        self.last_cache_status: Optional[str] = None
+        # One lock per cache key, so that a sheet being parsed in the background is
+        # not parsed again by a run but loaded from the cache once it is written
+        self._cache_locks: Dict[str, threading.Lock] = {}
+        self._cache_locks_guard = threading.Lock()
+    
+    def _cache_lock(self, cache_key: str) -> threading.Lock:
+        """Get the lock of a cache key"""
+        with self._cache_locks_guard:
+            return self._cache_locks.setdefault(cache_key, threading.Lock())
         
-    def load_xlsx_file(self, file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION") -> Optional[pd.DataFrame]:
+    def load_xlsx_file(self, file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION",
+                       store_names: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
         """
         Load an Excel (xlsx) file and return its content as a pandas DataFrame.
         
+        When store names are given, only the EANCode, SEASON and store columns are
+        returned. The sheet is read with the fast XML reader backend, falling back to
+        pd.read_excel for workbooks it does not support.
+        
+        Parsed sheets are cached on disk by file content, sheet name and reader
+        version, so loading the same workbook again skips the Excel parsing.
+        
         Args:
             file_path (Union[str, Path]): Path to the xlsx file
             sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+            store_names (Optional[List[str]]): Stores whose columns to load; all columns are loaded if None
             
         Returns:
             Optional[pd.DataFrame]: DataFrame containing the Excel data or None if loading failed
         """
-        try:
-            logger.info(f"Loading Excel file: {file_path}")
+        with span('load'):
+            self.last_cache_status = None
+            if self.sheet_cache is None:
+                return load_xlsx_file(file_path, sheet_name, store_names, self.reader_backend)
             
-            # Try to load the specified sheet
             try:
-                logger.info(f"Loading '{sheet_name}' sheet from Excel file")
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
-                
-                # Check if the sheet loaded successfully
-                if df is not None and not df.empty:
-                    logger.info(f"Successfully loaded '{sheet_name}' sheet with {len(df)} rows and {len(df.columns)} columns")
-                    return df
+                cache_key = self.sheet_cache.make_key(file_path, sheet_name, self.reader_backend)
+            except OSError:
+                # Let the loader report the missing or unreadable file
+                return load_xlsx_file(file_path, sheet_name, store_names, self.reader_backend)
+            
+            with self._cache_lock(cache_key):
+                xlsx_df = self.sheet_cache.get(cache_key)
+                if xlsx_df is not None:
+                    self.last_cache_status = "hit"
+                    logger.info(f"Loaded '{sheet_name}' sheet of {file_path} from the cache")
                 else:
-                    logger.warning(f"The '{sheet_name}' sheet was empty or could not be loaded")
-            except Exception as e:
-                logger.warning(f"Error loading '{sheet_name}' sheet: {e}")
-                
-                # Check if Excel file has a sheet named without spaces
-                try:
-                    sheet_name_no_spaces = sheet_name.replace(" ", "_")
-                    logger.info(f"Trying to load '{sheet_name_no_spaces}' sheet (without spaces)")
-                    df = pd.read_excel(file_path, sheet_name=sheet_name_no_spaces)
-                    if df is not None and not df.empty:
-                        return df
-                except Exception:
-                    pass
-                    
-                # Get all sheet names to log them for debugging
-                xls = pd.ExcelFile(file_path)
-                sheet_names = xls.sheet_names
-                logger.info(f"Available sheets in the Excel file: {sheet_names}")
-                
-                # If we can't load the specific sheet, try the first sheet
-                logger.info("Trying to load the first sheet as fallback")
-                df = pd.read_excel(file_path)
+                    self.last_cache_status = "miss"
+                    logger.info(f"'{sheet_name}' sheet of {file_path} is not cached, parsing the workbook")
+                    # Cache every column so that runs with other stores hit the cache too
+                    xlsx_df = load_xlsx_file(file_path, sheet_name, None, self.reader_backend)
+                    if xlsx_df is None:
+                        return None
+                    self.sheet_cache.put(cache_key, xlsx_df)
             
-            logger.info(f"Successfully loaded Excel file with {len(df)} rows and {len(df.columns)} columns")
-            return df
-        except FileNotFoundError:
-            logger.error(f"Excel file not found: {file_path}")
-            return None
-        except Exception as e:
-            logger.error(f"Error loading Excel file: {e}")
+            if store_names is not None:
+                xlsx_df = select_allocation_columns(xlsx_df, store_names)
+            return xlsx_df
+    
+    def load_allocation_sheet(self, file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION",
+                              store_names: Optional[List[str]] = None) -> Optional[AllocationSheet]:
+        """
+        Load the sheet of a run as an AllocationMatrix of the EANCode, SEASON and store columns.
+        
+        Without the sheet cache, the matrix is built while the sheet is read. With
+        it, the sheet is loaded like load_xlsx_file, from the cache when possible,
+        and the DataFrame is dropped once the matrix is built.
+        
+        Args:
+            file_path (Union[str, Path]): Path to the xlsx file
+            sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+            store_names (Optional[List[str]]): Stores of the run; every column is loaded if None
+            
+        Returns:
+            Optional[AllocationSheet]: The matrix, the DataFrame
+                when the matrix cannot represent the sheet, or None if loading failed
+        """
+        if self.sheet_cache is None:
+            self.last_cache_status = None
+            with span('load'):
+                return load_allocation_sheet(file_path, sheet_name, store_names, self.reader_backend)
+        
+        xlsx_df = self.load_xlsx_file(file_path, sheet_name, store_names)
+        if xlsx_df is None:
             return None
+        with span('load'):
+            return to_allocation_sheet(xlsx_df, store_names)
+    
+    def warm_sheet_cache(self, file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION") -> bool:
+        """
+        Parse a sheet into the cache ahead of a run, such as when the file is selected.
+        
+        A run that loads the sheet while it is being parsed waits for the parse and
+        then loads the sheet from the cache.
+        
+        Args:
+            file_path (Union[str, Path]): Path to the xlsx file
+            sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+            
+        Returns:
+            bool: True if the sheet is cached, False if the cache is disabled or the
+                sheet could not be loaded or cached
+        """
+        if self.sheet_cache is None:
+            return False
+        
+        try:
+            cache_key = self.sheet_cache.make_key(file_path, sheet_name, self.reader_backend)
+        except OSError as e:
+            logger.warning(f"Could not read {file_path}: {e}")
+            return False
+        
+        with self._cache_lock(cache_key):
+            if self.sheet_cache.contains(cache_key):
+                return True
+            logger.info(f"Parsing the '{sheet_name}' sheet of {file_path} into the cache")
+            xlsx_df = load_xlsx_file(file_path, sheet_name, None, self.reader_backend)
+            if xlsx_df is None:
+                return False
+            return self.sheet_cache.put(cache_key, xlsx_df)
     
     def read_stores_csv(self, file_path: Union[str, Path]) -> Optional[pd.DataFrame]:
         """
@@ -102,14 +206,15 @@ class FileProcessor:
             
             # The stores file appears to have no headers, just store names
             # We'll read it as a single column dataframe
-            stores_df = pd.read_csv(file_path, header=None, names=['store_name'])
-            
-            # Remove any blank rows
-            stores_df = stores_df[stores_df['store_name'].notna()]
-            stores_df = stores_df[stores_df['store_name'].str.strip() != '']
-            
-            # Drop duplicates
-            unique_stores = stores_df.drop_duplicates()
+            with span('read_stores'):
+                stores_df = pd.read_csv(file_path, header=None, names=['store_name'])
+                
+                # Remove any blank rows
+                stores_df = stores_df[stores_df['store_name'].notna()]
+                stores_df = stores_df[stores_df['store_name'].str.strip() != '']
+                
+                # Drop duplicates
+                unique_stores = stores_df.drop_duplicates()
             logger.info(f"Found {len(unique_stores)} unique stores")
             
             return unique_stores
@@ -131,19 +236,25 @@ class FileProcessor:
         Returns:
             Optional[str]: Matching column name or None if not found
         """
-        # Try exact match first
-        for col in df.columns:
-            if col == store_name:
-                return col
-        
-        # If exact match not found, try to find a column containing the store name
-        for col in df.columns:
-            if isinstance(col, str) and store_name in col:
-                return col
+        return find_matching_column(list(df.columns), store_name)
+    
+    def resolve_store_columns(self, xlsx_df: AllocationSheet, store_names: List[str]) -> StoreResolution:
+        """
+        Resolve the columns of all stores in one batch.
         
-        return None
+        Args:
+            xlsx_df (AllocationSheet): Allocation matrix or DataFrame of the Excel data
+            store_names (List[str]): Store names to resolve
+            
+        Returns:
+            StoreResolution: Column of every store (None if not resolved) plus the
+                ambiguous and unmatched stores
+        """
+        return resolve_store_columns(xlsx_df, store_names)
     
-    def process_store(self, store_name: str, xlsx_df: pd.DataFrame, output_dir: Path) -> bool:
+    def process_store(self, store_name: str, xlsx_df: pd.DataFrame, output_dir: Path,
+                      limits: Optional[ShardLimits] = None,
+                      label_format: str = DEFAULT_LABEL_FORMAT) -> bool:
         """
         Process a single store by finding matching column in the xlsx data,
         extracting EANCode and SEASON data for that store, and creating sheets
@@ -156,19 +267,103 @@ class FileProcessor:
             store_name (str): Name of the store to search for
             xlsx_df (pd.DataFrame): DataFrame containing the Excel data
             output_dir (Path): Directory to save the output file
+            limits (Optional[ShardLimits]): Size limits of the output files
+            label_format (str): Format of the per-season label files
             
         Returns:
             bool: True if processing was successful, False otherwise
         """
         try:
             # Process the store using the imported function
-            process_store(store_name, xlsx_df, output_dir)
+            process_store(store_name, xlsx_df, output_dir, limits, label_format)
             return True
         except Exception as e:
             logger.error(f"Error processing store {store_name}: {e}")
             return False
             
-    def create_txt_file_with_repeated_eancodes(self, df: pd.DataFrame, ean_col: str, store_col: str, output_path: Path) -> bool:
+    def process_stores(self, store_names: List[str], xlsx_df: AllocationSheet, output_dir: Path,
+                       progress_callback: Optional[ProgressCallback] = None,
+                       workers: int = 1, excel_writer: str = DEFAULT_EXCEL_WRITER,
+                       incremental: bool = False, limits: Optional[ShardLimits] = None,
+                       label_format: str = DEFAULT_LABEL_FORMAT, writer_threads: int = 0,
+                       error_callback: Optional[ErrorCallback] = None, journal: bool = False,
+                       resume: bool = False, cancel_check: Optional[CancelCheck] = None,
+                       work_callback: Optional[WorkCallback] = None) -> Dict[str, str]:
+        """
+        Process all stores in a single pass over the Excel data.
+        
+        Every store column is resolved once and the stores are sliced from the
+        allocation matrix (or a DataFrame melted into one long table), so the data
+        is not re-filtered for every store. With more than one
+        worker, the store files are written in parallel worker processes; with a
+        single worker and writer threads, they are written on background threads
+        while the next stores are prepared.
+        
+        Args:
+            store_names (List[str]): Names of the stores to process
+            xlsx_df (AllocationSheet): Allocation matrix or DataFrame of the Excel data
+            output_dir (Path): Directory to save the output files
+            progress_callback (Optional[ProgressCallback]): Called with the store name,
+                the number of processed stores and the total after each store
+            workers (int): Number of worker processes (None or 0 uses all CPU cores)
+            excel_writer (str): Excel writer mode, "streaming" (default) or "pandas"
+            incremental (bool): Only write the stores whose data changed since the
+                last incremental run into the output directory
+            limits (Optional[ShardLimits]): Size limits of the output files; oversized
+                files are split into parts listed in a per-store index file
+            label_format (str): Format of the per-season label files
+            writer_threads (int): Number of writer threads used with a single worker;
+                0 writes the files in the calling thread
+            error_callback (Optional[ErrorCallback]): Called with the store name and
+                the error message of every store whose files could not be written
+            journal (bool): Record the completed stores in the run journal of the
+                output directory
+            resume (bool): Skip the stores completed by the interrupted run recorded
+                in the journal; implies journal
+            cancel_check (Optional[CancelCheck]): Returns True once the run is
+                cancelled; the stores not written yet are reported as cancelled
+            work_callback (Optional[WorkCallback]): Called before the first store is
+                written with the rows and label units of every store left to write
+            
+        Returns:
+            Dict[str, str]: Mapping of store name to its processing status
+        """
+        return process_all_stores(store_names, xlsx_df, output_dir, progress_callback, workers,
+                                  excel_writer, incremental, limits, label_format, writer_threads,
+                                  error_callback, journal, resume, cancel_check, work_callback)
+    
+    def process_workbook_streaming(self, file_path: Union[str, Path], store_names: List[str], output_dir: Path,
+                                   sheet_name: str = "PRE ALLOCATION", chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                                   progress_callback: Optional[ProgressCallback] = None,
+                                   limits: Optional[ShardLimits] = None,
+                                   label_format: str = DEFAULT_LABEL_FORMAT) -> Dict[str, str]:
+        """
+        Process all stores while reading the Excel file in chunks of rows, so that
+        memory use does not grow with the size of the workbook.
+        
+        Args:
+            file_path (Union[str, Path]): Path to the xlsx file
+            store_names (List[str]): Names of the stores to process
+            output_dir (Path): Directory to save the output files
+            sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+            chunk_rows (int): Number of sheet rows held in memory at a time
+            progress_callback (Optional[ProgressCallback]): Called with the store name,
+                the number of processed stores and the total after each store
+            limits (Optional[ShardLimits]): Size limits of the output files
+            label_format (str): Format of the per-season label files
+            
+        Returns:
+            Dict[str, str]: Mapping of store name to its processing status
+            
+        Raises:
+            UnsupportedWorkbookError: If the workbook cannot be streamed; load it
+                with load_xlsx_file instead
+        """
+        return process_workbook_streaming(file_path, store_names, output_dir, sheet_name, chunk_rows,
+                                          progress_callback, limits, label_format)
+            
+    def create_txt_file_with_repeated_eancodes(self, df: pd.DataFrame, ean_col: str, store_col: str, output_path: Path,
+                                               label_format: str = DEFAULT_LABEL_FORMAT) -> bool:
         """
         Create a text file with repeated EANCode values based on quantity values.
         
@@ -177,40 +372,9 @@ class FileProcessor:
             ean_col (str): Name of the EANCode column
             store_col (str): Name of the store column containing quantity values
             output_path (Path): Path to save the output text file
+            label_format (str): Label file format, 'txt' (default) for repeated EANCode lines
             
         Returns:
             bool: True if the file was created successfully, False otherwise
         """
-        try:
-            with open(output_path, 'w') as f:
-                # For each row in the DataFrame
-                for _, row in df.iterrows():
-                    # Clean and format the EANCode: remove .0 suffix if present
-                    eancode = str(row[ean_col]).strip()
-                    if eancode.endswith('.0'):
-                        eancode = eancode[:-2]
-                    
-                    # Try to get the quantity as an integer
-                    try:
-                        # Handle possible non-numeric or NaN values
-                        qty = row[store_col]
-                        
-                        # Handle blank spaces as zero
-                        if pd.isna(qty) or (isinstance(qty, str) and qty.strip() in ['', ' ', '  ']):
-                            qty = 0
-                        else:
-                            qty = int(float(qty))
-                        
-                        # Write the EANCode repeated qty times
-                        for _ in range(qty):
-                            f.write(f"{eancode}\n")
-                    except (ValueError, TypeError):
-                        # If conversion fails, log a warning and continue
-                        logger.warning(f"Could not convert quantity '{row[store_col]}' to integer for EANCode {eancode}")
-                        continue
-            
-            logger.info(f"Created TXT file with repeated EANCodes: {output_path}")
-            return True
-        except Exception as e:
-            logger.error(f"Error creating TXT file {output_path}: {e}")
-            return False 
\ No newline at end of file
+        return create_txt_file_with_repeated_eancodes(df, ean_col, store_col, output_path, label_format)
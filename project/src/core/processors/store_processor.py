@@ -7,14 +7,40 @@ Store processor module for processing individual stores.
 This module provides functionality to:
 1. Process individual stores from Excel data
 2. Create store-specific Excel files with sheets for each season
-3. Create TXT files for each store-season combination
+3. Create TXT files for each store-season combination, or label files in one
+   of the compact label formats
+4. Optionally split oversized store files into size-bounded parts with an index file
+5. Prepare the writes of a store's files for the background output pipeline
 """
 
 import logging
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple
 
+from src.core.utils.file_utils import find_matching_column, find_required_columns
+from src.core.utils.xlsx_writer import StreamingWorkbookWriter
+from src.core.utils.instrumentation import span
+from src.core.utils.atomic_files import atomic_write_path
+from src.core.utils.output_shards import (
+    ShardLimits,
+    split_ranges,
+    get_part_filename,
+    get_index_filename,
+    make_part_entry,
+    write_shard_index
+)
+from src.core.utils.label_formats import (
+    DEFAULT_LABEL_FORMAT,
+    LABEL_SUFFIXES,
+    check_label_format,
+    encode_label_file,
+    write_label_content,
+    write_labels
+)
+from src.core.utils.output_pipeline import WriteJob
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +48,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Excel writer modes: "streaming" writes sheets row by row with openpyxl's
+# write-only mode, "pandas" builds the workbook with pd.ExcelWriter
+EXCEL_WRITERS = ('streaming', 'pandas')
+DEFAULT_EXCEL_WRITER = 'streaming'
+
+class StoreWriteError(Exception):
+    """Raised when the output files of a store could not be written."""
+
 def find_store_column(df: pd.DataFrame, store_name: str) -> Optional[str]:
     """
     Find the column in the DataFrame that exactly matches the store name.
@@ -33,82 +67,501 @@ def find_store_column(df: pd.DataFrame, store_name: str) -> Optional[str]:
     Returns:
         Optional[str]: Matching column name or None if not found
     """
-    for col in df.columns:
-        if col == store_name:
-            return col
+    return find_matching_column(list(df.columns), store_name)
+
+def clean_eancodes(values: pd.Series) -> pd.Series:
+    """
+    Convert EANCode values to their text form, removing the .0 suffix left by float values.
+    
+    Args:
+        values (pd.Series): Raw EANCode values
+        
+    Returns:
+        pd.Series: Cleaned EANCode strings
+    """
+    return values.map(str).str.strip().str.removesuffix('.0')
+
+def clean_quantities(values: pd.Series, eancodes: pd.Series) -> np.ndarray:
+    """
+    Convert quantity values to non-negative integer repeat counts.
+    
+    Blank and missing values count as zero. Values that cannot be converted are
+    logged with their EANCode and count as zero as well.
+    
+    Args:
+        values (pd.Series): Raw quantity values from a store column
+        eancodes (pd.Series): Cleaned EANCode strings, used in warnings
+        
+    Returns:
+        np.ndarray: Integer repeat count for every row
+    """
+    numeric = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    
+    # Retry the values pandas could not parse with float(), which accepts a few more forms
+    unparsed = np.flatnonzero(np.isnan(numeric) & values.notna().to_numpy())
+    for i in unparsed:
+        qty = values.iloc[i]
+        if isinstance(qty, str) and qty.strip() == '':
+            continue
+        try:
+            numeric[i] = float(qty)
+        except (ValueError, TypeError):
+            logger.warning(f"Could not convert quantity '{qty}' to integer for EANCode {eancodes.iloc[i]}")
+    
+    invalid = np.isinf(numeric)
+    for i in np.flatnonzero(invalid):
+        logger.warning(f"Could not convert quantity '{values.iloc[i]}' to integer for EANCode {eancodes.iloc[i]}")
+    numeric[np.isnan(numeric) | invalid] = 0
+    
+    return np.clip(np.trunc(numeric), 0, None).astype(np.int64)
+
+def clean_labels(df: pd.DataFrame, ean_col: str, store_col: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the EANCode and label count of every row of a store-season combination.
+    
+    Args:
+        df (pd.DataFrame): DataFrame containing the data
+        ean_col (str): Name of the EANCode column
+        store_col (str): Name of the store column containing quantity values
+        
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Cleaned EANCode strings (object array) and
+            non-negative integer quantities
+    """
+    eancodes = clean_eancodes(df[ean_col])
+    quantities = clean_quantities(df[store_col], eancodes)
+    return eancodes.to_numpy(dtype=object), quantities
+
+def repeat_eancode_lines(df: pd.DataFrame, ean_col: str, store_col: str) -> np.ndarray:
+    """
+    Build the lines of the TXT file of a store-season combination: every EANCode
+    on its own line, repeated as many times as its quantity.
+    
+    EANCodes and quantities are cleaned column-wise and expanded with numpy.repeat.
     
-    # If exact match not found, try to find a column containing the store name
-    for col in df.columns:
-        if isinstance(col, str) and store_name in col:
-            return col
+    Args:
+        df (pd.DataFrame): DataFrame containing the data
+        ean_col (str): Name of the EANCode column
+        store_col (str): Name of the store column containing quantity values
+        
+    Returns:
+        np.ndarray: Lines of the TXT file, each ending with a newline
+    """
+    eancodes, quantities = clean_labels(df, ean_col, store_col)
+    return np.repeat(eancodes + '\n', quantities)
+
+def format_repeated_eancodes(df: pd.DataFrame, ean_col: str, store_col: str) -> str:
+    """
+    Build the TXT file content of a store-season combination.
     
-    return None
+    Args:
+        df (pd.DataFrame): DataFrame containing the data
+        ean_col (str): Name of the EANCode column
+        store_col (str): Name of the store column containing quantity values
+        
+    Returns:
+        str: Lines of the TXT file, joined into one buffer
+    """
+    return ''.join(repeat_eancode_lines(df, ean_col, store_col))
 
-def create_txt_file_with_repeated_eancodes(df: pd.DataFrame, ean_col: str, store_col: str, output_path: Path) -> None:
+def create_txt_file_with_repeated_eancodes(df: pd.DataFrame, ean_col: str, store_col: str, output_path: Path,
+                                           label_format: str = DEFAULT_LABEL_FORMAT) -> bool:
     """
     Create a text file with repeated EANCode values based on quantity values.
     
+    The content is built in memory and written to the file in a single call.
+    With a compact label format, the same labels are written in that format
+    instead (see label_formats).
+    
     Args:
         df (pd.DataFrame): DataFrame containing the data
         ean_col (str): Name of the EANCode column
         store_col (str): Name of the store column containing quantity values
         output_path (Path): Path to save the output text file
+        label_format (str): Label file format, 'txt' (default) for repeated EANCode lines
+        
+    Returns:
+        bool: True if the file was created successfully, False otherwise
     """
     try:
-        with open(output_path, 'w') as f:
-            # For each row in the DataFrame
-            for _, row in df.iterrows():
-                # Clean and format the EANCode: remove .0 suffix if present
-                eancode = str(row[ean_col]).strip()
-                if eancode.endswith('.0'):
-                    eancode = eancode[:-2]
-                
-                # Try to get the quantity as an integer
-                try:
-                    # Handle possible non-numeric or NaN values
-                    qty = row[store_col]
-                    
-                    # Handle blank spaces as zero
-                    if pd.isna(qty) or (isinstance(qty, str) and qty.strip() in ['', ' ', '  ']):
-                        qty = 0
-                    else:
-                        qty = int(float(qty))
-                    
-                    # Write the EANCode repeated qty times
-                    for _ in range(qty):
-                        f.write(f"{eancode}\n")
-                except (ValueError, TypeError):
-                    # If conversion fails, log a warning and continue
-                    logger.warning(f"Could not convert quantity '{row[store_col]}' to integer for EANCode {eancode}")
-                    continue
-        
-        logger.info(f"Created TXT file with repeated EANCodes: {output_path}")
+        with span('txt_write') as txt_span:
+            eancodes, quantities = clean_labels(df, ean_col, store_col)
+            write_labels(output_path, eancodes, quantities, label_format)
+            txt_span.add_file(output_path)
+        
+        logger.info(f"Created {label_format} label file with repeated EANCodes: {output_path}")
+        return True
     except Exception as e:
         logger.error(f"Error creating TXT file {output_path}: {e}")
+        return False
 
 def identify_required_columns(df: pd.DataFrame) -> Tuple[Optional[str], Optional[str]]:
     """
     Identify the EANCode and SEASON columns in the DataFrame.
     
     Args:
-        df (pd.DataFrame): DataFrame to search in
+        df (pd.DataFrame): DataFrame (or AllocationMatrix) to search in
         
     Returns:
         Tuple[Optional[str], Optional[str]]: The EANCode and SEASON column names, or None if not found
     """
-    ean_col = None
-    season_col = None
+    return find_required_columns(list(df.columns))
+
+def get_valid_filename(store_name: str) -> str:
+    """
+    Create a valid filename from a store name by replacing invalid characters.
+    
+    Args:
+        store_name (str): Name of the store
+        
+    Returns:
+        str: Filename-safe version of the store name
+    """
+    return store_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
+
+def get_valid_sheet_name(season) -> str:
+    """
+    Convert a SEASON value to a valid Excel sheet name.
+    
+    Args:
+        season: SEASON value to convert
+        
+    Returns:
+        str: Sheet name of at most 31 characters without invalid characters
+    """
+    sheet_name = str(season)
+    if len(sheet_name) > 31:  # Excel has a 31 character limit for sheet names
+        sheet_name = sheet_name[:31]
+    
+    # Replace any characters that aren't allowed in Excel sheet names
+    invalid_chars = [':', '\\', '/', '?', '*', '[', ']']
+    for char in invalid_chars:
+        sheet_name = sheet_name.replace(char, '_')
+    
+    return sheet_name
+
+def get_txt_filename(valid_filename: str, season, part: int = 0, part_count: int = 1,
+                     label_format: str = DEFAULT_LABEL_FORMAT) -> str:
+    """
+    Get the name of the TXT file (or TXT file part) of a store-season combination.
+    
+    Args:
+        valid_filename (str): Store name returned by get_valid_filename
+        season: SEASON value
+        part (int): Zero-based part number
+        part_count (int): Number of parts the TXT file is split into
+        label_format (str): Label file format, which sets the file suffix
+        
+    Returns:
+        str: TXT file name
+    """
+    season_str = str(season).replace(' ', '_').replace('.', '_')
+    return get_part_filename(f"{valid_filename}-{season_str}", LABEL_SUFFIXES[label_format], part, part_count)
+
+def check_label_options(label_format: str, limits: Optional[ShardLimits] = None) -> None:
+    """
+    Check that the label files can be written in a format with the given limits.
+    
+    Args:
+        label_format (str): Label file format
+        limits (Optional[ShardLimits]): Size limits of the output files
+        
+    Raises:
+        ValueError: If the format cannot be written, or a TXT line limit is set
+            for a format other than 'txt'
+    """
+    check_label_format(label_format)
+    if label_format != DEFAULT_LABEL_FORMAT and limits is not None and limits.max_lines is not None:
+        raise ValueError(f"The TXT line limit only applies to the 'txt' label format, not '{label_format}'")
+
+def get_store_output_files(store_name: str, store_df: pd.DataFrame, season_col: str,
+                           ean_col: Optional[str] = None, store_col: Optional[str] = None,
+                           limits: Optional[ShardLimits] = None,
+                           label_format: str = DEFAULT_LABEL_FORMAT) -> List[str]:
+    """
+    Get the names of the files write_store_outputs creates for a store.
+    
+    Args:
+        store_name (str): Name of the store
+        store_df (pd.DataFrame): Rows allocated to the store
+        season_col (str): Name of the SEASON column
+        ean_col (Optional[str]): Name of the EANCode column, needed with a TXT line limit
+        store_col (Optional[str]): Name of the store column, needed with a TXT line limit
+        limits (Optional[ShardLimits]): Size limits of the output files
+        label_format (str): Label file format
+        
+    Returns:
+        List[str]: The Excel file names followed by the TXT file names, and the
+            index file name when the limits are enabled
+    """
+    limits = limits or ShardLimits()
+    valid_filename = get_valid_filename(store_name)
+    row_ranges = split_ranges(len(store_df), limits.max_rows)
+    files = [get_part_filename(valid_filename, '.xlsx', part, len(row_ranges)) for part in range(len(row_ranges))]
+    
+    for season, season_df in store_df.groupby(season_col, sort=False):
+        part_count = 1
+        if limits.max_lines is not None:
+            line_count = int(clean_quantities(season_df[store_col], clean_eancodes(season_df[ean_col])).sum())
+            part_count = len(split_ranges(line_count, limits.max_lines))
+        files.extend(get_txt_filename(valid_filename, season, part, part_count, label_format)
+                     for part in range(part_count))
+    
+    if limits.enabled:
+        files.append(get_index_filename(valid_filename))
+    return files
+
+def open_excel_writer(excel_file_path: Path, excel_writer: str = DEFAULT_EXCEL_WRITER):
+    """
+    Open a workbook writer for a store file.
+    
+    Args:
+        excel_file_path (Path): Path of the xlsx file to write
+        excel_writer (str): Writer mode, "streaming" or "pandas"
+        
+    Returns:
+        Union[StreamingWorkbookWriter, pd.ExcelWriter]: Writer to use as a context manager
+    """
+    if excel_writer == 'streaming':
+        return StreamingWorkbookWriter(excel_file_path)
+    if excel_writer == 'pandas':
+        return pd.ExcelWriter(excel_file_path, engine='openpyxl')
+    raise ValueError(f"Unknown Excel writer '{excel_writer}', expected one of {EXCEL_WRITERS}")
+
+def write_excel_sheet(writer, df: pd.DataFrame, sheet_name: str) -> None:
+    """
+    Write a DataFrame to a new sheet without its index.
+    
+    Args:
+        writer (Union[StreamingWorkbookWriter, pd.ExcelWriter]): Writer from open_excel_writer
+        df (pd.DataFrame): Data to write
+        sheet_name (str): Name of the sheet
+    """
+    if isinstance(writer, StreamingWorkbookWriter):
+        writer.write_sheet(df, sheet_name)
+    else:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+def write_store_workbook(excel_file_path: Path, store_df: pd.DataFrame, season_groups: List[Tuple],
+                         excel_writer: str = DEFAULT_EXCEL_WRITER) -> None:
+    """
+    Write a store workbook: an 'ALL_SEASONS' sheet followed by one sheet per season.
+    
+    The workbook replaces an existing file only once it is complete.
+    
+    Args:
+        excel_file_path (Path): Path of the xlsx file to write
+        store_df (pd.DataFrame): Rows of the 'ALL_SEASONS' sheet
+        season_groups (List[Tuple]): SEASON value and rows of every season sheet
+        excel_writer (str): Writer mode, "streaming" (default) or "pandas"
+    """
+    with span('xlsx_write') as xlsx_span:
+        with atomic_write_path(excel_file_path) as partial_path:
+            with open_excel_writer(partial_path, excel_writer) as writer:
+                # First, save all data to a sheet named 'ALL_SEASONS'
+                write_excel_sheet(writer, store_df, 'ALL_SEASONS')
+                
+                # Then create a sheet for each unique SEASON
+                for season, season_df in season_groups:
+                    sheet_name = get_valid_sheet_name(season)
+                    
+                    # Save this season's data to its own sheet
+                    write_excel_sheet(writer, season_df, sheet_name)
+                    logger.info(f"Added sheet '{sheet_name}' with {len(season_df)} rows")
+        xlsx_span.add_file(excel_file_path)
+
+def write_txt_parts(df: pd.DataFrame, ean_col: str, store_col: str, output_dir: Path,
+                    valid_filename: str, season, max_lines: Optional[int] = None,
+                    label_format: str = DEFAULT_LABEL_FORMAT) -> List[Dict]:
+    """
+    Write the TXT file of a store-season combination, split into parts of at most
+    max_lines lines when it is longer.
+    
+    The lines are built once and every part is written from a slice of them.
+    
+    Args:
+        df (pd.DataFrame): Rows of the store-season combination
+        ean_col (str): Name of the EANCode column
+        store_col (str): Name of the store column containing quantity values
+        output_dir (Path): Directory to save the TXT files
+        valid_filename (str): Store name returned by get_valid_filename
+        season: SEASON value
+        max_lines (Optional[int]): Maximum lines per file; None for a single file
+        label_format (str): Label file format; only 'txt' files are split
+        
+    Returns:
+        List[Dict]: Index entry of every part, with its line range
+        
+    Raises:
+        StoreWriteError: If a label file could not be written
+    """
+    eancodes, quantities = clean_labels(df, ean_col, store_col)
+    line_count = int(quantities.sum())
+    line_ranges = split_ranges(line_count, max_lines)
+    
+    if len(line_ranges) == 1:
+        file_name = get_txt_filename(valid_filename, season, label_format=label_format)
+        if not create_txt_file_with_repeated_eancodes(df, ean_col, store_col, output_dir / file_name, label_format):
+            raise StoreWriteError(f"Could not write the label file {output_dir / file_name}")
+        return [make_part_entry(file_name, 0, line_count, 'line', season=str(season))]
+    
+    lines = np.repeat(eancodes + '\n', quantities)
+    parts = []
+    for part, (start, stop) in enumerate(line_ranges):
+        file_name = get_txt_filename(valid_filename, season, part, len(line_ranges))
+        with span('txt_write') as txt_span:
+            with atomic_write_path(output_dir / file_name) as partial_path:
+                with open(partial_path, 'w') as f:
+                    f.write(''.join(lines[start:stop]))
+            txt_span.add_file(output_dir / file_name)
+        parts.append(make_part_entry(file_name, start, stop, 'line', season=str(season)))
+    
+    logger.info(f"Created {len(line_ranges)} TXT files with {line_count} repeated EANCodes for season {season}")
+    return parts
+
+def write_store_outputs(store_name: str, store_df: pd.DataFrame, ean_col: str, season_col: str,
+                        store_col: str, output_dir: Path, excel_writer: str = DEFAULT_EXCEL_WRITER,
+                        limits: Optional[ShardLimits] = None,
+                        label_format: str = DEFAULT_LABEL_FORMAT) -> bool:
+    """
+    Write the Excel file and the per-season TXT files for a single store.
+    
+    The Excel file contains an 'ALL_SEASONS' sheet followed by one sheet per
+    distinct SEASON value (in order of first appearance). A TXT file with
+    repeated EANCode values is created for every store-season combination.
+    
+    With size limits, stores with more rows than max_rows are written as several
+    '<store>-partNN.xlsx' workbooks of consecutive rows, TXT files with more lines
+    than max_lines as several '<store>-<season>-partNN.txt' files, and an index
+    file lists every part with its row or line range.
+    
+    Args:
+        store_name (str): Name of the store
+        store_df (pd.DataFrame): Rows allocated to the store, with the EANCode,
+            SEASON and store quantity columns
+        ean_col (str): Name of the EANCode column
+        season_col (str): Name of the SEASON column
+        store_col (str): Name of the store column containing quantity values
+        output_dir (Path): Directory to save the output files
+        excel_writer (str): Writer mode, "streaming" (default) or "pandas"
+        limits (Optional[ShardLimits]): Size limits of the output files
+        label_format (str): Label file format of the per-season files
+        
+    Returns:
+        bool: True if the files were written successfully, False otherwise
+    """
+    limits = limits or ShardLimits()
+    valid_filename = get_valid_filename(store_name)
+    excel_file_path = output_dir / f"{valid_filename}.xlsx"
+    
+    # Split the store rows by SEASON, keeping the order of first appearance
+    season_groups = list(store_df.groupby(season_col, sort=False))
+    logger.info(f"Found {len(season_groups)} unique SEASON values for store {store_name}")
+    
+    try:
+        if not limits.enabled:
+            write_store_workbook(excel_file_path, store_df, season_groups, excel_writer)
+            
+            # Create a TXT file with repeated EANCodes for every store-season combination
+            for season, season_df in season_groups:
+                txt_file_path = output_dir / get_txt_filename(valid_filename, season, label_format=label_format)
+                if not create_txt_file_with_repeated_eancodes(
+                    season_df, ean_col, store_col, txt_file_path, label_format
+                ):
+                    raise StoreWriteError(f"Could not write the label file {txt_file_path}")
+            
+            logger.info(f"Saved data for store {store_name} to {excel_file_path} with {len(season_groups)} season sheets")
+            return True
+        
+        row_ranges = split_ranges(len(store_df), limits.max_rows)
+        workbook_parts = []
+        for part, (start, stop) in enumerate(row_ranges):
+            file_name = get_part_filename(valid_filename, '.xlsx', part, len(row_ranges))
+            excel_file_path = output_dir / file_name
+            part_df = store_df.iloc[start:stop]
+            part_groups = season_groups if len(row_ranges) == 1 else list(part_df.groupby(season_col, sort=False))
+            write_store_workbook(excel_file_path, part_df, part_groups, excel_writer)
+            workbook_parts.append(make_part_entry(file_name, start, stop, 'row'))
+        
+        txt_parts = []
+        for season, season_df in season_groups:
+            txt_parts.extend(write_txt_parts(
+                season_df, ean_col, store_col, output_dir, valid_filename, season, limits.max_lines, label_format
+            ))
+        
+        index_path = write_shard_index(output_dir, valid_filename, store_name, limits, workbook_parts, txt_parts)
+        logger.info(f"Saved data for store {store_name} to {len(workbook_parts)} workbook(s) and "
+                    f"{len(txt_parts)} TXT file(s), listed in {index_path}")
+        return True
+    except PermissionError:
+        logger.error(f"Permission denied when writing to file {excel_file_path}. The file may be open in another program.")
+    except Exception as e:
+        logger.error(f"Error saving data for store {store_name}: {e}")
+    return False
+
+def write_store_outputs_checked(*args, **kwargs) -> None:
+    """
+    Call write_store_outputs, raising instead of returning False.
+    
+    Raises:
+        StoreWriteError: If the files of the store could not be written
+    """
+    if not write_store_outputs(*args, **kwargs):
+        raise StoreWriteError(f"Could not write the files of store {args[0]}, see the log for details")
+
+def write_label_file(output_path: Path, content) -> None:
+    """
+    Write the label file content prepared by plan_store_writes.
+    
+    Args:
+        output_path (Path): Path of the label file
+        content (Union[str, bytes]): Content built by encode_label_file
+    """
+    with span('txt_write') as txt_span:
+        txt_span.add_bytes(write_label_content(output_path, content))
+    logger.info(f"Created label file with repeated EANCodes: {output_path}")
+
+def plan_store_writes(store_name: str, store_df: pd.DataFrame, ean_col: str, season_col: str,
+                      store_col: str, output_dir: Path, excel_writer: str = DEFAULT_EXCEL_WRITER,
+                      limits: Optional[ShardLimits] = None,
+                      label_format: str = DEFAULT_LABEL_FORMAT) -> List[WriteJob]:
+    """
+    Prepare the writes of the files of a single store for an output pipeline.
+    
+    The season groups and the label file contents are computed here, so that the
+    writes only serialize the workbook and put the contents on disk. The writes
+    produce the same files as write_store_outputs and raise on errors. A store
+    with size limits is written by a single write_store_outputs call.
+    
+    Args:
+        Same as write_store_outputs
+        
+    Returns:
+        List[WriteJob]: The workbook write followed by one write per label file
+    """
+    if limits is not None and limits.enabled:
+        return [(write_store_outputs_checked, (store_name, store_df, ean_col, season_col, store_col,
+                                               output_dir, excel_writer, limits, label_format))]
+    
+    valid_filename = get_valid_filename(store_name)
+    season_groups = list(store_df.groupby(season_col, sort=False))
+    logger.info(f"Found {len(season_groups)} unique SEASON values for store {store_name}")
     
-    for col in df.columns:
-        if isinstance(col, str):
-            if 'EANCode' in col:
-                ean_col = col
-            elif 'SEASON' in col:
-                season_col = col
+    # Seasons whose file names clash keep the content of the last one, as when
+    # the files are written in order
+    label_files = {}
+    for season, season_df in season_groups:
+        with span('txt_encode'):
+            eancodes, quantities = clean_labels(season_df, ean_col, store_col)
+            content = encode_label_file(eancodes, quantities, label_format)
+        label_files[output_dir / get_txt_filename(valid_filename, season, label_format=label_format)] = content
     
-    return ean_col, season_col
+    jobs = [(write_store_workbook, (output_dir / f"{valid_filename}.xlsx", store_df, season_groups, excel_writer))]
+    jobs.extend((write_label_file, (path, content)) for path, content in label_files.items())
+    return jobs
 
-def process_store(store_name: str, xlsx_df: pd.DataFrame, output_dir: Path) -> None:
+def process_store(store_name: str, xlsx_df: pd.DataFrame, output_dir: Path,
+                  limits: Optional[ShardLimits] = None, label_format: str = DEFAULT_LABEL_FORMAT) -> None:
     """
     Process a single store by finding matching column in the xlsx data,
     extracting EANCode and SEASON data for that store, and creating sheets
@@ -121,6 +574,9 @@ def process_store(store_name: str, xlsx_df: pd.DataFrame, output_dir: Path) -> N
         store_name (str): Name of the store to search for
         xlsx_df (pd.DataFrame): DataFrame containing the Excel data
         output_dir (Path): Directory to save the output file
+        limits (Optional[ShardLimits]): Size limits of the output files; oversized
+            files are split into parts
+        label_format (str): Label file format of the per-season files
     """
     # Find column containing the store name
     store_col = find_store_column(xlsx_df, store_name)
@@ -135,63 +591,15 @@ def process_store(store_name: str, xlsx_df: pd.DataFrame, output_dir: Path) -> N
             logger.warning(f"Could not find EANCode or SEASON columns for store {store_name}")
             return
         
-        # Create a dataframe with the required columns
-        result_columns = [ean_col, season_col, store_col]
-        result_df = xlsx_df[result_columns].copy()
-        
-        # Filter rows where the store column has a value
-        filtered_df = result_df[result_df[store_col].notna()]
+        with span('filter'):
+            # Select the required columns of the rows where the store column has a value
+            result_columns = [ean_col, season_col, store_col]
+            filtered_df = xlsx_df.loc[xlsx_df[store_col].notna(), result_columns]
         
         # If we have data, create an Excel file with separate sheets for each SEASON
         if not filtered_df.empty:
-            # Create valid filename from store name (replace invalid characters)
-            valid_filename = store_name.replace('/', '_').replace('\\', '_').replace(' ', '_')
-            excel_file_path = output_dir / f"{valid_filename}.xlsx"
-            
-            # Get unique SEASON values
-            unique_seasons = filtered_df[season_col].dropna().unique()
-            logger.info(f"Found {len(unique_seasons)} unique SEASON values for store {store_name}")
-            
-            try:
-                # Create a Pandas ExcelWriter
-                with pd.ExcelWriter(excel_file_path, engine='openpyxl') as writer:
-                    # First, save all data to a sheet named 'ALL_SEASONS'
-                    filtered_df.to_excel(writer, sheet_name='ALL_SEASONS', index=False)
-                    
-                    # Then create a sheet for each unique SEASON
-                    for season in unique_seasons:
-                        # Filter rows for this SEASON
-                        season_df = filtered_df[filtered_df[season_col] == season]
-                        
-                        # Convert season to a valid sheet name if needed
-                        sheet_name = str(season)
-                        if len(sheet_name) > 31:  # Excel has a 31 character limit for sheet names
-                            sheet_name = sheet_name[:31]
-                        
-                        # Replace any characters that aren't allowed in Excel sheet names
-                        invalid_chars = [':', '\\', '/', '?', '*', '[', ']']
-                        for char in invalid_chars:
-                            sheet_name = sheet_name.replace(char, '_')
-                        
-                        # Save this season's data to its own sheet
-                        season_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                        logger.info(f"Added sheet '{sheet_name}' with {len(season_df)} rows")
-                        
-                        # Create TXT file with repeated EANCodes for this store-season combination
-                        season_str = str(season).replace(' ', '_').replace('.', '_')
-                        txt_filename = f"{valid_filename}-{season_str}.txt"
-                        txt_file_path = output_dir / txt_filename
-                        
-                        # Create the TXT file with repeated EANCodes
-                        create_txt_file_with_repeated_eancodes(
-                            season_df, ean_col, store_col, txt_file_path
-                        )
-                
-                logger.info(f"Saved data for store {store_name} to {excel_file_path} with {len(unique_seasons)} season sheets")
-            except PermissionError:
-                logger.error(f"Permission denied when writing to file {excel_file_path}. The file may be open in another program.")
-            except Exception as e:
-                logger.error(f"Error saving data for store {store_name}: {e}")
+            write_store_outputs(store_name, filtered_df, ean_col, season_col, store_col, output_dir,
+                                limits=limits, label_format=label_format)
         else:
             logger.warning(f"Store '{store_name}' found, but no data available")
     else:
@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming engine module for processing workbooks larger than memory.
+
+This module provides functionality to:
+1. Read the PRE ALLOCATION sheet in chunks of rows, converting only the EANCode,
+   SEASON and store columns
+2. Append the rows of every chunk to the per-store/per-season TXT files and to
+   on-disk spools of the store workbook rows, partitioned by SEASON value, as
+   the chunks are read
+3. Write the store workbooks from their spools once the whole sheet is read,
+   reading every spooled row once for the 'ALL_SEASONS' sheet and once for
+   its season sheet
+4. Move the finished files into the output directory in stores list order,
+   splitting oversized files into size-bounded parts when limits are given
+
+Peak memory is bounded by the chunk size, not by the size of the workbook.
+The output files are the same as those of the allocation engine, except that
+numeric cells keep the type they have in their chunk (see XlsxSheetReader.iter_frames).
+"""
+
+import os
+import heapq
+import pickle
+import shutil
+import logging
+import tempfile
+import zipfile
+import itertools
+import pandas as pd
+from pathlib import Path
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.core.processors.allocation_engine import (
+    STATUS_WRITTEN,
+    STATUS_NOT_FOUND,
+    STATUS_AMBIGUOUS,
+    STATUS_EMPTY,
+    STATUS_FAILED,
+    ProgressCallback
+)
+from src.core.processors.store_processor import (
+    identify_required_columns,
+    get_valid_filename,
+    get_valid_sheet_name,
+    get_txt_filename,
+    clean_labels,
+    check_label_options
+)
+from src.core.utils.file_utils import get_allocation_columns
+from src.core.utils.instrumentation import span
+from src.core.utils.atomic_files import atomic_write_path
+from src.core.utils.label_formats import DEFAULT_LABEL_FORMAT, LABEL_SUFFIXES, write_labels
+from src.core.utils.output_shards import ShardLimits, split_ranges, get_part_filename, make_part_entry, write_shard_index
+from src.core.utils.store_index import StoreColumnIndex, log_store_resolution
+from src.core.utils.xlsx_reader import XlsxSheetReader, UnsupportedWorkbookError, resolve_sheet_name
+from src.core.utils.xlsx_writer import StreamingWorkbookWriter, iter_frame_rows, to_cell_value
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_ROWS = 5000
+
+# Prefix of the staging directory created in the output directory during a run
+STAGING_PREFIX = '.streaming-'
+
+
+class ColumnSpool:
+    """Rows of one store column, staged on disk while the sheet is streamed."""
+
+    def __init__(self, store_col: str, ean_col: str, season_col: str, staging_dir: Path,
+                 label_format: str = DEFAULT_LABEL_FORMAT):
+        """
+        Create the staging directory of the store column.
+
+        Args:
+            store_col (str): Name of the store column
+            ean_col (str): Name of the EANCode column
+            season_col (str): Name of the SEASON column
+            staging_dir (Path): Directory for the spool and TXT files of the column
+            label_format (str): Format of the staged label files
+        """
+        self.store_col = store_col
+        self.ean_col = ean_col
+        self.season_col = season_col
+        self.staging_dir = staging_dir
+        self.label_format = label_format
+        # Spool of the rows of every SEASON value, blank seasons included
+        self.spool_paths: Dict[Any, Path] = {}
+        # Staged TXT file of every SEASON value, in order of first appearance, and
+        # its number of repeated EANCode lines
+        self.seasons: Dict[Any, Path] = {}
+        self.line_counts: Dict[Any, int] = {}
+        self.row_count = 0
+        staging_dir.mkdir()
+
+    def append(self, store_df: pd.DataFrame) -> None:
+        """
+        Add the rows of one chunk where the store column has a value.
+
+        The rows are appended to the workbook spool of their season and every
+        season's EANCodes to the staged TXT file of the season.
+
+        Args:
+            store_df (pd.DataFrame): EANCode, SEASON and store columns of the rows
+        """
+        partitions: Dict[Any, List[Tuple[int, List[Any]]]] = {}
+        for position, row in enumerate(iter_frame_rows(store_df), self.row_count):
+            partitions.setdefault(row[1], []).append((position, row))
+        # Every spool is a sequence of pickled lists of (row position, row), read back by iter_spool
+        for season, season_rows in partitions.items():
+            spool_path = self.spool_paths.get(season)
+            if spool_path is None:
+                spool_path = self.spool_paths[season] = self.staging_dir / f"rows-{len(self.spool_paths)}.spool"
+            with open(spool_path, 'ab') as spool:
+                pickle.dump(season_rows, spool, protocol=pickle.HIGHEST_PROTOCOL)
+        self.row_count += len(store_df)
+
+        for season, season_df in store_df.groupby(self.season_col, sort=False):
+            key = to_cell_value(season)
+            txt_path = self.seasons.get(key)
+            if txt_path is None:
+                suffix = LABEL_SUFFIXES[self.label_format]
+                txt_path = self.seasons[key] = self.staging_dir / f"season-{len(self.seasons)}{suffix}"
+                self.line_counts[key] = 0
+            with span('txt_write') as txt_span:
+                eancodes, quantities = clean_labels(season_df, self.ean_col, self.store_col)
+                txt_span.add_bytes(write_labels(txt_path, eancodes, quantities, self.label_format, append=True))
+            self.line_counts[key] += int(quantities.sum())
+
+    @staticmethod
+    def iter_spool(spool_path: Path) -> Iterator[Tuple[int, List[Any]]]:
+        """
+        Read the rows of one spool back in sheet order.
+
+        Args:
+            spool_path (Path): Path of the spool
+
+        Yields:
+            Tuple[int, List[Any]]: Row position and cell values of the EANCode,
+                SEASON and store columns
+        """
+        with open(spool_path, 'rb') as spool:
+            while True:
+                try:
+                    rows = pickle.load(spool)
+                except EOFError:
+                    return
+                yield from rows
+
+    def iter_rows(self) -> Iterator[List[Any]]:
+        """
+        Read the spooled rows of all seasons back in sheet order.
+
+        Yields:
+            List[Any]: Cell values of the EANCode, SEASON and store columns
+        """
+        spools = [self.iter_spool(spool_path) for spool_path in self.spool_paths.values()]
+        for _, row in heapq.merge(*spools, key=itemgetter(0)):
+            yield row
+
+    def iter_season_rows(self, season) -> Iterator[List[Any]]:
+        """
+        Read the spooled rows of one season back in sheet order.
+
+        Args:
+            season: SEASON value, as a key of seasons
+
+        Yields:
+            List[Any]: Cell values of the EANCode, SEASON and store columns
+        """
+        for _, row in self.iter_spool(self.spool_paths[season]):
+            yield row
+
+    @property
+    def header(self) -> List[Any]:
+        """Cell values of the header row of the store workbook."""
+        return [to_cell_value(col) for col in (self.ean_col, self.season_col, self.store_col)]
+
+    def write_workbook(self, excel_file_path: Path) -> None:
+        """
+        Write the store workbook from the spool: an 'ALL_SEASONS' sheet followed
+        by one sheet per SEASON value, in order of first appearance.
+
+        Args:
+            excel_file_path (Path): Path of the xlsx file to write
+        """
+        with StreamingWorkbookWriter(excel_file_path) as writer:
+            writer.write_rows(self.header, self.iter_rows(), 'ALL_SEASONS')
+            for season in self.seasons:
+                writer.write_rows(self.header, self.iter_season_rows(season), get_valid_sheet_name(season))
+
+    def write_workbook_parts(self, staging_path: Path, valid_filename: str, max_rows: int) -> List[Path]:
+        """
+        Write the store workbook as parts of at most max_rows consecutive rows,
+        with only one part's rows in memory at a time.
+
+        Args:
+            staging_path (Path): Directory to write the parts to
+            valid_filename (str): Store name returned by get_valid_filename
+            max_rows (int): Maximum rows per part
+
+        Returns:
+            List[Path]: Paths of the parts, in row order
+        """
+        row_ranges = split_ranges(self.row_count, max_rows)
+        rows = self.iter_rows()
+        paths = []
+        for part, (start, stop) in enumerate(row_ranges):
+            part_rows = list(itertools.islice(rows, stop - start))
+            path = staging_path / get_part_filename(valid_filename, '.xlsx', part, len(row_ranges))
+            with StreamingWorkbookWriter(path) as writer:
+                writer.write_rows(self.header, part_rows, 'ALL_SEASONS')
+                for season in dict.fromkeys(row[1] for row in part_rows if row[1] is not None):
+                    season_rows = (row for row in part_rows if row[1] == season)
+                    writer.write_rows(self.header, season_rows, get_valid_sheet_name(season))
+            paths.append(path)
+        return paths
+
+    def write_txt_parts(self, season, target_dir: Path, valid_filename: str, max_lines: int) -> List[Dict]:
+        """
+        Split the staged TXT file of a season into parts of at most max_lines lines.
+
+        A file that fits is copied whole, in any label format.
+
+        Args:
+            season: SEASON value, as a key of seasons
+            target_dir (Path): Directory to write the parts to
+            valid_filename (str): Store name returned by get_valid_filename
+            max_lines (int): Maximum lines per part
+
+        Returns:
+            List[Dict]: Index entry of every part, with its line range
+        """
+        line_ranges = split_ranges(self.line_counts[season], max_lines)
+        if len(line_ranges) == 1:
+            file_name = get_txt_filename(valid_filename, season, label_format=self.label_format)
+            with atomic_write_path(target_dir / file_name) as partial_path:
+                shutil.copyfile(self.seasons[season], partial_path)
+            return [make_part_entry(file_name, 0, self.line_counts[season], 'line', season=str(season))]
+
+        parts = []
+        with open(self.seasons[season]) as source:
+            for part, (start, stop) in enumerate(line_ranges):
+                file_name = get_txt_filename(valid_filename, season, part, len(line_ranges))
+                with atomic_write_path(target_dir / file_name) as partial_path:
+                    with open(partial_path, 'w') as target:
+                        target.writelines(itertools.islice(source, stop - start))
+                parts.append(make_part_entry(file_name, start, stop, 'line', season=str(season)))
+        return parts
+
+
+def publish_store_files(store_name: str, spool: ColumnSpool, output_dir: Path, keep_staged: bool,
+                        limits: Optional[ShardLimits] = None) -> None:
+    """
+    Write the workbook of a store and move its files into the output directory.
+
+    Args:
+        store_name (str): Name of the store
+        spool (ColumnSpool): Staged rows of the store column
+        output_dir (Path): Directory to save the output files
+        keep_staged (bool): Copy the staged TXT files instead of moving them,
+            because another store uses the same column
+        limits (Optional[ShardLimits]): Size limits of the output files
+    """
+    if limits is not None and limits.enabled:
+        publish_store_parts(store_name, spool, output_dir, limits)
+        return
+
+    valid_filename = get_valid_filename(store_name)
+    excel_file_path = output_dir / f"{valid_filename}.xlsx"
+    staged_excel_path = spool.staging_dir / f"{valid_filename}.xlsx"
+
+    with span('xlsx_write') as xlsx_span:
+        spool.write_workbook(staged_excel_path)
+        xlsx_span.add_file(staged_excel_path)
+    os.replace(staged_excel_path, excel_file_path)
+
+    # Seasons are published in order of first appearance, so a later season wins
+    # a TXT file name clash as it does in the allocation engine
+    for season, txt_path in spool.seasons.items():
+        target = output_dir / get_txt_filename(valid_filename, season, label_format=spool.label_format)
+        if keep_staged:
+            with atomic_write_path(target) as partial_path:
+                shutil.copyfile(txt_path, partial_path)
+        else:
+            os.replace(txt_path, target)
+    logger.info(f"Saved data for store {store_name} to {excel_file_path} with {len(spool.seasons)} season sheets")
+
+
+def publish_store_parts(store_name: str, spool: ColumnSpool, output_dir: Path, limits: ShardLimits) -> None:
+    """
+    Write the files of a store split into size-bounded parts, with the index file
+    listing the parts.
+
+    The staged TXT files are only read, so stores sharing the column can publish
+    them again.
+
+    Args:
+        store_name (str): Name of the store
+        spool (ColumnSpool): Staged rows of the store column
+        output_dir (Path): Directory to save the output files
+        limits (ShardLimits): Size limits of the output files
+    """
+    valid_filename = get_valid_filename(store_name)
+    parts_dir = spool.staging_dir / 'parts'
+    parts_dir.mkdir(exist_ok=True)
+
+    with span('xlsx_write') as xlsx_span:
+        workbook_paths = spool.write_workbook_parts(parts_dir, valid_filename, limits.max_rows or spool.row_count)
+        for path in workbook_paths:
+            xlsx_span.add_file(path)
+    row_ranges = split_ranges(spool.row_count, limits.max_rows)
+    workbook_parts = []
+    for path, (start, stop) in zip(workbook_paths, row_ranges):
+        os.replace(path, output_dir / path.name)
+        workbook_parts.append(make_part_entry(path.name, start, stop, 'row'))
+
+    txt_parts = []
+    with span('txt_write') as txt_span:
+        for season in spool.seasons:
+            parts = spool.write_txt_parts(season, output_dir, valid_filename,
+                                          limits.max_lines or max(spool.line_counts[season], 1))
+            for part in parts:
+                txt_span.add_file(output_dir / part['file'])
+            txt_parts.extend(parts)
+
+    index_path = write_shard_index(output_dir, valid_filename, store_name, limits, workbook_parts, txt_parts)
+    logger.info(f"Saved data for store {store_name} to {len(workbook_parts)} workbook(s) and "
+                f"{len(txt_parts)} TXT file(s), listed in {index_path}")
+
+
+def process_workbook_streaming(file_path: Union[str, Path], store_names: List[str], output_dir: Path,
+                               sheet_name: str = "PRE ALLOCATION", chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                               progress_callback: Optional[ProgressCallback] = None,
+                               limits: Optional[ShardLimits] = None,
+                               label_format: str = DEFAULT_LABEL_FORMAT) -> Dict[str, str]:
+    """
+    Process all stores while streaming the sheet in chunks of rows.
+
+    The output files are staged in a hidden directory inside the output directory
+    and only moved into place once the whole sheet has been read, so a failed run
+    leaves the existing outputs untouched.
+
+    Args:
+        file_path (Union[str, Path]): Path to the xlsx file
+        store_names (List[str]): Names of the stores to process
+        output_dir (Path): Directory to save the output files
+        sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+        chunk_rows (int): Number of sheet rows held in memory at a time
+        progress_callback (Optional[ProgressCallback]): Called with the store name,
+            the number of processed stores and the total after each store
+        limits (Optional[ShardLimits]): Size limits of the output files; oversized
+            files are split into parts listed in a per-store index file
+        label_format (str): Format of the per-season label files (see label_formats)
+
+    Returns:
+        Dict[str, str]: Mapping of store name to its processing status
+
+    Raises:
+        UnsupportedWorkbookError: If the workbook uses a feature the XML reader
+            does not handle; no output file is changed in that case
+        ValueError: If the label format cannot be written with the limits
+    """
+    check_label_options(label_format, limits)
+    output_dir = Path(output_dir)
+    staging_root = Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=output_dir))
+    try:
+        with XlsxSheetReader(file_path) as reader:
+            resolved_name = resolve_sheet_name(sheet_name, reader.sheet_names)
+            header = reader.read_header(resolved_name)
+
+            with span('resolve'):
+                resolution = StoreColumnIndex(header).resolve_all(store_names)
+            log_store_resolution(resolution)
+            ean_col, season_col = identify_required_columns(pd.DataFrame(columns=header))
+
+            spools = {}
+            if ean_col and season_col:
+                matched_columns = dict.fromkeys(col for col in resolution.columns.values() if col is not None)
+                spools = {
+                    store_col: ColumnSpool(store_col, ean_col, season_col, staging_root / f"column-{i}",
+                                           label_format)
+                    for i, store_col in enumerate(matched_columns)
+                }
+
+            if spools:
+                chunks = reader.iter_frames(
+                    resolved_name, chunk_rows, lambda columns: get_allocation_columns(columns, store_names)
+                )
+                for chunk in chunks:
+                    for store_col, spool in spools.items():
+                        with span('filter'):
+                            store_df = chunk.loc[chunk[store_col].notna(), [ean_col, season_col, store_col]]
+                        if not store_df.empty:
+                            spool.append(store_df)
+                    logger.info(f"Streamed sheet rows {chunk.index.start + 1}-{chunk.index.stop}")
+    except zipfile.BadZipFile as e:
+        shutil.rmtree(staging_root, ignore_errors=True)
+        raise UnsupportedWorkbookError(f"Not an xlsx file: {e}")
+    except BaseException:
+        shutil.rmtree(staging_root, ignore_errors=True)
+        raise
+
+    try:
+        statuses = {}
+        total_stores = len(store_names)
+        # Index of the last store of every column, which may move the staged files
+        last_users = {resolution.columns[store_name]: i for i, store_name in enumerate(store_names)}
+
+        for i, store_name in enumerate(store_names):
+            store_col = resolution.columns[store_name]
+
+            if store_name in resolution.ambiguous:
+                logger.warning(f"Store '{store_name}' skipped: it matches several columns")
+                statuses[store_name] = STATUS_AMBIGUOUS
+            elif store_col is None:
+                logger.warning(f"Store '{store_name}' not found in xlsx column headers")
+                statuses[store_name] = STATUS_NOT_FOUND
+            elif not ean_col or not season_col:
+                logger.warning(f"Could not find EANCode or SEASON columns for store {store_name}")
+                statuses[store_name] = STATUS_FAILED
+            elif spools[store_col].row_count == 0:
+                logger.warning(f"Store '{store_name}' found, but no data available")
+                statuses[store_name] = STATUS_EMPTY
+            else:
+                logger.info(f"Found column matching store '{store_name}': {store_col}")
+                try:
+                    publish_store_files(store_name, spools[store_col], output_dir, last_users[store_col] != i,
+                                        limits)
+                    statuses[store_name] = STATUS_WRITTEN
+                except PermissionError:
+                    logger.error(f"Permission denied when writing the files of store {store_name}. "
+                                 f"A file may be open in another program.")
+                    statuses[store_name] = STATUS_FAILED
+                except Exception as e:
+                    logger.error(f"Error saving data for store {store_name}: {e}")
+                    statuses[store_name] = STATUS_FAILED
+
+            if progress_callback:
+                progress_callback(store_name, i + 1, total_stores)
+        return statuses
+    finally:
+        shutil.rmtree(staging_root, ignore_errors=True)
@@ -0,0 +1,428 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Allocation matrix module for a compact typed representation of the allocation sheet.
+
+This module provides functionality to:
+1. Convert the EANCode, SEASON and store columns of the PRE ALLOCATION sheet
+   into typed arrays: EANCodes as uint64, seasons as categorical codes and the
+   store quantities as a sparse int32 matrix in compressed sparse column (CSC)
+   layout, which only stores the cells that hold a value
+2. Build the matrix row by row while the sheet is streamed, so that the sheet
+   is never held as a DataFrame
+3. Rebuild the rows allocated to a store from its CSC slice, with the same
+   values and dtypes as filtering the original DataFrame
+
+The loaders return the matrix instead of the parsed DataFrame (see
+file_utils.load_allocation_sheet), so a run only keeps the typed arrays of the
+sheet in memory while it writes the stores. Store columns without any quantity
+are left out of the matrix.
+
+Sheets whose values cannot be represented exactly (text EANCodes, fractional
+or text quantities) raise MatrixConversionError so that callers can fall back
+to the DataFrame.
+"""
+
+import logging
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Season code of a blank SEASON cell
+MISSING_SEASON = -1
+
+
+class MatrixConversionError(ValueError):
+    """Raised when a sheet cannot be represented exactly by an AllocationMatrix."""
+
+
+def to_eancode_array(values: pd.Series) -> np.ndarray:
+    """
+    Convert an EANCode column to uint64.
+
+    Args:
+        values (pd.Series): Numeric EANCode column
+
+    Returns:
+        np.ndarray: EANCodes as uint64
+
+    Raises:
+        MatrixConversionError: If the column is not numeric or holds blank,
+            negative or fractional values
+    """
+    if values.dtype.kind not in 'iuf':
+        raise MatrixConversionError(f"EANCode column has non-numeric dtype {values.dtype}")
+
+    array = values.to_numpy()
+    if values.dtype.kind == 'f':
+        # Floats are only exact up to 2**53
+        if not (np.isfinite(array).all() and (array == np.trunc(array)).all()
+                and (array >= 0).all() and (array <= 2 ** 53).all()):
+            raise MatrixConversionError("EANCode column has blank, fractional or out of range values")
+    elif values.dtype.kind == 'i' and (array < 0).any():
+        raise MatrixConversionError("EANCode column has negative values")
+    return array.astype(np.uint64)
+
+
+def to_quantity_entries(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the row positions and int32 quantities of the non-blank cells of a store column.
+
+    Args:
+        values (pd.Series): Numeric store column
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Row positions in sheet order and their quantities
+
+    Raises:
+        MatrixConversionError: If the column is not numeric or holds fractional,
+            infinite or out of range values
+    """
+    if values.dtype.kind not in 'iuf':
+        raise MatrixConversionError(f"Store column '{values.name}' has non-numeric dtype {values.dtype}")
+
+    array = values.to_numpy()
+    if values.dtype.kind == 'f':
+        rows = np.flatnonzero(~np.isnan(array))
+        present = array[rows]
+        if not (np.isfinite(present).all() and (present == np.trunc(present)).all()):
+            raise MatrixConversionError(f"Store column '{values.name}' has fractional or infinite quantities")
+    else:
+        rows = np.arange(len(array))
+        present = array
+
+    limits = np.iinfo(np.int32)
+    if len(present) and (present.min() < limits.min or present.max() > limits.max):
+        raise MatrixConversionError(f"Store column '{values.name}' has quantities outside the int32 range")
+    return rows, present.astype(np.int32)
+
+
+def to_season_codes(values: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Convert a SEASON column to categorical codes.
+
+    Args:
+        values (pd.Series): SEASON column
+
+    Returns:
+        Tuple[np.ndarray, pd.Index]: int32 codes (MISSING_SEASON for blanks)
+            and the distinct seasons in order of first appearance
+
+    Raises:
+        MatrixConversionError: If an object column mixes value types, which
+            categorical codes could not restore
+    """
+    codes, seasons = pd.factorize(values, sort=False)
+    if values.dtype == object and len({type(season) for season in seasons}) > 1:
+        raise MatrixConversionError("SEASON column mixes value types")
+    return codes.astype(np.int32), seasons
+
+
+@dataclass
+class AllocationMatrix:
+    """
+    Typed representation of the EANCode, SEASON and store columns of the sheet.
+
+    Row i of the matrix is row i of the sheet. The quantities are stored in
+    CSC layout: the non-blank cells of store column j are at positions
+    quantity_indptr[j] to quantity_indptr[j + 1] of quantity_rows (their row
+    positions, in sheet order) and quantity_values (their quantities). Explicit
+    zeros are stored cells; blank cells are not stored at all.
+    """
+
+    ean_col: str
+    season_col: str
+    store_columns: List[str]
+    eancodes: np.ndarray
+    season_codes: np.ndarray
+    seasons: pd.Index
+    quantity_indptr: np.ndarray
+    quantity_rows: np.ndarray
+    quantity_values: np.ndarray
+    ean_dtype: np.dtype
+    season_dtype: object
+    quantity_dtypes: Dict[str, np.dtype]
+    # Every column of the loaded sheet, so that stores resolve as against the DataFrame
+    columns: List[Any] = field(default_factory=list)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, ean_col: str, season_col: str,
+                   store_columns: Optional[List[str]] = None) -> 'AllocationMatrix':
+        """
+        Build the matrix from the allocation sheet.
+
+        Args:
+            df (pd.DataFrame): DataFrame containing the Excel data
+            ean_col (str): Name of the EANCode column
+            season_col (str): Name of the SEASON column
+            store_columns (Optional[List[str]]): Unique store columns to include;
+                all other columns if None
+
+        Returns:
+            AllocationMatrix: The typed sheet
+
+        Raises:
+            MatrixConversionError: If a value cannot be represented exactly
+        """
+        if store_columns is None:
+            store_columns = [col for col in df.columns if col not in (ean_col, season_col)]
+        # Empty columns hold no quantity, so their values are not checked
+        store_columns = [store_col for store_col in store_columns if df[store_col].notna().any()]
+
+        eancodes = to_eancode_array(df[ean_col])
+        season_codes, seasons = to_season_codes(df[season_col])
+        entries = [to_quantity_entries(df[store_col]) for store_col in store_columns]
+        indptr = np.zeros(len(store_columns) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(rows) for rows, _ in entries])
+        row_dtype = np.int32 if len(df) <= np.iinfo(np.int32).max else np.int64
+        rows = np.concatenate([np.empty(0, dtype=row_dtype)] + [rows.astype(row_dtype) for rows, _ in entries])
+        values = np.concatenate([np.empty(0, dtype=np.int32)] + [values for _, values in entries])
+
+        return cls(
+            ean_col=ean_col,
+            season_col=season_col,
+            store_columns=list(store_columns),
+            eancodes=eancodes,
+            season_codes=season_codes,
+            seasons=seasons,
+            quantity_indptr=indptr,
+            quantity_rows=rows,
+            quantity_values=values,
+            ean_dtype=df[ean_col].dtype,
+            season_dtype=df[season_col].dtype,
+            quantity_dtypes={store_col: df[store_col].dtype for store_col in store_columns},
+            columns=list(df.columns)
+        )
+
+    def __len__(self) -> int:
+        """Number of rows of the sheet."""
+        return len(self.eancodes)
+
+    def describe(self) -> str:
+        """Describe the size of the matrix for the log."""
+        return (f"{len(self)} rows and {len(self.store_columns)} store columns: "
+                f"{self.nnz} quantities ({self.density:.1%} filled)")
+
+    @property
+    def nnz(self) -> int:
+        """Number of non-blank store cells."""
+        return len(self.quantity_values)
+
+    @property
+    def density(self) -> float:
+        """Share of the store cells that hold a value."""
+        cells = len(self.eancodes) * len(self.store_columns)
+        return self.nnz / cells if cells else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays of the matrix."""
+        return (self.eancodes.nbytes + self.season_codes.nbytes + self.quantity_indptr.nbytes
+                + self.quantity_rows.nbytes + self.quantity_values.nbytes)
+
+    def store_entries(self, store_col: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the non-blank cells of a store column without scanning the column.
+
+        Args:
+            store_col (str): Name of the store column
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row positions in sheet order and their
+                quantities, as views into the matrix
+        """
+        j = self.store_columns.index(store_col)
+        start, end = self.quantity_indptr[j], self.quantity_indptr[j + 1]
+        return self.quantity_rows[start:end], self.quantity_values[start:end]
+
+    def to_dense(self) -> np.ndarray:
+        """
+        Expand the quantities to a rows x stores float64 array with NaN for blank cells.
+
+        Returns:
+            np.ndarray: Dense quantity matrix
+        """
+        dense = np.full((len(self.eancodes), len(self.store_columns)), np.nan)
+        for j in range(len(self.store_columns)):
+            start, end = self.quantity_indptr[j], self.quantity_indptr[j + 1]
+            dense[self.quantity_rows[start:end], j] = self.quantity_values[start:end]
+        return dense
+
+    def store_frame(self, store_col: str) -> pd.DataFrame:
+        """
+        Rebuild the rows allocated to a store.
+
+        The DataFrame has the EANCode, SEASON and store columns with their
+        original names and dtypes, as filtering the sheet on the store column would.
+
+        Args:
+            store_col (str): Name of the store column
+
+        Returns:
+            pd.DataFrame: Rows where the store column has a value
+        """
+        rows, quantities = self.store_entries(store_col)
+        seasons = pd.Categorical.from_codes(self.season_codes[rows], categories=self.seasons)
+        return pd.DataFrame({
+            self.ean_col: self.eancodes[rows].astype(self.ean_dtype),
+            self.season_col: pd.Series(seasons, index=rows).astype(self.season_dtype),
+            store_col: quantities.astype(self.quantity_dtypes[store_col])
+        }, index=rows)
+
+    def store_frames(self, store_columns: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Rebuild the rows of every store column that has data.
+
+        Args:
+            store_columns (Optional[List[str]]): Store columns to rebuild; all of
+                them if None
+
+        Returns:
+            Dict[str, pd.DataFrame]: Rows of every store column, in column order
+        """
+        wanted = None if store_columns is None else set(store_columns)
+        return {
+            store_col: self.store_frame(store_col)
+            for j, store_col in enumerate(self.store_columns)
+            if self.quantity_indptr[j + 1] > self.quantity_indptr[j] and (wanted is None or store_col in wanted)
+        }
+
+
+class AllocationMatrixBuilder:
+    """
+    Builds an AllocationMatrix from the rows of the sheet as they are read.
+
+    The store quantities go straight into per-column buffers of row positions
+    and int32 values, blank cells are skipped, and only the EANCode and SEASON
+    cells are kept as values until build() types them like the DataFrame
+    readers do.
+    """
+
+    def __init__(self, columns: List[Any], ean_col: str, season_col: str,
+                 store_columns: Optional[List[Any]] = None):
+        """
+        Create the builder.
+
+        Args:
+            columns (List[Any]): Names of the columns of every added row
+            ean_col (str): Name of the EANCode column
+            season_col (str): Name of the SEASON column
+            store_columns (Optional[List[Any]]): Unique store columns to include;
+                all other columns if None
+        """
+        if store_columns is None:
+            store_columns = [col for col in columns if col not in (ean_col, season_col)]
+        positions = {col: i for i, col in enumerate(columns)}
+        self.columns = list(columns)
+        self.ean_col = ean_col
+        self.season_col = season_col
+        self.store_columns = list(store_columns)
+        self._ean_position = positions[ean_col]
+        self._season_position = positions[season_col]
+        self._store_positions = [positions[store_col] for store_col in self.store_columns]
+        self._ean_cells: List[Any] = []
+        self._season_cells: List[Any] = []
+        self._entry_rows = [array('q') for _ in self.store_columns]
+        self._entry_values = [array('i') for _ in self.store_columns]
+        self._row_count = 0
+        # Rows after the last row with data are not part of the sheet
+        self._data_rows = 0
+
+    def add_row(self, row: List[Any], has_data: bool = True) -> None:
+        """
+        Add the next row of the sheet.
+
+        Args:
+            row (List[Any]): Cell values of the row, "" for empty cells
+            has_data (bool): Whether any cell of the full row holds a value
+
+        Raises:
+            MatrixConversionError: If a store cell is not a blank or an int32 integer
+        """
+        position = self._row_count
+        self._ean_cells.append(row[self._ean_position])
+        self._season_cells.append(row[self._season_position])
+        for j, column in enumerate(self._store_positions):
+            value = row[column]
+            if type(value) is not int:
+                if value == "" or (isinstance(value, float) and value != value):
+                    continue
+                raise MatrixConversionError(f"Store column '{self.store_columns[j]}' has the value {value!r}, "
+                                            f"which is not an integer quantity")
+            try:
+                self._entry_values[j].append(value)
+            except OverflowError:
+                raise MatrixConversionError(f"Store column '{self.store_columns[j]}' has quantities outside "
+                                            f"the int32 range")
+            self._entry_rows[j].append(position)
+        self._row_count += 1
+        if has_data:
+            self._data_rows = self._row_count
+
+    def build(self) -> AllocationMatrix:
+        """
+        Build the matrix from the added rows.
+
+        Returns:
+            AllocationMatrix: The typed sheet, without the store columns that hold
+                no quantity
+
+        Raises:
+            MatrixConversionError: If the sheet has no data rows or an EANCode or
+                SEASON value cannot be represented exactly
+        """
+        row_count = self._data_rows
+        if row_count == 0:
+            raise MatrixConversionError("The sheet has no data rows")
+
+        # Type the two columns as the DataFrame readers type them
+        cells = [[ean, season] for ean, season in zip(self._ean_cells[:row_count], self._season_cells[:row_count])]
+        typed = TextParser([[0, 1]] + cells, header=0, skip_blank_lines=False).read()
+        del cells
+        ean_values, season_values = typed.iloc[:, 0], typed.iloc[:, 1]
+        eancodes = to_eancode_array(ean_values)
+        season_codes, seasons = to_season_codes(season_values)
+
+        kept = [j for j in range(len(self.store_columns)) if len(self._entry_rows[j])]
+        indptr = np.zeros(len(kept) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(self._entry_rows[j]) for j in kept])
+        row_dtype = np.int32 if row_count <= np.iinfo(np.int32).max else np.int64
+        rows = np.concatenate([np.empty(0, dtype=row_dtype)] + [
+            np.frombuffer(self._entry_rows[j], dtype=np.longlong).astype(row_dtype) for j in kept
+        ])
+        values = np.concatenate([np.empty(0, dtype=np.int32)] + [
+            np.frombuffer(self._entry_values[j], dtype=np.intc).astype(np.int32) for j in kept
+        ])
+
+        # A column read as a DataFrame is int64 without blanks and float64 with them
+        quantity_dtypes = {
+            self.store_columns[j]: np.dtype(np.int64 if len(self._entry_rows[j]) == row_count else np.float64)
+            for j in kept
+        }
+        return AllocationMatrix(
+            ean_col=self.ean_col,
+            season_col=self.season_col,
+            store_columns=[self.store_columns[j] for j in kept],
+            eancodes=eancodes,
+            season_codes=season_codes,
+            seasons=seasons,
+            quantity_indptr=indptr,
+            quantity_rows=rows,
+            quantity_values=values,
+            ean_dtype=ean_values.dtype,
+            season_dtype=season_values.dtype,
+            quantity_dtypes=quantity_dtypes,
+            columns=self.columns
+        )
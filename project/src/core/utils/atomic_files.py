@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Atomic files module for crash-safe output writes.
+
+This module provides functionality to:
+1. Write an output file to a hidden partial file next to it and rename it over
+   the output file only once it is complete
+2. Remove the partial files left behind by an interrupted run
+
+A reader, or a run that dies mid-way, sees either the previous file or the
+complete new one, never a half-written file.
+"""
+
+import os
+import uuid
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Marker in the names of partial files, before the suffix of the output file
+PARTIAL_MARKER = '.partial'
+
+
+def get_partial_path(path: Path) -> Path:
+    """
+    Get a unique partial file path next to an output file.
+
+    The suffix of the output file is kept, so writers that pick the file format
+    from the suffix, such as pd.ExcelWriter, behave the same.
+
+    Args:
+        path (Path): Path of the output file
+
+    Returns:
+        Path: Hidden partial file path in the same directory
+    """
+    return path.with_name(f".{path.stem}.{uuid.uuid4().hex[:12]}{PARTIAL_MARKER}{path.suffix}")
+
+
+@contextmanager
+def atomic_write_path(path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Write an output file through a partial file renamed over it on success.
+
+    Args:
+        path (Union[str, Path]): Path of the output file
+
+    Yields:
+        Path: Path to write the content to
+
+    Raises:
+        OSError: If the partial file cannot replace the output file, such as a
+            PermissionError while the output file is open in Excel on Windows;
+            the output file is left unchanged
+    """
+    path = Path(path)
+    partial_path = get_partial_path(path)
+    try:
+        yield partial_path
+        os.replace(partial_path, path)
+    except BaseException:
+        try:
+            partial_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Could not remove partial file {partial_path}: {e}")
+        raise
+
+
+def remove_partial_files(directory: Union[str, Path]) -> int:
+    """
+    Remove the partial files left in a directory by an interrupted run.
+
+    Args:
+        directory (Union[str, Path]): Output directory
+
+    Returns:
+        int: Number of partial files removed
+    """
+    removed = 0
+    for partial_path in Path(directory).glob(f".*{PARTIAL_MARKER}*"):
+        try:
+            partial_path.unlink()
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Could not remove partial file {partial_path}: {e}")
+    if removed:
+        logger.info(f"Removed {removed} partial files left by an interrupted run in {directory}")
+    return removed
@@ -5,18 +5,33 @@
 Functions module for handling Excel and CSV file operations.
 
 This module provides functionality to:
-1. Load and process xlsx files from the source directory
-2. Read unique stores from a CSV file in the stores directory
-3. Extract important columns like EANCode and SEASON from xlsx files
-4. Find common columns between xlsx files and stores.csv
+1. Load and process xlsx files from the source directory or matching glob
+   patterns, with a fast XML reader that falls back to pd.read_excel
+2. Load the PRE ALLOCATION sheet of a run as an AllocationMatrix, built while
+   the rows are read, so that the loaded sheet is not kept as an object DataFrame
+3. Read unique stores from a CSV file, by default stores/stores.csv
+4. Extract important columns like EANCode and SEASON from xlsx files
+5. Find common columns between xlsx files and stores.csv
 """
 
 import os
+import glob
+import zipfile
 import pandas as pd
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union, Set, Tuple
 import logging
 
+from src.core.utils.allocation_matrix import AllocationMatrix, AllocationMatrixBuilder, MatrixConversionError
+from src.core.utils.store_index import StoreColumnIndex
+from src.core.utils.xlsx_reader import (
+    READER_BACKENDS,
+    UnsupportedWorkbookError,
+    XlsxSheetReader,
+    read_sheet_pandas,
+    resolve_sheet_name
+)
+
 
 # Configure logging
 logging.basicConfig(
@@ -25,54 +40,135 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_STORES_FILE = Path('stores/stores.csv')
+
+
+def find_matching_column(columns: List[Any], store_name: str) -> Optional[Any]:
+    """
+    Find the column name that matches a store name.
+
+    The store is matched exactly first, then ignoring case and whitespace, then
+    without the "Outlet 25" suffix, then as a run of whole words of a column,
+    then as a substring of a column. Stores that match several columns are not
+    resolved.
+
+    Args:
+        columns (List[Any]): Column names to search in
+        store_name (str): Store name to find
+
+    Returns:
+        Optional[Any]: Matching column name or None if not found or ambiguous
+    """
+    return StoreColumnIndex(columns).resolve(store_name)
+
+
+def find_required_columns(columns: List[Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Find the EANCode and SEASON columns among the column names of a sheet.
+
+    Args:
+        columns (List[Any]): Column names to search in
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: The EANCode and SEASON column names, or None if not found
+    """
+    ean_col = None
+    season_col = None
+
+    for col in columns:
+        if isinstance(col, str):
+            if 'EANCode' in col:
+                ean_col = col
+            elif 'SEASON' in col:
+                season_col = col
+
+    return ean_col, season_col
+
+
+def get_allocation_columns(header: List[Any], store_names: List[str]) -> List[int]:
+    """
+    Get the indices of the columns needed to process the stores: the EANCode
+    and SEASON columns and the column matching every store.
+
+    Args:
+        header (List[Any]): Header row of the sheet
+        store_names (List[str]): Store names to find
+
+    Returns:
+        List[int]: Zero-based indices of the needed columns
+    """
+    indices = [
+        i for i, col in enumerate(header)
+        if isinstance(col, str) and ('EANCode' in col or 'SEASON' in col)
+    ]
+    resolution = StoreColumnIndex(header).resolve_all(store_names)
+    for store_col in resolution.columns.values():
+        if store_col is not None:
+            indices.append(header.index(store_col))
+    return sorted(set(indices))
+
+
+def select_allocation_columns(df: pd.DataFrame, store_names: List[str]) -> pd.DataFrame:
+    """
+    Keep only the EANCode, SEASON and store columns of a fully loaded sheet.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing all columns of the sheet
+        store_names (List[str]): Stores whose columns to keep
+
+    Returns:
+        pd.DataFrame: DataFrame with the same columns as loading with store_names
+    """
+    return df.iloc[:, get_allocation_columns(list(df.columns), store_names)]
+
 
-def load_xlsx_file(file_path: Union[str, Path]) -> Optional[pd.DataFrame]:
+def load_xlsx_file(file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION",
+                   store_names: Optional[List[str]] = None, backend: str = "xml") -> Optional[pd.DataFrame]:
     """
     Load an Excel (xlsx) file and return its content as a pandas DataFrame.
-    Specifically loads the "PRE ALLOCATION" sheet.
+    By default loads the "PRE ALLOCATION" sheet.
+
+    The workbook is opened once and the sheet is resolved by exact name, by the
+    name without spaces, case-insensitively, or else the first sheet is used.
+
+    The "xml" backend streams the sheet XML directly and, when store names are
+    given, only loads the EANCode, SEASON and store columns. If the workbook uses
+    a feature the backend does not support, the file is loaded with pandas.
 
     Args:
         file_path (Union[str, Path]): Path to the xlsx file
+        sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+        store_names (Optional[List[str]]): Stores whose columns to load; all columns are loaded if None
+        backend (str): Reader backend, "xml" or "pandas" (default: "xml")
 
     Returns:
         Optional[pd.DataFrame]: DataFrame containing the Excel data or None if loading failed
     """
+    select_columns = None
+    if store_names is not None:
+        select_columns = lambda header: get_allocation_columns(header, store_names)
+    
     try:
-        logger.info(f"Loading Excel file: {file_path}")
+        logger.info(f"Loading '{sheet_name}' sheet from Excel file {file_path} with the '{backend}' reader")
         
-        # Specifically load the "PRE ALLOCATION" sheet
         try:
-            logger.info("Loading 'PRE ALLOCATION' sheet from Excel file")
-            df = pd.read_excel(file_path, sheet_name="PRE ALLOCATION")
-            
-            # Check if the sheet loaded successfully
-            if df is not None and not df.empty:
-                logger.info(f"Successfully loaded 'PRE ALLOCATION' sheet with {len(df)} rows and {len(df.columns)} columns")
-                return df
-            else:
-                logger.warning("The 'PRE ALLOCATION' sheet was empty or could not be loaded")
+            df = READER_BACKENDS[backend](file_path, sheet_name, select_columns)
+        except FileNotFoundError:
+            raise
+        except UnsupportedWorkbookError as e:
+            logger.info(f"Falling back to the pandas reader: {e}")
+            df = read_sheet_pandas(file_path, sheet_name)
         except Exception as e:
-            logger.warning(f"Error loading 'PRE ALLOCATION' sheet: {e}")
-            
-            # Check if Excel file has a sheet named without spaces
-            try:
-                logger.info("Trying to load 'PRE_ALLOCATION' sheet (without spaces)")
-                df = pd.read_excel(file_path, sheet_name="PRE_ALLOCATION")
-                if df is not None and not df.empty:
-                    return df
-            except Exception:
-                pass
-                
-            # Get all sheet names to log them for debugging
-            xls = pd.ExcelFile(file_path)
-            sheet_names = xls.sheet_names
-            logger.info(f"Available sheets in the Excel file: {sheet_names}")
-            
-            # If we can't load the specific sheet, try the first sheet
-            logger.info("Trying to load the first sheet as fallback")
-            df = pd.read_excel(file_path)
+            if backend == "pandas":
+                raise
+            logger.warning(f"The '{backend}' reader failed, falling back to the pandas reader: {e}")
+            df = read_sheet_pandas(file_path, sheet_name)
         
-        logger.info(f"Successfully loaded Excel file with {len(df)} rows and {len(df.columns)} columns")
+        # Check if the sheet loaded successfully
+        if df.empty:
+            logger.warning(f"The '{sheet_name}' sheet was empty or could not be loaded")
+        else:
+            logger.info(f"Successfully loaded Excel file with {len(df)} rows and {len(df.columns)} columns")
         return df
     except FileNotFoundError:
         logger.error(f"Excel file not found: {file_path}")
@@ -82,6 +178,138 @@ def load_xlsx_file(file_path: Union[str, Path]) -> Optional[pd.DataFrame]:
         return None
 
 
+def find_store_columns(columns: List[Any], store_names: Optional[List[str]]) -> Optional[List[Any]]:
+    """
+    Find the unique columns of the stores of a run.
+
+    Args:
+        columns (List[Any]): Column names of the loaded sheet
+        store_names (Optional[List[str]]): Stores of the run
+
+    Returns:
+        Optional[List[Any]]: Resolved store columns in store order, or None if
+            store_names is None
+    """
+    if store_names is None:
+        return None
+    resolution = StoreColumnIndex(columns).resolve_all(store_names)
+    return list(dict.fromkeys(col for col in resolution.columns.values() if col is not None))
+
+
+def to_allocation_sheet(xlsx_df: pd.DataFrame,
+                        store_names: Optional[List[str]] = None) -> Union[AllocationMatrix, pd.DataFrame]:
+    """
+    Convert a loaded sheet to an AllocationMatrix holding the columns of the stores.
+
+    Args:
+        xlsx_df (pd.DataFrame): Loaded sheet
+        store_names (Optional[List[str]]): Stores whose columns to keep; every column
+            other than EANCode and SEASON is kept if None
+
+    Returns:
+        Union[AllocationMatrix, pd.DataFrame]: The matrix, or the DataFrame itself
+            when the sheet has no EANCode or SEASON column or values the matrix
+            cannot represent exactly
+    """
+    ean_col, season_col = find_required_columns(list(xlsx_df.columns))
+    if not ean_col or not season_col:
+        return xlsx_df
+
+    try:
+        matrix = AllocationMatrix.from_frame(xlsx_df, ean_col, season_col,
+                                             find_store_columns(list(xlsx_df.columns), store_names))
+    except MatrixConversionError as e:
+        logger.info(f"Keeping the sheet as a DataFrame: {e}")
+        return xlsx_df
+    logger.info(f"Loaded the sheet as an allocation matrix of {matrix.describe()}")
+    return matrix
+
+
+def read_allocation_matrix(file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION",
+                           store_names: Optional[List[str]] = None) -> AllocationMatrix:
+    """
+    Read the sheet of a run into an AllocationMatrix with the fast XML reader.
+
+    The store quantities are added to the sparse columns while the rows are
+    streamed, so the sheet is never parsed into a DataFrame; only the EANCode,
+    SEASON and store columns are converted.
+
+    Args:
+        file_path (Union[str, Path]): Path to the xlsx file
+        sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+        store_names (Optional[List[str]]): Stores of the run; every column is loaded if None
+
+    Returns:
+        AllocationMatrix: The typed sheet
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        MatrixConversionError: If the sheet has no EANCode or SEASON column or
+            values the matrix cannot represent exactly
+        UnsupportedWorkbookError: If the workbook uses a feature the reader does not handle
+    """
+    select_columns = None
+    if store_names is not None:
+        select_columns = lambda header: get_allocation_columns(header, store_names)
+
+    try:
+        with XlsxSheetReader(file_path) as reader:
+            resolved_name = resolve_sheet_name(sheet_name, reader.sheet_names)
+            columns, rows = reader.iter_data_rows(resolved_name, select_columns)
+            ean_col, season_col = find_required_columns(columns)
+            if not ean_col or not season_col:
+                raise MatrixConversionError("The sheet has no EANCode or SEASON column")
+
+            builder = AllocationMatrixBuilder(columns, ean_col, season_col,
+                                              find_store_columns(columns, store_names))
+            for row, has_data in rows:
+                builder.add_row(row, has_data)
+            return builder.build()
+    except zipfile.BadZipFile as e:
+        raise UnsupportedWorkbookError(f"Not an xlsx file: {e}")
+
+
+def load_allocation_sheet(file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION",
+                          store_names: Optional[List[str]] = None,
+                          backend: str = "xml") -> Optional[Union[AllocationMatrix, pd.DataFrame]]:
+    """
+    Load the sheet of a run as an AllocationMatrix of the EANCode, SEASON and store
+    columns.
+
+    With the "xml" backend the matrix is built while the sheet is read. Sheets
+    the matrix cannot represent, and the "pandas" backend, are loaded with
+    load_xlsx_file, and the DataFrame is dropped once the matrix is built from it.
+
+    Args:
+        file_path (Union[str, Path]): Path to the xlsx file
+        sheet_name (str): Name of the sheet to load (default: "PRE ALLOCATION")
+        store_names (Optional[List[str]]): Stores of the run; every column is loaded if None
+        backend (str): Reader backend, "xml" or "pandas" (default: "xml")
+
+    Returns:
+        Optional[Union[AllocationMatrix, pd.DataFrame]]: The matrix, the DataFrame
+            when the matrix cannot represent the sheet, or None if loading failed
+    """
+    if backend == "xml":
+        logger.info(f"Loading '{sheet_name}' sheet from Excel file {file_path} as an allocation matrix")
+        try:
+            matrix = read_allocation_matrix(file_path, sheet_name, store_names)
+            logger.info(f"Loaded the sheet as an allocation matrix of {matrix.describe()}")
+            return matrix
+        except FileNotFoundError:
+            logger.error(f"Excel file not found: {file_path}")
+            return None
+        except (MatrixConversionError, UnsupportedWorkbookError) as e:
+            logger.info(f"Loading the sheet as a DataFrame instead: {e}")
+        except Exception as e:
+            logger.warning(f"Could not read the sheet as an allocation matrix, loading it as a DataFrame: {e}")
+
+    xlsx_df = load_xlsx_file(file_path, sheet_name, store_names, backend)
+    if xlsx_df is None:
+        return None
+    return to_allocation_sheet(xlsx_df, store_names)
+
+
 def get_xlsx_files_from_source() -> List[Path]:
     """
     Get a list of all xlsx files in the source directory.
@@ -99,14 +327,45 @@ def get_xlsx_files_from_source() -> List[Path]:
     return xlsx_files
 
 
-def read_stores_csv() -> Optional[pd.DataFrame]:
+def find_xlsx_files(patterns: List[str]) -> List[Path]:
+    """
+    Find the xlsx files matching file paths, directories or glob patterns.
+
+    Directories match the xlsx files directly inside them, and "**" matches any
+    number of subdirectories. The lock files Excel keeps next to open workbooks
+    ("~$name.xlsx") are skipped.
+
+    Args:
+        patterns (List[str]): File paths, directories or glob patterns
+
+    Returns:
+        List[Path]: Matching xlsx files, without duplicates, sorted per pattern
+    """
+    xlsx_files: Dict[Path, None] = {}
+    for pattern in patterns:
+        if Path(pattern).is_dir():
+            pattern = str(Path(pattern) / '*.xlsx')
+        matches = sorted(Path(match) for match in glob.glob(pattern, recursive=True))
+        if not matches:
+            logger.warning(f"No files match {pattern}")
+        for path in matches:
+            if path.is_file() and path.suffix.lower() == '.xlsx' and not path.name.startswith('~$'):
+                xlsx_files[path] = None
+    logger.info(f"Found {len(xlsx_files)} xlsx files")
+    return list(xlsx_files)
+
+
+def read_stores_csv(stores_file: Union[str, Path] = DEFAULT_STORES_FILE) -> Optional[pd.DataFrame]:
     """
-    Read the stores.csv file from the stores directory and return unique stores.
+    Read a stores CSV file and return unique stores.
+
+    Args:
+        stores_file (Union[str, Path]): Path to the stores file (default: stores/stores.csv)
 
     Returns:
         Optional[pd.DataFrame]: DataFrame containing unique store data or None if loading failed
     """
-    stores_file = Path('stores/stores.csv')
+    stores_file = Path(stores_file)
     try:
         if not stores_file.exists():
             logger.error(f"Stores CSV file not found: {stores_file}")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Input preview module for checking the input files before a run.
+
+This module provides functionality to:
+1. Read the sheet names and the header row of a workbook without parsing its rows
+2. Resolve the stores of the stores CSV file against the header, reporting the
+   unmatched and ambiguous stores before the workbook is loaded
+"""
+
+import zipfile
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+import pandas as pd
+
+from src.core.utils.store_index import StoreColumnIndex, StoreResolution
+from src.core.utils.xlsx_reader import UnsupportedWorkbookError, XlsxSheetReader, resolve_sheet_name
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkbookPreview:
+    """Sheet names and header row of a workbook."""
+    file_path: str
+    sheet_names: List[str]
+    # Sheet the run will load, resolved like the loaders resolve it
+    sheet_name: str
+    header: List[Any]
+
+
+@dataclass
+class InputPreview:
+    """Result of checking the input files of a run."""
+    excel_path: str = ""
+    stores_path: str = ""
+    workbook: Optional[WorkbookPreview] = None
+    store_names: Optional[List[str]] = None
+    resolution: Optional[StoreResolution] = None
+    errors: List[str] = field(default_factory=list)
+
+    def describe(self) -> List[str]:
+        """
+        Describe the preview for the log.
+
+        Returns:
+            List[str]: Messages about the workbook, the stores and the unmatched stores
+        """
+        messages = [f"Input check: {error}" for error in self.errors]
+        if self.workbook is not None:
+            messages.append(f"Input check: '{self.workbook.sheet_name}' sheet has "
+                            f"{len(self.workbook.header)} columns")
+        if self.resolution is None:
+            return messages
+
+        matched = sum(1 for column in self.resolution.columns.values() if column is not None)
+        messages.append(f"Input check: {matched} of {len(self.resolution.columns)} stores "
+                        f"match a column of the workbook")
+        for store_name, matches in self.resolution.ambiguous.items():
+            messages.append(f"Input check: store '{store_name}' matches several columns: {matches}")
+        if self.resolution.unmatched:
+            messages.append(f"Input check: stores not found in the workbook: "
+                            f"{', '.join(self.resolution.unmatched)}")
+        return messages
+
+
+def read_workbook_preview(file_path: Union[str, Path], sheet_name: str = "PRE ALLOCATION") -> WorkbookPreview:
+    """
+    Read the sheet names and the header row of a workbook.
+
+    Only the first row of the sheet is parsed. Workbooks the XML reader does not
+    handle are read with pandas, without rows.
+
+    Args:
+        file_path (Union[str, Path]): Path to the Excel file
+        sheet_name (str): Requested sheet name (default: "PRE ALLOCATION")
+
+    Returns:
+        WorkbookPreview: Sheet names, resolved sheet and header of the workbook
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    try:
+        with XlsxSheetReader(file_path) as reader:
+            resolved_name = resolve_sheet_name(sheet_name, reader.sheet_names)
+            return WorkbookPreview(str(file_path), reader.sheet_names, resolved_name,
+                                   reader.read_header(resolved_name))
+    except (zipfile.BadZipFile, UnsupportedWorkbookError) as e:
+        logger.info(f"Reading the header of {file_path} with pandas: {e}")
+
+    with pd.ExcelFile(file_path) as xls:
+        resolved_name = resolve_sheet_name(sheet_name, xls.sheet_names)
+        header = list(xls.parse(resolved_name, nrows=0).columns)
+        return WorkbookPreview(str(file_path), list(xls.sheet_names), resolved_name, header)
+
+
+def resolve_preview_stores(workbook: WorkbookPreview, store_names: List[str]) -> StoreResolution:
+    """
+    Resolve stores against the header of a workbook, as a run resolves them.
+
+    Args:
+        workbook (WorkbookPreview): Workbook preview
+        store_names (List[str]): Store names to find
+
+    Returns:
+        StoreResolution: Column of every store plus the ambiguous and unmatched stores
+    """
+    return StoreColumnIndex(workbook.header).resolve_all(store_names)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentation module for timing the phases of a processing run.
+
+This module provides functionality to:
+1. Wrap pipeline phases in named spans that record wall time, CPU time of the
+   thread running the span, peak RSS and bytes written
+2. Aggregate the spans of a run per name in a RunRecorder, including the spans
+   recorded in worker processes
+3. Produce a JSON run report and a plain-text summary table
+
+Spans are no-ops unless a recorder is active in the current context, and an
+active span only costs a few clock and rusage reads, so the instrumentation
+can stay enabled in production.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+REPORT_FILENAME = '.run_report.json'
+
+_active_recorder: contextvars.ContextVar = contextvars.ContextVar('active_recorder', default=None)
+
+
+def get_peak_rss() -> Optional[int]:
+    """
+    Get the peak resident set size of the current process.
+
+    Returns:
+        Optional[int]: Peak RSS in bytes, or None if it cannot be measured
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [
+                    ('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t)
+                ]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize
+        except (AttributeError, OSError):
+            pass
+    return None
+
+
+class Span:
+    """A running span; lets the wrapped code report the bytes it wrote."""
+
+    __slots__ = ('bytes_written',)
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def add_bytes(self, count: int) -> None:
+        """Add to the number of bytes written in the span."""
+        self.bytes_written += count
+
+    def add_file(self, path: Union[str, Path]) -> None:
+        """Add the size of a written file to the bytes written in the span."""
+        try:
+            self.bytes_written += os.path.getsize(path)
+        except OSError:
+            pass
+
+
+class RunRecorder:
+    """Aggregates the spans recorded during a run by span name; safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.started = datetime.now(timezone.utc)
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self.spans: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, wall: float, cpu: float, bytes_written: int,
+               peak_rss: Optional[int]) -> None:
+        """
+        Add one finished span to the totals of its name.
+
+        Args:
+            name (str): Span name
+            wall (float): Wall time in seconds
+            cpu (float): CPU time of the thread that ran the span in seconds
+            bytes_written (int): Bytes written in the span
+            peak_rss (Optional[int]): Peak RSS of the process at the end of the span
+        """
+        with self._lock:
+            totals = self.spans.get(name)
+            if totals is None:
+                totals = self.spans[name] = {
+                    'count': 0,
+                    'wall_seconds': 0.0,
+                    'cpu_seconds': 0.0,
+                    'bytes_written': 0,
+                    'peak_rss_bytes': None
+                }
+            totals['count'] += 1
+            totals['wall_seconds'] += wall
+            totals['cpu_seconds'] += cpu
+            totals['bytes_written'] += bytes_written
+            if peak_rss is not None:
+                totals['peak_rss_bytes'] = max(totals['peak_rss_bytes'] or 0, peak_rss)
+
+    def merge(self, spans: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Add the span totals of another recorder, such as one in a worker process.
+
+        Args:
+            spans (Dict[str, Dict[str, Any]]): The spans attribute of the other recorder
+        """
+        with self._lock:
+            for name, other in spans.items():
+                self.record(name, other['wall_seconds'], other['cpu_seconds'],
+                            other['bytes_written'], other['peak_rss_bytes'])
+                # record counted the merged totals as a single span
+                self.spans[name]['count'] += other['count'] - 1
+
+    def report(self, **details) -> Dict[str, Any]:
+        """
+        Build the run report.
+
+        Args:
+            **details: Extra run details to include, such as input paths
+
+        Returns:
+            Dict[str, Any]: JSON-serializable run report
+        """
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': time.perf_counter() - self._start_wall,
+            'cpu_seconds': time.process_time() - self._start_cpu,
+            'peak_rss_bytes': get_peak_rss(),
+            'details': details,
+            'spans': self.spans
+        }
+
+
+def get_active_recorder() -> Optional[RunRecorder]:
+    """Return the recorder active in the current context, if any."""
+    return _active_recorder.get()
+
+
+@contextmanager
+def recording(recorder: RunRecorder) -> Iterator[RunRecorder]:
+    """
+    Make a recorder active for the spans in the current context.
+
+    Args:
+        recorder (RunRecorder): Recorder to activate
+
+    Yields:
+        RunRecorder: The active recorder
+    """
+    token = _active_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active_recorder.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[Span]:
+    """
+    Time a phase of the run and add it to the active recorder.
+
+    The CPU time is that of the calling thread, so the spans of writer threads
+    and concurrent jobs are not charged for each other's work; the run total of
+    RunRecorder.report is the CPU time of the whole process.
+
+    Args:
+        name (str): Span name, such as 'load' or 'xlsx_write'
+
+    Yields:
+        Span: The running span
+    """
+    recorder = _active_recorder.get()
+    current = Span()
+    if recorder is None:
+        yield current
+        return
+
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield current
+    finally:
+        recorder.record(
+            name,
+            time.perf_counter() - start_wall,
+            time.thread_time() - start_cpu,
+            current.bytes_written,
+            get_peak_rss()
+        )
+
+
+def format_bytes(count: Optional[int]) -> str:
+    """Format a byte count for the summary table."""
+    if count is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+def format_report_table(report: Dict[str, Any]) -> List[str]:
+    """
+    Format the spans of a run report as a plain-text table.
+
+    Args:
+        report (Dict[str, Any]): Report from RunRecorder.report
+
+    Returns:
+        List[str]: Lines of the table, followed by the run totals
+    """
+    lines = [f"{'Phase':<14}{'Count':>7}{'Wall (s)':>11}{'CPU (s)':>10}{'Written':>12}{'Peak RSS':>12}"]
+    for name, totals in report['spans'].items():
+        lines.append(
+            f"{name:<14}{totals['count']:>7}{totals['wall_seconds']:>11.3f}{totals['cpu_seconds']:>10.3f}"
+            f"{format_bytes(totals['bytes_written']):>12}{format_bytes(totals['peak_rss_bytes']):>12}"
+        )
+    lines.append(
+        f"Total: {report['wall_seconds']:.3f} s wall, {report['cpu_seconds']:.3f} s CPU, "
+        f"peak RSS {format_bytes(report['peak_rss_bytes'])}"
+    )
+    return lines
+
+
+def write_report(report: Dict[str, Any], path: Union[str, Path]) -> bool:
+    """
+    Write a run report as JSON.
+
+    Args:
+        report (Dict[str, Any]): Report from RunRecorder.report
+        path (Union[str, Path]): Path of the JSON file
+
+    Returns:
+        bool: True if the report was written, False otherwise
+    """
+    try:
+        with open(path, 'w', encoding='utf-8') as target:
+            json.dump(report, target, indent=2)
+        return True
+    except OSError as e:
+        logger.warning(f"Could not write run report {path}: {e}")
+        return False
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Label formats module for writing and reading the per-season label files.
+
+This module provides functionality to:
+1. Encode the EANCodes and quantities of a store-season combination in one of
+   the label formats: repeated-EANCode TXT, run-length "EAN,qty" CSV, gzip or
+   zstd compressed TXT, or packed binary records of uint64 EAN + uint32 qty
+2. Write or append label files in any of the formats
+3. Expand a label file of any format back to the repeated-EANCode lines,
+   on demand or from the command line:
+
+       python -m src.core.utils.label_formats Store-S25.csv Store-W24.bin
+
+Every format holds the same labels, so expanding a compact file gives the TXT
+file the 'txt' format writes. The compressed formats and the binary format can
+be appended to: every write adds a gzip member, a zstd frame or more records.
+"""
+
+import io
+import sys
+import gzip
+import argparse
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from src.core.utils.atomic_files import atomic_write_path
+
+try:
+    import zstandard
+except ImportError:
+    # Optional, only needed for the 'zstd' label format
+    zstandard = None
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Label formats and the suffix of their files
+LABEL_SUFFIXES = {
+    'txt': '.txt',
+    'csv': '.csv',
+    'gzip': '.txt.gz',
+    'zstd': '.txt.zst',
+    'binary': '.bin'
+}
+LABEL_FORMATS = tuple(LABEL_SUFFIXES)
+DEFAULT_LABEL_FORMAT = 'txt'
+
+# Binary label files start with this marker, followed by packed records
+BINARY_MAGIC = b'EANQTY01'
+BINARY_RECORD = np.dtype([('ean', '<u8'), ('qty', '<u4')])
+
+# Fast compression: label files are written once per run and compress well anyway
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def check_label_format(label_format: str) -> None:
+    """
+    Check that a label format is known and can be written here.
+
+    Args:
+        label_format (str): Label format name
+
+    Raises:
+        ValueError: If the format is unknown, or is 'zstd' without the zstandard package
+    """
+    if label_format not in LABEL_SUFFIXES:
+        raise ValueError(f"Unknown label format '{label_format}', expected one of {', '.join(LABEL_FORMATS)}")
+    if label_format == 'zstd' and zstandard is None:
+        raise ValueError("The 'zstd' label format requires the zstandard package (pip install zstandard)")
+
+def get_label_format(path: Union[str, Path]) -> str:
+    """
+    Get the label format of a file from its suffix.
+
+    Args:
+        path (Union[str, Path]): Path of the label file
+
+    Returns:
+        str: Label format name
+
+    Raises:
+        ValueError: If the suffix is not the suffix of a label format
+    """
+    name = Path(path).name
+    # Longest suffixes first, so that '.txt.gz' is not taken for '.gz'
+    for label_format, suffix in sorted(LABEL_SUFFIXES.items(), key=lambda item: -len(item[1])):
+        if name.endswith(suffix):
+            return label_format
+    raise ValueError(f"Not a label file: {path}")
+
+def repeat_lines(eancodes: np.ndarray, quantities: np.ndarray) -> str:
+    """
+    Build the repeated-EANCode TXT content: every EANCode on its own line,
+    repeated as many times as its quantity.
+
+    Args:
+        eancodes (np.ndarray): Cleaned EANCode strings, as an object array
+        quantities (np.ndarray): Non-negative label count of every row
+
+    Returns:
+        str: Lines of the TXT file
+    """
+    return ''.join(np.repeat(eancodes + '\n', quantities))
+
+def encode_run_lengths(eancodes: np.ndarray, quantities: np.ndarray) -> str:
+    """
+    Build the "EAN,qty" lines of a run-length CSV file.
+
+    Every row with labels becomes one line holding the run of its repeated
+    EANCode lines; rows without labels are left out.
+
+    Args:
+        eancodes (np.ndarray): Cleaned EANCode strings
+        quantities (np.ndarray): Non-negative label count of every row
+
+    Returns:
+        str: CSV lines, each ending with a newline
+    """
+    keep = quantities > 0
+    return ''.join(f"{ean},{count}\n" for ean, count in zip(eancodes[keep], quantities[keep].tolist()))
+
+def encode_binary_records(eancodes: np.ndarray, quantities: np.ndarray) -> bytes:
+    """
+    Pack the labels into little-endian uint64 EAN + uint32 qty records.
+
+    Args:
+        eancodes (np.ndarray): Cleaned EANCode strings
+        quantities (np.ndarray): Non-negative label count of every row
+
+    Returns:
+        bytes: Packed records of the rows with labels
+
+    Raises:
+        ValueError: If an EANCode or quantity cannot be packed exactly
+    """
+    keep = quantities > 0
+    eancodes = eancodes[keep]
+    quantities = quantities[keep]
+
+    for ean in eancodes:
+        # Leading zeros would be lost in an integer
+        if not (ean.isascii() and ean.isdigit()) or len(ean) > 19 or (ean.startswith('0') and ean != '0'):
+            raise ValueError(f"EANCode '{ean}' cannot be packed as an unsigned integer")
+    if len(quantities) and quantities.max() > np.iinfo(np.uint32).max:
+        raise ValueError(f"Quantity {quantities.max()} does not fit in a uint32")
+
+    records = np.empty(len(eancodes), dtype=BINARY_RECORD)
+    records['ean'] = [int(ean) for ean in eancodes]
+    records['qty'] = quantities
+    return records.tobytes()
+
+def encode_labels(eancodes: np.ndarray, quantities: np.ndarray, label_format: str) -> bytes:
+    """
+    Encode the labels of a store-season combination in a compact label format.
+
+    Args:
+        eancodes (np.ndarray): Cleaned EANCode strings
+        quantities (np.ndarray): Non-negative label count of every row
+        label_format (str): Label format name, other than 'txt'
+
+    Returns:
+        bytes: File content, without the binary marker
+    """
+    if label_format == 'csv':
+        return encode_run_lengths(eancodes, quantities).encode('utf-8')
+    if label_format == 'binary':
+        return encode_binary_records(eancodes, quantities)
+
+    text = repeat_lines(eancodes, quantities)
+    if label_format == 'gzip':
+        # mtime=0 keeps the output the same for the same labels
+        return gzip.compress(text.encode('utf-8'), compresslevel=GZIP_LEVEL, mtime=0)
+    check_label_format(label_format)
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(text.encode('utf-8'))
+
+def encode_label_file(eancodes: np.ndarray, quantities: np.ndarray,
+                      label_format: str = DEFAULT_LABEL_FORMAT) -> Union[str, bytes]:
+    """
+    Build the whole content of a label file.
+
+    Args:
+        eancodes (np.ndarray): Cleaned EANCode strings
+        quantities (np.ndarray): Non-negative label count of every row
+        label_format (str): Label format name
+
+    Returns:
+        Union[str, bytes]: Text of the 'txt' format, bytes of the other formats
+    """
+    eancodes = np.asarray(eancodes, dtype=object)
+    quantities = np.asarray(quantities, dtype=np.int64)
+    if label_format == DEFAULT_LABEL_FORMAT:
+        return repeat_lines(eancodes, quantities)
+    data = encode_labels(eancodes, quantities, label_format)
+    return BINARY_MAGIC + data if label_format == 'binary' else data
+
+def write_label_content(path: Path, content: Union[str, bytes], append: bool = False) -> int:
+    """
+    Write label file content built by encode_label_file.
+
+    A new file replaces an existing one only once it is complete.
+
+    Args:
+        path (Path): Path of the label file
+        content (Union[str, bytes]): File content
+        append (bool): Add the content to the end of the file instead of replacing it
+
+    Returns:
+        int: Number of bytes written
+    """
+    text = isinstance(content, str)
+    if append:
+        with open(path, 'a' if text else 'ab') as f:
+            f.write(content)
+    else:
+        with atomic_write_path(path) as partial_path:
+            with open(partial_path, 'w' if text else 'wb') as f:
+                f.write(content)
+    return len(content.encode('utf-8')) if text else len(content)
+
+def write_labels(path: Path, eancodes: np.ndarray, quantities: np.ndarray,
+                 label_format: str = DEFAULT_LABEL_FORMAT, append: bool = False) -> int:
+    """
+    Write the labels of a store-season combination to a label file.
+
+    Args:
+        path (Path): Path of the label file
+        eancodes (np.ndarray): Cleaned EANCode strings
+        quantities (np.ndarray): Non-negative label count of every row
+        label_format (str): Label format name
+        append (bool): Add the labels to the end of the file instead of replacing it
+
+    Returns:
+        int: Number of bytes written
+    """
+    if append and label_format == 'binary' and Path(path).exists() and Path(path).stat().st_size:
+        # Only the start of the file holds the binary marker
+        content = encode_labels(np.asarray(eancodes, dtype=object), np.asarray(quantities, dtype=np.int64),
+                                label_format)
+    else:
+        content = encode_label_file(eancodes, quantities, label_format)
+    return write_label_content(path, content, append)
+
+def iter_label_records(path: Union[str, Path]) -> Iterator[tuple]:
+    """
+    Read the (EANCode, quantity) records of a label file.
+
+    Args:
+        path (Union[str, Path]): Path of the label file
+
+    Yields:
+        tuple: EANCode string and label count
+    """
+    label_format = get_label_format(path)
+    if label_format == 'csv':
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                ean, _, count = line.rstrip('\n').rpartition(',')
+                yield ean, int(count)
+    elif label_format == 'binary':
+        with open(path, 'rb') as f:
+            if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+                raise ValueError(f"Not a binary label file: {path}")
+            while True:
+                block = f.read(BINARY_RECORD.itemsize * 65536)
+                if not block:
+                    return
+                if len(block) % BINARY_RECORD.itemsize:
+                    raise ValueError(f"Truncated binary label file: {path}")
+                for ean, qty in np.frombuffer(block, dtype=BINARY_RECORD).tolist():
+                    yield str(ean), qty
+    else:
+        for line in iter_label_lines(path):
+            yield line.rstrip('\n'), 1
+
+def iter_label_lines(path: Union[str, Path]) -> Iterator[str]:
+    """
+    Expand a label file of any format into repeated-EANCode lines.
+
+    Args:
+        path (Union[str, Path]): Path of the label file
+
+    Yields:
+        str: One EANCode line per label, ending with a newline
+    """
+    label_format = get_label_format(path)
+    if label_format == 'txt':
+        with open(path) as f:
+            yield from f
+    elif label_format == 'gzip':
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            yield from f
+    elif label_format == 'zstd':
+        check_label_format(label_format)
+        with open(path, 'rb') as raw:
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            yield from io.TextIOWrapper(reader, encoding='utf-8', newline='')
+    else:
+        for ean, count in iter_label_records(path):
+            line = f"{ean}\n"
+            for _ in range(count):
+                yield line
+
+def expand_label_file(path: Union[str, Path], output_path: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Expand a label file into a repeated-EANCode TXT file.
+
+    Args:
+        path (Union[str, Path]): Path of the label file
+        output_path (Optional[Union[str, Path]]): Path of the TXT file (default:
+            next to the label file, with the '.txt' suffix)
+
+    Returns:
+        Path: Path of the TXT file
+    """
+    path = Path(path)
+    if output_path is None:
+        output_path = path.with_name(path.name[:-len(LABEL_SUFFIXES[get_label_format(path)])] + '.txt')
+    output_path = Path(output_path)
+    if output_path.resolve() == path.resolve():
+        raise ValueError(f"{path} is already a TXT label file")
+
+    with open(output_path, 'w') as f:
+        f.writelines(iter_label_lines(path))
+    return output_path
+
+def main(argv=None) -> int:
+    """Expand the label files given on the command line."""
+    parser = argparse.ArgumentParser(
+        description="Expand compact label files into repeated-EANCode TXT files."
+    )
+    parser.add_argument("files", nargs='+', type=Path, help="label files to expand")
+    parser.add_argument(
+        "--stdout", action="store_true",
+        help="write the expanded lines to standard output instead of TXT files"
+    )
+    args = parser.parse_args(argv)
+
+    status = 0
+    for path in args.files:
+        try:
+            if args.stdout:
+                sys.stdout.writelines(iter_label_lines(path))
+            else:
+                logger.info(f"Expanded {path} to {expand_label_file(path)}")
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not expand {path}: {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
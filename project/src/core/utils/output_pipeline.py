@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Output pipeline module for writing output files on background threads.
+
+This module provides functionality to:
+1. Queue the file writes of a group of outputs, such as the files of a store,
+   in a bounded queue so that the producer blocks when the writers fall behind
+2. Run the writes on a pool of writer threads while the producer computes the
+   next outputs
+3. Report every group once all its writes finished, with the first error raised
+   by any of them
+
+The writes are recorded in the run recorder active when the pipeline is created.
+"""
+
+import queue
+import logging
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.core.utils.instrumentation import get_active_recorder, recording
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITER_THREADS = 4
+
+# Queued writes per writer thread before submit blocks
+PENDING_WRITES_PER_THREAD = 2
+
+# A write: a function and its arguments
+WriteJob = Tuple[Callable[..., Any], tuple]
+
+# A finished group: its key and the first error raised by its writes, if any
+CompletedGroup = Tuple[Hashable, Optional[BaseException]]
+
+
+class OutputWriteCancelled(Exception):
+    """Error of the writes left in the queue when the pipeline is aborted."""
+
+
+class OutputPipeline:
+    """Bounded queue of file writes consumed by a pool of writer threads."""
+
+    def __init__(self, writer_threads: int = DEFAULT_WRITER_THREADS, max_pending: Optional[int] = None):
+        """
+        Start the writer threads.
+
+        Args:
+            writer_threads (int): Number of writer threads
+            max_pending (Optional[int]): Number of queued writes after which submit
+                blocks (default: PENDING_WRITES_PER_THREAD per writer thread)
+        """
+        if writer_threads < 1:
+            raise ValueError(f"writer_threads must be a positive number, got {writer_threads}")
+        if max_pending is None:
+            max_pending = PENDING_WRITES_PER_THREAD * writer_threads
+
+        self._jobs: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._completed: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        # Remaining write count and first error of every group with queued writes
+        self._groups: Dict[Hashable, List] = {}
+        self._closed = False
+        self._recorder = get_active_recorder()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"output-writer-{i}", daemon=True)
+            for i in range(writer_threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> 'OutputPipeline':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def submit(self, key: Hashable, jobs: List[WriteJob]) -> None:
+        """
+        Queue the writes of a group, blocking while the queue is full.
+
+        Args:
+            key (Hashable): Key of the group, reported once all its writes finished
+            jobs (List[WriteJob]): Writes of the group, run in any order
+        """
+        if self._closed:
+            raise RuntimeError("Cannot submit writes to a closed output pipeline")
+        if not jobs:
+            self._completed.put((key, None))
+            return
+
+        with self._lock:
+            if key in self._groups:
+                raise ValueError(f"Writes of group {key!r} were already submitted")
+            self._groups[key] = [len(jobs), None]
+        for job in jobs:
+            self._jobs.put((key, job))
+
+    def completed(self) -> List[CompletedGroup]:
+        """
+        Get the groups whose writes all finished since the last call.
+
+        Returns:
+            List[CompletedGroup]: Key and first error of every finished group
+        """
+        groups = []
+        while True:
+            try:
+                groups.append(self._completed.get_nowait())
+            except queue.Empty:
+                return groups
+
+    def close(self) -> List[CompletedGroup]:
+        """
+        Wait for the queued writes and stop the writer threads.
+
+        Returns:
+            List[CompletedGroup]: The groups finished since the last call to completed
+        """
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._jobs.put(None)
+            for thread in self._threads:
+                thread.join()
+        return self.completed()
+
+    def abort(self) -> List[CompletedGroup]:
+        """
+        Drop the queued writes, wait for the running ones and stop the writer threads.
+
+        The groups of the dropped writes finish with an OutputWriteCancelled error.
+
+        Returns:
+            List[CompletedGroup]: The groups finished since the last call to completed
+        """
+        while True:
+            try:
+                item = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._finish_job(item[0], OutputWriteCancelled("The run was aborted before the file was written"))
+        return self.close()
+
+    def _finish_job(self, key: Hashable, error: Optional[BaseException]) -> None:
+        """Count a finished write and report its group after the last one."""
+        with self._lock:
+            group = self._groups[key]
+            group[0] -= 1
+            if error is not None and group[1] is None:
+                group[1] = error
+            if group[0] == 0:
+                del self._groups[key]
+                self._completed.put((key, group[1]))
+
+    def _run(self) -> None:
+        """Run the queued writes until the stop marker."""
+        with recording(self._recorder) if self._recorder is not None else nullcontext():
+            while True:
+                item = self._jobs.get()
+                if item is None:
+                    return
+                key, (func, args) = item
+                error = None
+                try:
+                    func(*args)
+                except Exception as e:
+                    logger.error(f"Error writing output files of {key}: {e}")
+                    error = e
+                self._finish_job(key, error)
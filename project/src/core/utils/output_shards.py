@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Output shards module for splitting oversized store files into parts.
+
+This module provides functionality to:
+1. Hold the maximum TXT lines and workbook rows per output file
+2. Split a run of lines or rows into size-bounded part ranges and name the parts
+3. Write the per-store index file listing the parts and their line/row ranges
+
+Files that fit within the limits keep their usual name; only oversized files
+are written as '<name>-partNN' files.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.utils.atomic_files import atomic_write_path
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Suffix of the per-store index file, after the store file name
+INDEX_SUFFIX = '-parts.json'
+
+
+@dataclass(frozen=True)
+class ShardLimits:
+    """Maximum size of the store output files; None means no limit."""
+
+    max_lines: Optional[int] = None
+    max_rows: Optional[int] = None
+
+    def __post_init__(self):
+        for name, limit in asdict(self).items():
+            if limit is not None and limit < 1:
+                raise ValueError(f"{name} must be a positive number, got {limit}")
+
+    @property
+    def enabled(self) -> bool:
+        """True if any limit is set."""
+        return self.max_lines is not None or self.max_rows is not None
+
+    def to_dict(self) -> Dict[str, Optional[int]]:
+        """Return the limits as a JSON-serializable dict."""
+        return asdict(self)
+
+
+def split_ranges(total: int, limit: Optional[int]) -> List[Tuple[int, int]]:
+    """
+    Split the positions 0..total into consecutive ranges of at most limit positions.
+
+    Args:
+        total (int): Number of lines or rows
+        limit (Optional[int]): Maximum positions per range; None for a single range
+
+    Returns:
+        List[Tuple[int, int]]: Start (inclusive) and stop (exclusive) of every range;
+            a single range, possibly empty, if the total fits within the limit
+    """
+    if limit is None or total <= limit:
+        return [(0, total)]
+    return [(start, min(start + limit, total)) for start in range(0, total, limit)]
+
+
+def get_part_filename(base_name: str, suffix: str, part: int, part_count: int) -> str:
+    """
+    Get the file name of one part of an output file.
+
+    Args:
+        base_name (str): File name without suffix, such as 'Store-S25'
+        suffix (str): File suffix, such as '.txt'
+        part (int): Zero-based part number
+        part_count (int): Number of parts of the file
+
+    Returns:
+        str: The usual file name for a single part, '<base_name>-partNN<suffix>' otherwise
+    """
+    if part_count == 1:
+        return f"{base_name}{suffix}"
+    return f"{base_name}-part{part + 1:0{max(2, len(str(part_count)))}d}{suffix}"
+
+
+def make_part_entry(file_name: str, start: int, stop: int, unit: str, **details: Any) -> Dict[str, Any]:
+    """
+    Describe one part file for the index.
+
+    Args:
+        file_name (str): Name of the part file
+        start (int): Zero-based first line or row of the part
+        stop (int): Zero-based stop (exclusive) of the part
+        unit (str): 'line' or 'row'
+        **details: Extra fields, such as the season
+
+    Returns:
+        Dict[str, Any]: Part entry with one-based first and last positions
+    """
+    return {
+        'file': file_name,
+        **details,
+        f'first_{unit}': start + 1,
+        f'last_{unit}': stop,
+        f'{unit}s': stop - start
+    }
+
+
+def get_index_filename(valid_filename: str) -> str:
+    """Get the name of the index file of a store."""
+    return f"{valid_filename}{INDEX_SUFFIX}"
+
+
+def write_shard_index(output_dir: Path, valid_filename: str, store_name: str, limits: ShardLimits,
+                      workbooks: List[Dict[str, Any]], txt_files: List[Dict[str, Any]]) -> Path:
+    """
+    Write the index file listing the workbook and TXT parts of a store.
+
+    Args:
+        output_dir (Path): Directory of the store files
+        valid_filename (str): Store name returned by get_valid_filename
+        store_name (str): Name of the store
+        limits (ShardLimits): Limits the parts were split with
+        workbooks (List[Dict[str, Any]]): Workbook part entries, with row ranges
+        txt_files (List[Dict[str, Any]]): TXT part entries, with season and line ranges
+
+    Returns:
+        Path: Path of the index file
+    """
+    index_path = Path(output_dir) / get_index_filename(valid_filename)
+    index = {
+        'store': store_name,
+        'limits': limits.to_dict(),
+        'workbooks': workbooks,
+        'txt_files': txt_files
+    }
+    with atomic_write_path(index_path) as partial_path:
+        with open(partial_path, 'w', encoding='utf-8') as target:
+            json.dump(index, target, indent=2)
+    return index_path
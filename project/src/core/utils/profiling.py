@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Profiling module for diagnosing slow processing runs.
+
+This module provides functionality to:
+1. Profile a run deterministically with cProfile and save the .prof file
+2. Sample the call stack of the profiled thread at a fixed interval and save
+   the samples as collapsed stacks, ready for flamegraph.pl or speedscope
+3. Summarize the hottest functions and the time spent in the store writers
+   and the Excel loader
+
+Only the thread that enters the profiler is profiled, so runs should be
+profiled with a single worker process.
+"""
+
+import sys
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME = 'run_profile'
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Functions whose cumulative time is always reported
+KEY_FUNCTIONS = (
+    'load_xlsx_file',
+    'process_workbook_streaming',
+    'process_store',
+    'write_store_outputs',
+    'create_txt_file_with_repeated_eancodes'
+)
+
+
+def format_frame(frame) -> str:
+    """Format a stack frame as 'function (file:line)' for the collapsed stacks."""
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the call stack of one thread from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Initialize the sampler.
+
+        Args:
+            thread_id (int): Identifier of the thread to sample
+            interval (float): Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='StackSampler', daemon=True)
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(format_frame(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: Union[str, Path]) -> None:
+        """
+        Write the samples in the collapsed stack format ('frame;frame;frame count').
+
+        Args:
+            path (Union[str, Path]): Path of the collapsed stack file
+        """
+        with open(path, 'w', encoding='utf-8') as target:
+            for stack, count in self.samples.most_common():
+                target.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    """Profiles the current thread with cProfile and a stack sampler."""
+
+    def __init__(self, output_dir: Union[str, Path], name: str = PROFILE_NAME,
+                 interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir (Union[str, Path]): Directory to write the profile files to
+            name (str): Base name of the profile files
+            interval (float): Seconds between stack samples
+        """
+        self.prof_path = Path(output_dir) / f"{name}.prof"
+        self.collapsed_path = Path(output_dir) / f"{name}.collapsed"
+        self.interval = interval
+        self._profile = cProfile.Profile()
+        self._sampler: Optional[StackSampler] = None
+        self.stats: Optional[pstats.Stats] = None
+
+    def __enter__(self) -> 'RunProfiler':
+        self._sampler = StackSampler(threading.get_ident(), self.interval)
+        self._sampler.start()
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._profile.disable()
+        self._sampler.stop()
+        self.stats = pstats.Stats(self._profile)
+        try:
+            self.prof_path.parent.mkdir(parents=True, exist_ok=True)
+            self._profile.dump_stats(self.prof_path)
+            self._sampler.write_collapsed(self.collapsed_path)
+            logger.info(f"Saved profile to {self.prof_path} and collapsed stacks to {self.collapsed_path}")
+        except OSError as e:
+            logger.warning(f"Could not write profile files: {e}")
+
+    def function_times(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the call count, own time and cumulative time of every profiled function.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Times by 'file:line(function)'
+        """
+        times = {}
+        for (filename, line, function), (_, calls, own, cumulative, _) in self.stats.stats.items():
+            times[f"{Path(filename).name}:{line}({function})"] = {
+                'calls': calls,
+                'own_seconds': own,
+                'cumulative_seconds': cumulative
+            }
+        return times
+
+    def summary(self, limit: int = 10) -> List[str]:
+        """
+        Summarize the key functions and the hottest functions by own time.
+
+        Args:
+            limit (int): Number of hot functions to list
+
+        Returns:
+            List[str]: Lines of the summary
+        """
+        times = self.function_times()
+        lines = ["Time in key functions (cumulative):"]
+        for key_function in KEY_FUNCTIONS:
+            matches = [(name, entry) for name, entry in times.items() if name.endswith(f"({key_function})")]
+            for name, entry in matches:
+                lines.append(f"  {entry['cumulative_seconds']:8.3f} s  {entry['calls']:>6} calls  {name}")
+
+        lines.append(f"Top {limit} functions by own time:")
+        hottest = sorted(times.items(), key=lambda item: item[1]['own_seconds'], reverse=True)[:limit]
+        for name, entry in hottest:
+            lines.append(f"  {entry['own_seconds']:8.3f} s  {entry['calls']:>6} calls  {name}")
+        return lines
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Progress model module for work-weighted progress and throughput.
+
+This module provides functionality to:
+1. Estimate the work of every store from its allocation rows: the workbook rows
+   and the label units (TXT lines) it writes
+2. Track the completed work of a run, weighting every store by its work instead
+   of counting stores
+3. Measure the throughput in rows/s and units/s and estimate the remaining time
+"""
+
+import time
+import logging
+from typing import Callable, Dict, NamedTuple, Optional
+
+import pandas as pd
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# A workbook row takes about as long to write as this many label lines
+# (measured on the PRE ALLOCATION template with the streaming Excel writer)
+ROW_WEIGHT = 15
+
+
+class StoreWork(NamedTuple):
+    """Work of writing the files of one store."""
+    rows: int
+    units: int
+
+    @property
+    def weight(self) -> int:
+        """Relative cost of writing the store"""
+        return self.rows * ROW_WEIGHT + self.units
+
+
+# Called once with the work of every store left to write
+WorkCallback = Callable[[Dict[str, StoreWork]], None]
+
+
+def estimate_store_work(store_df: pd.DataFrame, store_col: str) -> StoreWork:
+    """
+    Estimate the work of a store from its allocation rows.
+
+    Args:
+        store_df (pd.DataFrame): Rows allocated to the store
+        store_col (str): Name of the store quantity column
+
+    Returns:
+        StoreWork: Workbook rows and label units of the store
+    """
+    quantities = pd.to_numeric(store_df[store_col], errors='coerce')
+    units = int(quantities.clip(lower=0).fillna(0).sum())
+    return StoreWork(len(store_df), units)
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Format a duration as H:MM:SS, or M:SS under an hour.
+
+    Args:
+        seconds (float): Duration in seconds
+
+    Returns:
+        str: Formatted duration
+    """
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class ProgressModel:
+    """Work-weighted progress of the stores of a run, with throughput and ETA."""
+
+    def __init__(self, work: Dict[str, StoreWork], clock: Callable[[], float] = time.monotonic):
+        """
+        Start measuring the run.
+
+        Args:
+            work (Dict[str, StoreWork]): Work of every store to write
+            clock (Callable[[], float]): Time source in seconds
+        """
+        self.work = dict(work)
+        self.total_rows = sum(store.rows for store in self.work.values())
+        self.total_units = sum(store.units for store in self.work.values())
+        self.total_weight = sum(store.weight for store in self.work.values())
+        self.done_rows = 0
+        self.done_units = 0
+        self.done_weight = 0
+        self._completed = set()
+        self._clock = clock
+        self._started = clock()
+
+    def complete(self, store_name: str) -> None:
+        """
+        Count the work of a finished store; stores without work are ignored.
+
+        Args:
+            store_name (str): Name of the store
+        """
+        store = self.work.get(store_name)
+        if store is None or store_name in self._completed:
+            return
+        self._completed.add(store_name)
+        self.done_rows += store.rows
+        self.done_units += store.units
+        self.done_weight += store.weight
+
+    @property
+    def fraction(self) -> float:
+        """Completed share of the work, from 0 to 1"""
+        if not self.total_weight:
+            return 1.0
+        return self.done_weight / self.total_weight
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the model was created"""
+        return self._clock() - self._started
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.done_rows / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def units_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.done_units / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds left at the measured throughput, None before any work is done"""
+        if not self.done_weight:
+            return None
+        return (self.total_weight - self.done_weight) * self.elapsed / self.done_weight
+
+    def describe(self) -> str:
+        """
+        Describe the progress for a status line.
+
+        Returns:
+            str: Completed rows, throughput and remaining time
+        """
+        eta = self.eta_seconds
+        return (f"{self.done_rows:,}/{self.total_rows:,} rows | {self.rows_per_second:,.0f} rows/s | "
+                f"{self.units_per_second:,.0f} units/s | "
+                f"ETA {format_duration(eta) if eta is not None else 'estimating...'}")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run journal module for resuming interrupted runs.
+
+This module provides functionality to:
+1. Record every store a run completes in an append-only journal file in the
+   output directory, synced to disk store by store
+2. Mark the journal finished once every store of the run has been written
+3. Load the stores completed by an interrupted run, so that a resumed run only
+   processes the stores it did not finish
+
+A journal line is written only after all files of the store are in place, so
+a store recorded in the journal never has half-written outputs.
+"""
+
+import os
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from src.core.utils.run_manifest import OUTPUT_VERSION, is_store_unchanged
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = '.run_journal.jsonl'
+
+
+def load_interrupted_run(journal_path: Union[str, Path]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Load the stores completed by the run that wrote a journal.
+
+    Args:
+        journal_path (Union[str, Path]): Path of the journal file
+
+    Returns:
+        Optional[Dict[str, Dict[str, Any]]]: Fingerprint and output files of every
+            completed store, or None if there is no interrupted run to resume
+    """
+    journal_path = Path(journal_path)
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as source:
+            lines = source.read().splitlines()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"Ignoring unreadable run journal {journal_path}: {e}")
+        return None
+
+    stores = {}
+    for number, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # A run killed while appending leaves a truncated last line
+            if number == len(lines) - 1:
+                break
+            logger.warning(f"Ignoring run journal {journal_path}: line {number + 1} is corrupt")
+            return None
+
+        if number == 0:
+            if record.get('output_version') != OUTPUT_VERSION:
+                logger.info("Run journal was written by another output version, processing all stores")
+                return None
+        elif record.get('finished'):
+            logger.info("The last run finished, processing all stores")
+            return None
+        elif 'store' in record:
+            stores[record['store']] = record
+    return stores
+
+
+class RunJournal:
+    """Append-only journal of the stores completed by a run."""
+
+    def __init__(self, output_dir: Union[str, Path], resume: bool = False):
+        """
+        Start the journal of a run, continuing the journal of an interrupted run
+        when resuming.
+
+        Args:
+            output_dir (Union[str, Path]): Output directory of the run
+            resume (bool): Keep the stores completed by the interrupted run
+        """
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / JOURNAL_FILENAME
+        # Stores completed by the interrupted run, when resuming one
+        self.completed: Dict[str, Dict[str, Any]] = {}
+
+        interrupted = load_interrupted_run(self.path) if resume else None
+        if interrupted is not None:
+            self.completed = interrupted
+            logger.info(f"Resuming the interrupted run: {len(interrupted)} stores already completed")
+
+        # The journal is rewritten with the completed stores, dropping a
+        # truncated last line, before the run appends to it
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._append({
+            'output_version': OUTPUT_VERSION,
+            'started': datetime.now(timezone.utc).isoformat(timespec='seconds')
+        })
+        for record in self.completed.values():
+            self._append(record)
+
+    def __enter__(self) -> 'RunJournal':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """Append one record and sync it to disk."""
+        self._file.write(json.dumps(record, sort_keys=True) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def is_completed(self, store_name: str, fingerprint: str, files: List[str]) -> bool:
+        """
+        Check whether the interrupted run completed a store with the same data.
+
+        Args:
+            store_name (str): Name of the store
+            fingerprint (str): Fingerprint of the current store slice
+            files (List[str]): Names of the output files the store would write
+
+        Returns:
+            bool: True if the store was completed and its output files still exist
+        """
+        return is_store_unchanged(self.completed.get(store_name), fingerprint, files, self.output_dir)
+
+    def record(self, store_name: str, fingerprint: str, files: List[str]) -> None:
+        """
+        Record a store whose output files are all written.
+
+        Args:
+            store_name (str): Name of the store
+            fingerprint (str): Fingerprint of the store slice
+            files (List[str]): Names of the store's output files
+        """
+        self._append({'store': store_name, 'fingerprint': fingerprint, 'files': files})
+
+    def finish(self) -> None:
+        """Mark the run finished, so that it is not resumed."""
+        self._append({'finished': True})
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if not self._file.closed:
+            self._file.close()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run manifest module for incremental re-runs.
+
+This module provides functionality to:
+1. Fingerprint the EANCode/SEASON/quantity slice of every store
+2. Record the fingerprint and output files of every written store in a manifest
+   file in the output directory
+3. Decide which stores are unchanged since the last run and can be skipped
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = '.allocation_manifest.json'
+
+# Bumped whenever the content of the output files changes for the same input,
+# so that every store is written again
+OUTPUT_VERSION = 1
+
+
+def fingerprint_store(store_name: str, store_df: pd.DataFrame,
+                      options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compute the content fingerprint of a store's allocation slice.
+
+    The fingerprint covers the store name, the column names and dtypes and every
+    value together with its type, so any change that affects the output files
+    changes the fingerprint.
+
+    Args:
+        store_name (str): Name of the store
+        store_df (pd.DataFrame): Rows allocated to the store
+        options (Optional[Dict[str, Any]]): JSON-serializable output options that
+            change the output files, such as the shard limits
+
+    Returns:
+        str: Hex digest of the store slice
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{OUTPUT_VERSION}\0{store_name}\0{len(store_df)}".encode('utf-8'))
+    if options:
+        digest.update(f"\0{json.dumps(options, sort_keys=True)}".encode('utf-8'))
+    for column in store_df.columns:
+        values = store_df[column]
+        digest.update(f"\0{column!r}\0{values.dtype}\0".encode('utf-8'))
+        if isinstance(values.dtype, np.dtype) and values.dtype != object:
+            digest.update(np.ascontiguousarray(values.to_numpy()).tobytes())
+        else:
+            digest.update('\x1f'.join(
+                f"{type(value).__name__}:{value!r}" for value in values.to_numpy(dtype=object)
+            ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the store entries of the manifest in the output directory.
+
+    Args:
+        output_dir (Path): Output directory of the run
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Fingerprint and output files of every store,
+            empty if there is no readable manifest
+    """
+    manifest_path = Path(output_dir) / MANIFEST_FILENAME
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as source:
+            manifest = json.load(source)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return {}
+
+    if manifest.get('output_version') != OUTPUT_VERSION:
+        logger.info("Manifest was written by another output version, regenerating all stores")
+        return {}
+    return manifest.get('stores', {})
+
+
+def save_manifest(output_dir: Path, stores: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Write the manifest to the output directory, replacing it atomically.
+
+    Args:
+        output_dir (Path): Output directory of the run
+        stores (Dict[str, Dict[str, Any]]): Fingerprint and output files of every store
+    """
+    manifest_path = Path(output_dir) / MANIFEST_FILENAME
+    temp_path = manifest_path.with_name(f"{MANIFEST_FILENAME}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as target:
+            json.dump({'output_version': OUTPUT_VERSION, 'stores': stores}, target, indent=2, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+    except OSError as e:
+        logger.warning(f"Could not write manifest {manifest_path}: {e}")
+        temp_path.unlink(missing_ok=True)
+
+
+def make_manifest_entry(fingerprint: str, files: List[str]) -> Dict[str, Any]:
+    """
+    Build the manifest entry of a written store.
+
+    Args:
+        fingerprint (str): Fingerprint of the store slice
+        files (List[str]): Names of the store's output files
+
+    Returns:
+        Dict[str, Any]: Manifest entry
+    """
+    return {'fingerprint': fingerprint, 'files': files}
+
+
+def is_store_unchanged(entry: Optional[Dict[str, Any]], fingerprint: str, files: List[str],
+                       output_dir: Path) -> bool:
+    """
+    Check whether a store's outputs are up to date.
+
+    Args:
+        entry (Optional[Dict[str, Any]]): Manifest entry of the store from the last run
+        fingerprint (str): Fingerprint of the current store slice
+        files (List[str]): Names of the output files the store would write
+        output_dir (Path): Output directory of the run
+
+    Returns:
+        bool: True if the fingerprint is unchanged and every output file exists
+    """
+    if not entry or entry.get('fingerprint') != fingerprint or sorted(entry.get('files', [])) != sorted(files):
+        return False
+    return all((Path(output_dir) / name).exists() for name in files)
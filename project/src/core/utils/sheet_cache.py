@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persistent cache module for parsed worksheets.
+
+This module provides functionality to:
+1. Key parsed sheets by workbook content hash, sheet name and reader version
+2. Store every column of a parsed sheet as .npy arrays in one uncompressed .npz file
+3. Load cached sheets back into DataFrames without parsing the workbook
+4. Evict the least recently used entries when the cache exceeds its size limit
+
+Only plain numpy columns and object/string columns holding str, int, float,
+bool or missing values are cached. Sheets with other values are not cached and
+are simply parsed again on the next run.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from src.core.utils.xlsx_reader import READER_VERSION
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the layout of the cache files changes
+CACHE_FORMAT_VERSION = 1
+
+# Default location and size limit of the cache
+DEFAULT_CACHE_DIR = Path(os.environ.get('LOCALAPPDATA') or Path.home() / '.cache') / 'excel_processor' / 'sheets'
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+CACHE_SUFFIX = '.npz'
+
+# Type tags of the values in an encoded object column
+TAG_MISSING = 0
+TAG_STR = 1
+TAG_INT = 2
+TAG_FLOAT = 3
+TAG_BOOL = 4
+
+TAG_DTYPES = {
+    TAG_STR: np.str_,
+    TAG_INT: np.int64,
+    TAG_FLOAT: np.float64,
+    TAG_BOOL: np.bool_
+}
+
+
+class UncacheableSheetError(Exception):
+    """Raised when a sheet holds values that the cache cannot store exactly."""
+
+
+def hash_file(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hash of a file's content.
+
+    Args:
+        file_path (Union[str, Path]): Path to the file
+        chunk_size (int): Number of bytes read at a time
+
+    Returns:
+        str: Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_value_tag(value: Any) -> int:
+    """Return the type tag of a single object column value."""
+    if value is None:
+        return TAG_MISSING
+    if isinstance(value, (bool, np.bool_)):
+        return TAG_BOOL
+    if isinstance(value, str):
+        if value.endswith('\x00'):
+            raise UncacheableSheetError("String values ending with NUL characters are not supported")
+        return TAG_STR
+    if isinstance(value, (int, np.integer)):
+        return TAG_INT
+    if isinstance(value, (float, np.floating)):
+        return TAG_FLOAT
+    raise UncacheableSheetError(f"Values of type {type(value).__name__} are not supported")
+
+
+def encode_objects(values: np.ndarray, prefix: str, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Encode an object array as a tag array plus one typed array per value type.
+
+    Args:
+        values (np.ndarray): Object array to encode
+        prefix (str): Name prefix of the arrays in the cache file
+        arrays (Dict[str, np.ndarray]): Arrays of the cache file, updated in place
+    """
+    tags = np.fromiter((get_value_tag(value) for value in values), dtype=np.uint8, count=len(values))
+    arrays[f'{prefix}_tags'] = tags
+    for tag, dtype in TAG_DTYPES.items():
+        typed_values = values[tags == tag]
+        if len(typed_values):
+            try:
+                arrays[f'{prefix}_{tag}'] = np.array(typed_values.tolist(), dtype=dtype)
+            except OverflowError:
+                raise UncacheableSheetError("Integer values outside the int64 range are not supported")
+
+
+def decode_objects(prefix: str, arrays: Any) -> np.ndarray:
+    """
+    Rebuild an object array encoded with encode_objects.
+
+    Args:
+        prefix (str): Name prefix of the arrays in the cache file
+        arrays (Any): Loaded cache file
+
+    Returns:
+        np.ndarray: Object array with plain Python values
+    """
+    tags = arrays[f'{prefix}_tags']
+    values = np.full(len(tags), None, dtype=object)
+    for tag in TAG_DTYPES:
+        name = f'{prefix}_{tag}'
+        if name in arrays:
+            values[tags == tag] = arrays[name].astype(object)
+    return values
+
+
+def encode_frame(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Encode a DataFrame as named numpy arrays, one group per column.
+
+    Args:
+        df (pd.DataFrame): DataFrame with a default RangeIndex
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays to store in the cache file
+
+    Raises:
+        UncacheableSheetError: If the DataFrame holds values the cache cannot store exactly
+    """
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        raise UncacheableSheetError("Only DataFrames with a default index are supported")
+
+    arrays = {}
+    column_kinds = []
+    encode_objects(np.array(list(df.columns), dtype=object), 'columns', arrays)
+
+    for position in range(df.shape[1]):
+        values = df.iloc[:, position]
+        dtype = values.dtype
+        if isinstance(dtype, np.dtype) and dtype != object:
+            arrays[f'c{position}'] = values.to_numpy()
+            column_kinds.append({'kind': 'numpy'})
+        elif dtype == object or isinstance(dtype, pd.StringDtype):
+            encode_objects(values.to_numpy(dtype=object), f'c{position}', arrays)
+            column_kinds.append({'kind': 'object', 'dtype': None if dtype == object else str(dtype)})
+        else:
+            raise UncacheableSheetError(f"Columns of dtype {dtype} are not supported")
+
+    arrays['meta'] = np.array(json.dumps({
+        'format_version': CACHE_FORMAT_VERSION,
+        'rows': len(df),
+        'columns': column_kinds
+    }))
+    return arrays
+
+
+def decode_frame(arrays: Any) -> pd.DataFrame:
+    """
+    Rebuild a DataFrame encoded with encode_frame.
+
+    Args:
+        arrays (Any): Loaded cache file
+
+    Returns:
+        pd.DataFrame: The cached DataFrame
+    """
+    meta = json.loads(str(arrays['meta']))
+    if meta['format_version'] != CACHE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache format version {meta['format_version']}")
+
+    columns = decode_objects('columns', arrays).tolist()
+    data = {}
+    for position, column in enumerate(meta['columns']):
+        if column['kind'] == 'numpy':
+            data[position] = pd.Series(arrays[f'c{position}'], copy=False)
+        else:
+            data[position] = pd.Series(decode_objects(f'c{position}', arrays), dtype=column['dtype'] or object)
+
+    df = pd.DataFrame(data, index=pd.RangeIndex(meta['rows']))
+    df.columns = columns
+    return df
+
+
+class SheetCache:
+    """On-disk cache of parsed worksheets with size-based LRU eviction."""
+
+    def __init__(self, cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (Union[str, Path]): Directory holding the cache files
+            max_bytes (int): Total size of the cache files above which the least
+                recently used entries are removed
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def make_key(self, file_path: Union[str, Path], sheet_name: str, backend: str) -> str:
+        """
+        Build the cache key of a sheet.
+
+        Args:
+            file_path (Union[str, Path]): Path to the xlsx file
+            sheet_name (str): Requested sheet name
+            backend (str): Reader backend used to parse the sheet
+
+        Returns:
+            str: Cache key, derived from the file content hash, sheet name and reader version
+        """
+        parts = [hash_file(file_path), sheet_name, str(READER_VERSION), backend]
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def contains(self, key: str) -> bool:
+        """
+        Check whether a sheet is cached, without loading it.
+
+        Args:
+            key (str): Cache key from make_key
+
+        Returns:
+            bool: True if the sheet is cached
+        """
+        return self._entry_path(key).exists()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached sheet and mark it as recently used.
+
+        Args:
+            key (str): Cache key from make_key
+
+        Returns:
+            Optional[pd.DataFrame]: Cached DataFrame or None if the sheet is not cached
+        """
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            return None
+
+        try:
+            with np.load(entry_path, allow_pickle=False) as arrays:
+                df = decode_frame(arrays)
+        except Exception as e:
+            logger.warning(f"Removing unreadable cache entry {entry_path.name}: {e}")
+            entry_path.unlink(missing_ok=True)
+            return None
+
+        # The modification time records the last use for the LRU eviction
+        os.utime(entry_path)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """
+        Store a parsed sheet and evict old entries above the size limit.
+
+        Args:
+            key (str): Cache key from make_key
+            df (pd.DataFrame): Parsed sheet
+
+        Returns:
+            bool: True if the sheet was cached, False otherwise
+        """
+        try:
+            arrays = encode_frame(df)
+        except UncacheableSheetError as e:
+            logger.info(f"Sheet not cached: {e}")
+            return False
+
+        entry_path = self._entry_path(key)
+        temp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, 'wb') as target:
+                np.savez(target, **arrays)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {entry_path.name}: {e}")
+            temp_path.unlink(missing_ok=True)
+            return False
+
+        self.evict()
+        return entry_path.exists()
+
+    def evict(self) -> List[Path]:
+        """
+        Remove the least recently used entries until the cache fits its size limit.
+
+        Returns:
+            List[Path]: Paths of the removed entries
+        """
+        entries = []
+        for entry_path in self.cache_dir.glob(f"*{CACHE_SUFFIX}"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                entry_path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove cache entry {entry_path.name}: {e}")
+                continue
+            total_bytes -= size
+            removed.append(entry_path)
+            logger.info(f"Evicted cache entry {entry_path.name}")
+        return removed
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Store column index module for matching store names to workbook columns.
+
+This module provides functionality to:
+1. Index the column headers of a workbook once
+2. Resolve store names by exact match, then by normalized name (case and
+   whitespace), then by name without the "Outlet 25" suffix, then by a
+   contiguous run of whole tokens, and finally as a plain substring of a column
+3. Resolve all stores in one batch call, reporting ambiguous and unmatched stores
+
+A store that matches several columns at the same step is reported as ambiguous
+and left unresolved instead of silently using the first matching column.
+"""
+
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Trailing "Outlet", optionally followed by a season year such as "25"
+OUTLET_SUFFIX_PATTERN = re.compile(r'(?:^|\s)outlet(?:\s+\d{2,4})?$')
+
+
+def normalize_name(name: Any) -> str:
+    """
+    Normalize a store or column name: casefold and collapse whitespace.
+
+    Args:
+        name (Any): Store or column name
+
+    Returns:
+        str: Normalized name
+    """
+    return ' '.join(str(name).casefold().split())
+
+
+def strip_outlet_suffix(normalized_name: str) -> str:
+    """
+    Remove a trailing "outlet" / "outlet 25" from a normalized name.
+
+    Args:
+        normalized_name (str): Name returned by normalize_name
+
+    Returns:
+        str: Name without the outlet suffix
+    """
+    return OUTLET_SUFFIX_PATTERN.sub('', normalized_name).strip()
+
+
+@dataclass
+class StoreResolution:
+    """Result of resolving a batch of store names against the workbook columns."""
+    columns: Dict[str, Optional[Any]] = field(default_factory=dict)
+    ambiguous: Dict[str, List[Any]] = field(default_factory=dict)
+    unmatched: List[str] = field(default_factory=list)
+
+
+class StoreColumnIndex:
+    """Index of workbook column headers for resolving store names."""
+
+    def __init__(self, columns: List[Any]):
+        """
+        Build the exact, normalized, base-name and token indices of the columns.
+
+        Args:
+            columns (List[Any]): Column headers of the sheet
+        """
+        self.columns = list(columns)
+        self._exact: Dict[Any, Any] = {}
+        self._normalized: Dict[str, List[Any]] = {}
+        self._base: Dict[str, List[Any]] = {}
+        self._token_postings: Dict[str, Set[int]] = {}
+        self._column_tokens: List[Tuple[str, ...]] = []
+
+        for position, column in enumerate(self.columns):
+            try:
+                self._exact.setdefault(column, column)
+            except TypeError:
+                pass
+
+            tokens = tuple(normalize_name(column).split()) if isinstance(column, str) else ()
+            self._column_tokens.append(tokens)
+            if not tokens:
+                continue
+
+            normalized = ' '.join(tokens)
+            self._normalized.setdefault(normalized, []).append(column)
+            base = strip_outlet_suffix(normalized)
+            if base:
+                self._base.setdefault(base, []).append(column)
+            for token in set(tokens):
+                self._token_postings.setdefault(token, set()).add(position)
+
+    def _match_tokens(self, tokens: Tuple[str, ...]) -> List[Any]:
+        """Find the columns containing the tokens as a contiguous run."""
+        postings = [self._token_postings.get(token, set()) for token in tokens]
+        candidates = set.intersection(*postings) if postings else set()
+
+        matches = []
+        for position in sorted(candidates):
+            column_tokens = self._column_tokens[position]
+            for start in range(len(column_tokens) - len(tokens) + 1):
+                if column_tokens[start:start + len(tokens)] == tokens:
+                    matches.append(self.columns[position])
+                    break
+        return matches
+
+    def candidates(self, store_name: str) -> List[Any]:
+        """
+        Find the columns matching a store name at the first step that matches.
+
+        Args:
+            store_name (str): Store name to find
+
+        Returns:
+            List[Any]: Matching columns; more than one means the store is ambiguous
+        """
+        try:
+            if store_name in self._exact:
+                return [self._exact[store_name]]
+        except TypeError:
+            pass
+
+        normalized = normalize_name(store_name)
+        if not normalized:
+            return []
+        if normalized in self._normalized:
+            return self._normalized[normalized]
+
+        base = strip_outlet_suffix(normalized)
+        if base in self._base:
+            return self._base[base]
+
+        matches = self._match_tokens(tuple(normalized.split()))
+        if matches:
+            return matches
+
+        # Store codes such as "FL" are part of a longer column name ("FLUSC001")
+        return [column for column in self.columns if isinstance(column, str) and store_name in column]
+
+    def resolve(self, store_name: str) -> Optional[Any]:
+        """
+        Resolve a single store name to its column.
+
+        Args:
+            store_name (str): Store name to find
+
+        Returns:
+            Optional[Any]: Matching column name or None if not found or ambiguous
+        """
+        matches = self.candidates(store_name)
+        return matches[0] if len(matches) == 1 else None
+
+    def resolve_all(self, store_names: List[str]) -> StoreResolution:
+        """
+        Resolve a batch of store names to their columns.
+
+        Args:
+            store_names (List[str]): Store names to find
+
+        Returns:
+            StoreResolution: Column of every store (None if not resolved) plus the
+                ambiguous and unmatched stores
+        """
+        resolution = StoreResolution()
+        for store_name in store_names:
+            if store_name in resolution.columns:
+                continue
+            matches = self.candidates(store_name)
+            if len(matches) == 1:
+                resolution.columns[store_name] = matches[0]
+            else:
+                resolution.columns[store_name] = None
+                if matches:
+                    resolution.ambiguous[store_name] = matches
+                else:
+                    resolution.unmatched.append(store_name)
+        return resolution
+
+
+def log_store_resolution(resolution: StoreResolution) -> None:
+    """
+    Log the ambiguous and unmatched stores of a resolution.
+
+    Args:
+        resolution (StoreResolution): Result of StoreColumnIndex.resolve_all
+    """
+    for store_name, matches in resolution.ambiguous.items():
+        logger.warning(f"Store '{store_name}' matches several columns: {matches}")
+    if resolution.unmatched:
+        logger.warning(f"Stores not found in xlsx column headers: {resolution.unmatched}")
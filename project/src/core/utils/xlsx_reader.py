@@ -0,0 +1,507 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Fast XLSX reader module that parses worksheet XML directly.
+
+This module provides functionality to:
+1. Read the sheet directory and shared strings of an xlsx workbook
+2. Stream worksheet rows with iterparse, converting only the selected columns
+3. Build a typed pandas DataFrame with the same values as pd.read_excel, or
+   hand the rows to a caller that converts them itself
+
+Workbook features that the reader does not handle (such as date cells in the
+selected columns) raise UnsupportedWorkbookError so that callers can fall back
+to pd.read_excel.
+"""
+
+import posixpath
+import zipfile
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+from xml.etree.ElementTree import iterparse, fromstring
+
+from openpyxl.cell.text import Text
+from openpyxl.reader.strings import read_string_table
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from pandas.io.parsers import TextParser
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the values produced by the reader change
+READER_VERSION = 1
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+SHEET_DATA_TAG = f'{{{MAIN_NS}}}sheetData'
+ROW_TAG = f'{{{MAIN_NS}}}row'
+VALUE_TAG = f'{{{MAIN_NS}}}v'
+INLINE_STRING_TAG = f'{{{MAIN_NS}}}is'
+
+# Selects the indices of the columns to load from the header row
+ColumnSelector = Callable[[List[Any]], List[int]]
+
+
+class UnsupportedWorkbookError(Exception):
+    """Raised when a workbook uses a feature that the fast reader does not handle."""
+
+
+def column_index(column_letters: str) -> int:
+    """
+    Convert Excel column letters to a zero-based column index.
+
+    Args:
+        column_letters (str): Column letters such as 'A' or 'AB'
+
+    Returns:
+        int: Zero-based column index
+    """
+    index = 0
+    for letter in column_letters:
+        index = index * 26 + (ord(letter) - 64)
+    return index - 1
+
+
+class XlsxSheetReader:
+    """Reader for the worksheets of an xlsx workbook, opened once per file."""
+
+    def __init__(self, file_path: Union[str, Path]):
+        """
+        Open the workbook and read its sheet directory.
+
+        Args:
+            file_path (Union[str, Path]): Path to the xlsx file
+        """
+        self.file_path = file_path
+        self._zip = zipfile.ZipFile(file_path)
+        self._sheet_paths = self._read_sheet_paths()
+        self._shared_strings = None
+        self._date_styles = None
+        self._column_cache: Dict[str, int] = {}
+
+    def __enter__(self) -> 'XlsxSheetReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying zip file."""
+        self._zip.close()
+
+    @property
+    def sheet_names(self) -> List[str]:
+        """List[str]: Names of the worksheets in workbook order."""
+        return list(self._sheet_paths)
+
+    def _read_sheet_paths(self) -> Dict[str, str]:
+        """Map every worksheet name to the path of its XML part."""
+        workbook = fromstring(self._zip.read('xl/workbook.xml'))
+        rels = fromstring(self._zip.read('xl/_rels/workbook.xml.rels'))
+        targets = {
+            rel.get('Id'): rel.get('Target')
+            for rel in rels.iter(f'{{{PKG_REL_NS}}}Relationship')
+        }
+
+        sheet_paths = {}
+        for sheet in workbook.iter(f'{{{MAIN_NS}}}sheet'):
+            target = targets.get(sheet.get(f'{{{REL_NS}}}id'))
+            if target is None:
+                continue
+            if target.startswith('/'):
+                sheet_paths[sheet.get('name')] = target.lstrip('/')
+            else:
+                sheet_paths[sheet.get('name')] = posixpath.normpath(posixpath.join('xl', target))
+        return sheet_paths
+
+    def _get_shared_strings(self) -> List[str]:
+        """Load the shared strings table on first use."""
+        if self._shared_strings is None:
+            try:
+                with self._zip.open('xl/sharedStrings.xml') as source:
+                    self._shared_strings = read_string_table(source)
+            except KeyError:
+                self._shared_strings = []
+        return self._shared_strings
+
+    def _get_date_styles(self) -> Set[int]:
+        """Find the cell style indices that display numbers as dates."""
+        if self._date_styles is None:
+            self._date_styles = set()
+            try:
+                styles = fromstring(self._zip.read('xl/styles.xml'))
+            except KeyError:
+                return self._date_styles
+
+            formats = dict(BUILTIN_FORMATS)
+            for num_fmt in styles.iter(f'{{{MAIN_NS}}}numFmt'):
+                formats[int(num_fmt.get('numFmtId'))] = num_fmt.get('formatCode')
+
+            cell_xfs = styles.find(f'{{{MAIN_NS}}}cellXfs')
+            if cell_xfs is not None:
+                for style_index, xf in enumerate(cell_xfs.iter(f'{{{MAIN_NS}}}xf')):
+                    format_code = formats.get(int(xf.get('numFmtId', 0)))
+                    if format_code and is_date_format(format_code):
+                        self._date_styles.add(style_index)
+        return self._date_styles
+
+    def _get_column(self, ref: str) -> int:
+        """Get the zero-based column index of a cell reference such as 'AB12'."""
+        letters = ref.rstrip('0123456789')
+        index = self._column_cache.get(letters)
+        if index is None:
+            index = self._column_cache[letters] = column_index(letters)
+        return index
+
+    def _convert_cell(self, cell) -> Any:
+        """
+        Convert a cell element to the value pd.read_excel would produce for it.
+
+        Empty cells become "" and error cells become NaN, as in the openpyxl
+        engine of pandas.
+        """
+        data_type = cell.get('t', 'n')
+
+        if data_type == 'inlineStr':
+            inline = cell.find(INLINE_STRING_TAG)
+            return Text.from_tree(inline).content if inline is not None else ""
+
+        value = cell.findtext(VALUE_TAG)
+        if value is None:
+            return ""
+        if data_type == 'n':
+            if int(cell.get('s', 0)) in self._get_date_styles():
+                raise UnsupportedWorkbookError(f"Date cell {cell.get('r')} is not supported")
+            if '.' in value or 'E' in value or 'e' in value:
+                number = float(value)
+                return int(number) if number.is_integer() else number
+            return int(value)
+        if data_type == 's':
+            return self._get_shared_strings()[int(value)]
+        if data_type == 'str':
+            return value
+        if data_type == 'b':
+            return bool(int(value))
+        if data_type == 'e':
+            return np.nan
+        raise UnsupportedWorkbookError(f"Cell type '{data_type}' of cell {cell.get('r')} is not supported")
+
+    def iter_rows(self, sheet_name: str, columns: Optional[List[int]] = None) -> Iterator[List[Any]]:
+        """
+        Stream the rows of a worksheet.
+
+        Missing rows are returned as empty rows. Without a column selection, every
+        row holds the values up to its last non-empty cell; with a selection, every
+        row holds exactly the values of the selected columns.
+
+        Args:
+            sheet_name (str): Name of the worksheet
+            columns (Optional[List[int]]): Zero-based indices of the columns to convert
+
+        Yields:
+            List[Any]: Converted cell values of the next row
+        """
+        for row, _ in self._iter_rows(sheet_name, columns):
+            yield row
+
+    def _iter_rows(self, sheet_name: str, columns: Optional[List[int]] = None,
+                   width: Optional[int] = None) -> Iterator[Tuple[List[Any], bool]]:
+        """
+        Stream the rows of a worksheet together with a flag telling whether any
+        cell of the full row (selected or not) holds a value.
+
+        Raises UnsupportedWorkbookError if a cell at or beyond the given width
+        holds a value.
+        """
+        if sheet_name not in self._sheet_paths:
+            raise KeyError(f"Worksheet named '{sheet_name}' not found")
+
+        positions = None if columns is None else {column: i for i, column in enumerate(columns)}
+        empty_row = [] if columns is None else [""] * len(columns)
+        expected_row = 1
+
+        with self._zip.open(self._sheet_paths[sheet_name]) as source:
+            for element in self._iter_row_elements(source):
+                row_ref = element.get('r')
+                row_number = int(row_ref) if row_ref else expected_row
+                while expected_row < row_number:
+                    yield list(empty_row), False
+                    expected_row += 1
+
+                row = list(empty_row)
+                has_data = False
+                column = -1
+                for cell in element:
+                    ref = cell.get('r')
+                    column = self._get_column(ref) if ref else column + 1
+                    if len(cell):
+                        has_data = True
+                        if width is not None and column >= width:
+                            raise UnsupportedWorkbookError("Rows wider than the header are not supported")
+                    if positions is None:
+                        if column >= len(row):
+                            row.extend([""] * (column + 1 - len(row)))
+                        row[column] = self._convert_cell(cell)
+                    elif column in positions:
+                        row[positions[column]] = self._convert_cell(cell)
+
+                if positions is None:
+                    while row and row[-1] == "":
+                        row.pop()
+
+                expected_row = row_number + 1
+                yield row, has_data
+
+    @staticmethod
+    def _iter_row_elements(source) -> Iterator[Any]:
+        """
+        Parse the row elements of a worksheet XML one at a time.
+
+        A row is complete once the next row starts, so only start events are
+        parsed. Every row is cleared and removed from sheetData after it is
+        processed, so the tree does not grow with the number of rows.
+        """
+        sheet_data = None
+        previous_row = None
+        for _, element in iterparse(source, events=('start',)):
+            if element.tag == ROW_TAG:
+                if previous_row is not None:
+                    yield previous_row
+                    previous_row.clear()
+                    if sheet_data is not None:
+                        sheet_data.remove(previous_row)
+                previous_row = element
+            elif element.tag == SHEET_DATA_TAG:
+                sheet_data = element
+        if previous_row is not None:
+            yield previous_row
+
+    def read_header(self, sheet_name: str) -> List[Any]:
+        """
+        Read the header (first) row of a worksheet.
+
+        Args:
+            sheet_name (str): Name of the worksheet
+
+        Returns:
+            List[Any]: Header values, "" for empty cells
+        """
+        rows = self.iter_rows(sheet_name)
+        try:
+            return next(rows, [])
+        finally:
+            rows.close()
+
+    @staticmethod
+    def _select_columns(header: List[Any], select_columns: Optional[ColumnSelector]) -> Optional[List[int]]:
+        """Get the sorted indices of the selected columns, or None for all columns."""
+        if select_columns is None:
+            return None
+        columns = sorted(set(select_columns(header)))
+        selected_names = [header[i] for i in columns]
+        if any(header.count(name) > 1 for name in selected_names):
+            raise UnsupportedWorkbookError("Duplicate column names are not supported")
+        return columns
+
+    def read_frame(self, sheet_name: str, select_columns: Optional[ColumnSelector] = None) -> pd.DataFrame:
+        """
+        Read a worksheet into a DataFrame with the first row as header.
+
+        Args:
+            sheet_name (str): Name of the worksheet
+            select_columns (Optional[ColumnSelector]): Returns the indices of the
+                columns to load from the header row; all columns are loaded if None
+
+        Returns:
+            pd.DataFrame: Sheet data with the same values and dtypes as pd.read_excel
+        """
+        header = self.read_header(sheet_name)
+        columns = self._select_columns(header, select_columns)
+
+        rows = []
+        last_row_with_data = -1
+        for row_number, (row, has_data) in enumerate(self._iter_rows(sheet_name, columns, len(header))):
+            if has_data:
+                last_row_with_data = row_number
+            rows.append(row)
+        rows = rows[:last_row_with_data + 1]
+
+        if not rows:
+            return pd.DataFrame()
+
+        # Pad the rows to a common width, as the openpyxl engine of pandas does
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+
+        parser = TextParser(rows, header=0, skip_blank_lines=False)
+        return parser.read()
+
+    def iter_data_rows(self, sheet_name: str, select_columns: Optional[ColumnSelector] = None
+                       ) -> Tuple[List[Any], Iterator[Tuple[List[Any], bool]]]:
+        """
+        Stream the data rows of a worksheet without building a DataFrame.
+
+        Args:
+            sheet_name (str): Name of the worksheet
+            select_columns (Optional[ColumnSelector]): Returns the indices of the
+                columns to load from the header row; all columns are loaded if None
+
+        Returns:
+            Tuple[List[Any], Iterator[Tuple[List[Any], bool]]]: Column names as
+                read_frame labels them, and the data rows, each holding one value
+                per column and a flag telling whether any cell of the full row
+                holds a value. The rows after the last row with data are streamed too.
+        """
+        header = self.read_header(sheet_name)
+        columns = self._select_columns(header, select_columns)
+        names = header if columns is None else [header[i] for i in columns]
+        labels = list(self._parse_chunk(names, [], 0).columns) if names else []
+        return labels, self._iter_data_rows(sheet_name, columns, len(header), len(names))
+
+    def _iter_data_rows(self, sheet_name: str, columns: Optional[List[int]], width: int,
+                        row_width: int) -> Iterator[Tuple[List[Any], bool]]:
+        """Stream the rows after the header, padded to row_width values."""
+        rows = self._iter_rows(sheet_name, columns, width)
+        next(rows, None)  # Skip the header row
+        for row, has_data in rows:
+            yield row + [""] * (row_width - len(row)), has_data
+
+    def iter_frames(self, sheet_name: str, chunk_rows: int,
+                    select_columns: Optional[ColumnSelector] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream a worksheet as DataFrames of at most chunk_rows rows each.
+
+        Only one chunk of rows is held in memory at a time. The dtypes are
+        inferred per chunk, so a column can be int64 in one chunk and float64 in
+        the next one, where read_frame would return float64 for the whole column.
+
+        Args:
+            sheet_name (str): Name of the worksheet
+            chunk_rows (int): Maximum number of rows per chunk
+            select_columns (Optional[ColumnSelector]): Returns the indices of the
+                columns to load from the header row; all columns are loaded if None
+
+        Yields:
+            pd.DataFrame: Next chunk of rows, with the first row of the sheet as
+                header and the sheet row positions (0 = first data row) as index
+        """
+        header = self.read_header(sheet_name)
+        columns = self._select_columns(header, select_columns)
+        names = header if columns is None else [header[i] for i in columns]
+
+        chunk = []
+        start = 0
+        for row, _ in self._iter_data_rows(sheet_name, columns, len(header), len(names)):
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield self._parse_chunk(names, chunk, start)
+                start += len(chunk)
+                chunk = []
+        if chunk:
+            yield self._parse_chunk(names, chunk, start)
+
+    @staticmethod
+    def _parse_chunk(names: List[Any], chunk: List[List[Any]], start: int) -> pd.DataFrame:
+        """Convert a chunk of rows to a typed DataFrame, as read_frame does for the whole sheet."""
+        df = TextParser([names] + chunk, header=0, skip_blank_lines=False).read()
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+
+def resolve_sheet_name(sheet_name: str, sheet_names: List[str]) -> str:
+    """
+    Resolve the requested sheet against the sheet directory of a workbook.
+
+    The sheet is looked up by exact name, then by the name with spaces replaced
+    by underscores, then case-insensitively; the first sheet is used otherwise.
+
+    Args:
+        sheet_name (str): Requested sheet name
+        sheet_names (List[str]): Sheet names of the workbook, in workbook order
+
+    Returns:
+        str: Name of the sheet to load
+    """
+    if sheet_name in sheet_names:
+        return sheet_name
+
+    sheet_name_no_spaces = sheet_name.replace(" ", "_")
+    if sheet_name_no_spaces in sheet_names:
+        logger.info(f"Sheet '{sheet_name}' not found, using '{sheet_name_no_spaces}' (without spaces)")
+        return sheet_name_no_spaces
+
+    folded_name = sheet_name_no_spaces.casefold()
+    for name in sheet_names:
+        if name.replace(" ", "_").casefold() == folded_name:
+            logger.info(f"Sheet '{sheet_name}' not found, using '{name}' (case-insensitive match)")
+            return name
+
+    logger.warning(f"Sheet '{sheet_name}' not found. Available sheets in the Excel file: {sheet_names}")
+    logger.info(f"Using the first sheet '{sheet_names[0]}' as fallback")
+    return sheet_names[0]
+
+
+def read_sheet_xml(file_path: Union[str, Path], sheet_name: str,
+                   select_columns: Optional[ColumnSelector] = None) -> pd.DataFrame:
+    """
+    Read a worksheet with the fast XML reader.
+
+    The workbook is opened once; the sheet is resolved with resolve_sheet_name
+    and only that sheet is parsed.
+
+    Args:
+        file_path (Union[str, Path]): Path to the xlsx file
+        sheet_name (str): Name of the worksheet
+        select_columns (Optional[ColumnSelector]): Returns the indices of the columns
+            to load from the header row; all columns are loaded if None
+
+    Returns:
+        pd.DataFrame: Sheet data
+
+    Raises:
+        UnsupportedWorkbookError: If the workbook uses a feature the reader does not handle
+    """
+    try:
+        with XlsxSheetReader(file_path) as reader:
+            resolved_name = resolve_sheet_name(sheet_name, reader.sheet_names)
+            return reader.read_frame(resolved_name, select_columns)
+    except zipfile.BadZipFile as e:
+        raise UnsupportedWorkbookError(f"Not an xlsx file: {e}")
+
+
+def read_sheet_pandas(file_path: Union[str, Path], sheet_name: str,
+                      select_columns: Optional[ColumnSelector] = None) -> pd.DataFrame:
+    """
+    Read a worksheet with pandas.
+
+    The workbook is opened once with pd.ExcelFile; the sheet is resolved with
+    resolve_sheet_name and only that sheet is parsed.
+
+    Args:
+        file_path (Union[str, Path]): Path to the Excel file
+        sheet_name (str): Name of the worksheet
+        select_columns (Optional[ColumnSelector]): Not used; all columns are loaded
+
+    Returns:
+        pd.DataFrame: Sheet data
+    """
+    with pd.ExcelFile(file_path) as xls:
+        resolved_name = resolve_sheet_name(sheet_name, xls.sheet_names)
+        return xls.parse(resolved_name)
+
+
+# Available reader backends by name
+READER_BACKENDS = {
+    'xml': read_sheet_xml,
+    'pandas': read_sheet_pandas
+}
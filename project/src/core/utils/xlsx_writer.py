@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming XLSX writer module built on openpyxl's write-only mode.
+
+This module provides functionality to:
+1. Stream DataFrame rows into worksheets one sheet at a time
+2. Write the same header row and cell values as DataFrame.to_excel
+3. Keep memory bounded by never building the full workbook object model
+
+Rows are appended to a write-only worksheet as they are produced, so only the
+current row is held in memory besides the DataFrame itself.
+"""
+
+import math
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Union
+
+from openpyxl import Workbook
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def to_cell_value(value: Any) -> Any:
+    """
+    Convert a DataFrame value to the cell value DataFrame.to_excel would write.
+
+    Missing values become empty cells, numpy scalars become Python numbers and
+    infinite floats are written as 'inf' / '-inf'.
+
+    Args:
+        value (Any): Value from the DataFrame
+
+    Returns:
+        Any: Value to store in the cell
+    """
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        if math.isnan(value):
+            return None
+        if math.isinf(value):
+            return 'inf' if value > 0 else '-inf'
+        return float(value)
+    return value
+
+
+def iter_frame_rows(df: pd.DataFrame) -> Iterator[List[Any]]:
+    """
+    Yield the rows of a DataFrame as lists of cell values.
+
+    Args:
+        df (pd.DataFrame): DataFrame to write
+
+    Yields:
+        List[Any]: Cell values of one row
+    """
+    for row in df.itertuples(index=False, name=None):
+        yield [to_cell_value(value) for value in row]
+
+
+class StreamingWorkbookWriter:
+    """Write-only workbook that streams DataFrames into sheets in order."""
+
+    def __init__(self, file_path: Union[str, Path]):
+        """
+        Create an empty write-only workbook.
+
+        Args:
+            file_path (Union[str, Path]): Path of the xlsx file to write on close
+        """
+        self.file_path = file_path
+        self._workbook = Workbook(write_only=True)
+
+    def __enter__(self) -> 'StreamingWorkbookWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # Only save complete workbooks
+        if exc_type is None:
+            self.close()
+
+    def write_sheet(self, df: pd.DataFrame, sheet_name: str) -> None:
+        """
+        Append a sheet holding the DataFrame, with a header row and no index.
+
+        Args:
+            df (pd.DataFrame): DataFrame to write
+            sheet_name (str): Name of the new sheet
+        """
+        self.write_rows([to_cell_value(column) for column in df.columns], iter_frame_rows(df), sheet_name)
+
+    def write_rows(self, header: List[Any], rows: Iterable[List[Any]], sheet_name: str) -> None:
+        """
+        Append a sheet holding a header row and rows of cell values.
+
+        The rows are consumed one at a time, so they can be streamed from disk.
+
+        Args:
+            header (List[Any]): Cell values of the header row
+            rows (Iterable[List[Any]]): Cell values of every row, as returned by iter_frame_rows
+            sheet_name (str): Name of the new sheet
+        """
+        worksheet = self._workbook.create_sheet(sheet_name)
+        worksheet.append(header)
+
+        for row in rows:
+            worksheet.append(row)
+
+    def close(self) -> None:
+        """Save the workbook to its file."""
+        self._workbook.save(self.file_path)
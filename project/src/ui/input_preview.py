@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Input preview module for checking the selected files in the background (PySide6 version).
+
+This module provides functionality to:
+1. Read the stores CSV file and the header row of the workbook on a thread of the
+   global QThreadPool as soon as a file is selected
+2. Report the stores that do not match a column of the workbook before the run
+3. Parse the workbook into the sheet cache afterwards, so that the run loads it
+   from the cache; previews superseded by a newer selection skip this step, as do
+   workbooks already parsed by a preview and not modified since
+"""
+
+import os
+import logging
+from typing import Callable, Optional, Tuple
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Workbook path, sheet name, modification time and size of a warmed workbook
+WarmKey = Tuple[str, str, int, int]
+
+
+def get_warm_key(excel_path: str, sheet_name: str) -> Optional[WarmKey]:
+    """
+    Identify a sheet of a workbook as it is on disk, without reading the workbook.
+
+    Args:
+        excel_path (str): Path to the workbook
+        sheet_name (str): Sheet of the workbook
+
+    Returns:
+        Optional[WarmKey]: Path, sheet, modification time and size, or None if the
+            workbook cannot be accessed
+    """
+    try:
+        stat = os.stat(excel_path)
+    except OSError:
+        return None
+    return excel_path, sheet_name, stat.st_mtime_ns, stat.st_size
+
+
+class PreviewSignals(QObject):
+    """Signals of a preview task, delivered on the UI thread."""
+    preview_ready = Signal(int, object)
+    cache_warmed = Signal(int, str, object, bool)
+
+
+class PreviewTask(QRunnable):
+    """Runnable that checks the input files and warms the sheet cache."""
+
+    def __init__(self, preview_id: int, file_processor_factory: Callable[[], object], excel_path: str,
+                 stores_path: str, sheet_name: str, warm_cache: bool, is_current: Callable[[int], bool],
+                 signals: PreviewSignals):
+        super().__init__()
+        self.preview_id = preview_id
+        self.file_processor_factory = file_processor_factory
+        self.excel_path = excel_path
+        self.stores_path = stores_path
+        self.sheet_name = sheet_name
+        self.warm_cache = warm_cache
+        self.is_current = is_current
+        self.signals = signals
+
+    def run(self) -> None:
+        """Check the inputs, then warm the cache (runs on a thread of the pool)"""
+        # Imported here so that the main window starts without pandas
+        from src.core.utils.input_preview import InputPreview, read_workbook_preview, resolve_preview_stores
+
+        # Created here too, so that the processing modules are not imported on the UI thread
+        file_processor = self.file_processor_factory()
+        preview = InputPreview(self.excel_path, self.stores_path)
+        if self.stores_path:
+            stores_df = file_processor.read_stores_csv(self.stores_path)
+            if stores_df is None or stores_df.empty:
+                preview.errors.append(f"no stores found in {self.stores_path}")
+            else:
+                preview.store_names = stores_df['store_name'].tolist()
+        if self.excel_path:
+            try:
+                preview.workbook = read_workbook_preview(self.excel_path, self.sheet_name)
+            except Exception as e:
+                logger.warning(f"Could not read the header of {self.excel_path}: {e}")
+                preview.errors.append(f"could not read {self.excel_path}: {e}")
+        if preview.workbook is not None and preview.store_names:
+            preview.resolution = resolve_preview_stores(preview.workbook, preview.store_names)
+        self.signals.preview_ready.emit(self.preview_id, preview)
+
+        if not self.warm_cache or preview.workbook is None or not self.is_current(self.preview_id):
+            return
+        # Taken before the workbook is read, so that a later change is warmed again
+        warm_key = get_warm_key(self.excel_path, self.sheet_name)
+        try:
+            cached = file_processor.warm_sheet_cache(self.excel_path, self.sheet_name)
+        except Exception as e:
+            logger.warning(f"Could not cache {self.excel_path}: {e}")
+            cached = False
+        self.signals.cache_warmed.emit(self.preview_id, self.excel_path, warm_key, cached)
+
+
+class InputPreviewer(QObject):
+    """Starts a preview of the input files whenever the selection changes."""
+    preview_ready = Signal(object)
+    cache_warmed = Signal(str, bool)
+
+    def __init__(self, file_processor_factory: Callable[[], object], parent: QObject = None,
+                 pool: QThreadPool = None):
+        """
+        Create the previewer.
+
+        Args:
+            file_processor_factory (Callable[[], object]): Returns the file processor
+                whose sheet cache the runs use; called on the threads of the pool
+            parent (QObject): Parent object, such as the main window
+            pool (QThreadPool): Thread pool of the previews (default: the global pool)
+        """
+        super().__init__(parent)
+        self._file_processor_factory = file_processor_factory
+        self._pool = pool or QThreadPool.globalInstance()
+        self._signals = PreviewSignals(self)
+        self._signals.preview_ready.connect(self._deliver_preview)
+        self._signals.cache_warmed.connect(self._deliver_cache_warmed)
+        self._latest_id = 0
+        # Workbooks and sheets already parsed into the cache by a preview, with
+        # their modification time and size at the time
+        self._warmed_keys = set()
+
+    def is_current(self, preview_id: int) -> bool:
+        """Return True if no preview was requested after this one"""
+        return preview_id == self._latest_id
+
+    def request(self, excel_path: str, stores_path: str, sheet_name: str, warm_cache: bool = True) -> int:
+        """
+        Start a preview of the input files; the results of older previews are dropped.
+
+        Args:
+            excel_path (str): Selected workbook, "" if none
+            stores_path (str): Selected stores CSV file, "" if none
+            sheet_name (str): Sheet of the workbook to check
+            warm_cache (bool): Parse the workbook into the sheet cache after the check,
+                unless a previous preview already did and the workbook was not
+                modified since
+
+        Returns:
+            int: Id of the preview
+        """
+        self._latest_id += 1
+        warm_cache = warm_cache and get_warm_key(excel_path, sheet_name) not in self._warmed_keys
+        task = PreviewTask(self._latest_id, self._file_processor_factory, excel_path, stores_path,
+                           sheet_name, warm_cache, self.is_current, self._signals)
+        self._pool.start(task)
+        return self._latest_id
+
+    def _deliver_preview(self, preview_id: int, preview) -> None:
+        if self.is_current(preview_id):
+            self.preview_ready.emit(preview)
+
+    def _deliver_cache_warmed(self, preview_id: int, excel_path: str, warm_key: Optional[WarmKey],
+                              cached: bool) -> None:
+        # Reported even when superseded: the cache is warm either way
+        if cached and warm_key is not None:
+            self._warmed_keys.add(warm_key)
+        self.cache_warmed.emit(excel_path, cached)
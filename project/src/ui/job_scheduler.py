@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Job scheduler module for running processing jobs in the background (PySide6 version).
+
+This module provides functionality to:
+1. Queue processing runs on a QThreadPool, running one run at a time by default
+2. Cancel the running job cooperatively, between stores, and take queued jobs
+   off the queue before they start
+3. Coalesce the progress and log signals of the jobs and deliver them to the main
+   window at a fixed interval, so that a long run never floods the event loop;
+   the log messages are kept in a ring buffer that drops the oldest ones
+
+A job runs a worker object with progress_update(str, int), log_message(str) and
+finished(bool, str) signals, a process() method, and cancel() and is_cancelled()
+methods, such as the ProcessingWorker of src.ui.processing_worker.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Qt, Signal
+
+from src.ui.ui_updates import MessageRing
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Interval at which the updates of the running jobs are delivered to the UI
+FLUSH_INTERVAL_MS = 100
+
+# Runs already use worker processes and writer threads, so they run one at a time
+MAX_CONCURRENT_JOBS = 1
+
+
+class JobUpdates:
+    """Updates of a job collected on its thread until the next flush."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = False
+        self._progress: Optional[Tuple[str, int]] = None
+        self._messages = MessageRing()
+        self._finished: Optional[Tuple[bool, str]] = None
+        # Stays set once the result was reported, even after it was taken
+        self._has_result = False
+
+    def set_started(self) -> None:
+        with self._lock:
+            self._started = True
+
+    def set_progress(self, message: str, value: int) -> None:
+        # Only the latest progress is delivered
+        with self._lock:
+            self._progress = (message, value)
+
+    def add_message(self, message: str) -> None:
+        self._messages.append(message)
+
+    def set_finished(self, success: bool, message: str) -> None:
+        with self._lock:
+            self._finished = (success, message)
+            self._has_result = True
+
+    def has_result(self) -> bool:
+        with self._lock:
+            return self._has_result
+
+    def take(self) -> Tuple[bool, Optional[Tuple[str, int]], List[str], Optional[Tuple[bool, str]]]:
+        """
+        Take the updates collected since the last call.
+
+        Returns:
+            Tuple: Whether the job started, its latest progress, its log messages
+                and its result once it finished
+        """
+        with self._lock:
+            # The result is taken with the messages logged before it
+            updates = (self._started, self._progress, self._messages.drain(), self._finished)
+            self._started = False
+            self._progress = None
+            self._finished = None
+        return updates
+
+
+class ProcessingJob(QRunnable):
+    """Runnable that runs a worker on the thread pool and collects its updates."""
+
+    def __init__(self, job_id: int, worker: QObject, description: str):
+        super().__init__()
+        # The scheduler keeps the job until its results are delivered
+        self.setAutoDelete(False)
+        self.job_id = job_id
+        self.worker = worker
+        self.description = description
+        self.updates = JobUpdates()
+        # The worker signals are handled on the job thread and only buffered there
+        worker.progress_update.connect(self.updates.set_progress, Qt.DirectConnection)
+        worker.log_message.connect(self.updates.add_message, Qt.DirectConnection)
+        worker.finished.connect(self.updates.set_finished, Qt.DirectConnection)
+
+    def run(self) -> None:
+        """Run the worker (runs on a thread of the pool)"""
+        self.updates.set_started()
+        try:
+            self.worker.process()
+        except Exception as e:
+            logger.error(f"Job {self.job_id} failed: {e}")
+            self.updates.set_finished(False, str(e))
+        if not self.updates.has_result():
+            self.updates.set_finished(False, "The run stopped without reporting a result")
+
+
+class JobScheduler(QObject):
+    """Queue of processing jobs run on a thread pool, with coalesced updates."""
+    job_started = Signal(int, str)
+    job_progress = Signal(int, str, int)
+    job_messages = Signal(int, list)
+    job_finished = Signal(int, bool, str)
+    job_cancelled = Signal(int, str)
+    queue_changed = Signal(int)
+
+    def __init__(self, parent: Optional[QObject] = None, max_concurrent_jobs: int = MAX_CONCURRENT_JOBS,
+                 flush_interval_ms: int = FLUSH_INTERVAL_MS):
+        """
+        Create the thread pool and the flush timer.
+
+        Args:
+            parent (Optional[QObject]): Parent object, such as the main window
+            max_concurrent_jobs (int): Number of jobs run at the same time
+            flush_interval_ms (int): Interval at which updates are delivered
+        """
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_concurrent_jobs)
+        # Queued and running jobs, in submission order
+        self._jobs: Dict[int, ProcessingJob] = {}
+        self._next_job_id = 1
+        self._timer = QTimer(self)
+        self._timer.setInterval(flush_interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def job_count(self) -> int:
+        """Number of queued and running jobs"""
+        return len(self._jobs)
+
+    def has_jobs(self) -> bool:
+        """Return True while a job is queued or running"""
+        return bool(self._jobs)
+
+    def submit(self, worker: QObject, description: str = "") -> int:
+        """
+        Queue a worker; it starts once the running jobs finished.
+
+        Args:
+            worker (QObject): Worker to run
+            description (str): Description of the job for the log
+
+        Returns:
+            int: Id of the job, passed to the job signals
+        """
+        job_id = self._next_job_id
+        self._next_job_id += 1
+        job = ProcessingJob(job_id, worker, description)
+        self._jobs[job_id] = job
+        self._pool.start(job)
+        self._timer.start()
+        self.queue_changed.emit(len(self._jobs))
+        return job_id
+
+    def cancel(self, job_id: int) -> None:
+        """
+        Cancel a job: a queued job is taken off the queue, a running job stops
+        before its next store.
+
+        Args:
+            job_id (int): Id of the job
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        if self._pool.tryTake(job):
+            # Deliver the updates of the other jobs first
+            self.flush()
+            del self._jobs[job_id]
+            self.job_cancelled.emit(job_id, "The queued run was cancelled before it started")
+            self.queue_changed.emit(len(self._jobs))
+        else:
+            job.worker.cancel()
+
+    def cancel_all(self) -> None:
+        """Cancel the queued jobs, then the running ones"""
+        for job_id in reversed(list(self._jobs)):
+            self.cancel(job_id)
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        """
+        Wait for the running jobs and deliver their last updates.
+
+        Args:
+            msecs (int): Maximum time to wait in milliseconds (-1 waits until done)
+
+        Returns:
+            bool: True if no job is left running
+        """
+        done = self._pool.waitForDone(msecs)
+        self.flush()
+        return done
+
+    def flush(self) -> None:
+        """Deliver the updates collected since the last flush (runs on the UI thread)"""
+        for job_id, job in list(self._jobs.items()):
+            started, progress, messages, finished = job.updates.take()
+            if started:
+                self.job_started.emit(job_id, job.description)
+            if messages:
+                self.job_messages.emit(job_id, messages)
+            if progress is not None:
+                self.job_progress.emit(job_id, *progress)
+            if finished is not None:
+                del self._jobs[job_id]
+                success, message = finished
+                if not success and job.worker.is_cancelled():
+                    self.job_cancelled.emit(job_id, message)
+                else:
+                    self.job_finished.emit(job_id, success, message)
+                self.queue_changed.emit(len(self._jobs))
+        if not self._jobs:
+            self._timer.stop()
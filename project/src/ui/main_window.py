@@ -11,35 +11,27 @@ and sets up the UI components using PySide6 (Qt for Python).
 import os
 import sys
 import logging
-import tempfile
-import webbrowser
 import threading
 from pathlib import Path
-import pandas as pd
-from PIL import Image
 
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QLabel, QPushButton, QLineEdit, QCheckBox, QFileDialog,
-    QProgressBar, QTextEdit, QGroupBox, QMessageBox, QFrame,
-    QApplication
+    QProgressBar, QPlainTextEdit, QGroupBox, QMessageBox, QFrame,
+    QApplication, QSpinBox
 )
-from PySide6.QtCore import Qt, QSize, Signal, QObject, Slot
-from PySide6.QtGui import QFont, QPixmap, QTextCursor, QIcon
+from PySide6.QtCore import Qt, QSize
+from PySide6.QtGui import QFont, QPixmap, QIcon, QShortcut, QKeySequence
 
-try:
-    # For SVG support
-    import cairosvg
-except ImportError:
-    cairosvg = None
-
-from src.ui.utils import (
-    load_image_to_pixmap, create_branded_header, 
-    load_svg_to_pixmap
-)
+from src.ui.utils import create_branded_header
 # We'll import these specifically in the methods for better error handling
 # from src.ui.templates import show_stores_template, show_excel_template
-from src.core.processors.file_processor import FileProcessor
+from src.ui.job_scheduler import JobScheduler
+from src.ui.input_preview import InputPreviewer
+from src.ui.startup import ProcessingLoader
+from src.ui.ui_updates import LogSink
+# The processing modules (pandas, openpyxl, the allocation engine) are imported
+# on first use or by the background warm-up, so the window paints first
 
 # Setup logging
 logging.basicConfig(
@@ -48,83 +40,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Worker class for background processing
-class ProcessingWorker(QObject):
-    """Worker object that runs the file processing in a separate thread"""
-    progress_update = Signal(str, int)
-    finished = Signal(bool, str)
-    log_message = Signal(str)
-    
-    def __init__(self, file_processor, stores_path, excel_path, output_dir, sheet_name):
-        super().__init__()
-        self.file_processor = file_processor
-        self.stores_path = stores_path
-        self.excel_path = excel_path
-        self.output_dir = output_dir
-        self.sheet_name = sheet_name
-    
-    @Slot()
-    def process(self):
-        """Process the files (runs in a separate thread)"""
-        try:
-            # Create output directory if it doesn't exist
-            os.makedirs(self.output_dir, exist_ok=True)
-            
-            self.log_message.emit(f"Starting processing with:")
-            self.log_message.emit(f"- Stores CSV: {self.stores_path}")
-            self.log_message.emit(f"- Excel File: {self.excel_path}")
-            self.log_message.emit(f"- Output Dir: {self.output_dir}")
-            self.log_message.emit(f"- Sheet Name: {self.sheet_name}")
-            
-            # Update status
-            self.progress_update.emit("Reading stores CSV...", 10)
-            
-            # Read stores from CSV file
-            stores_df = self.file_processor.read_stores_csv(self.stores_path)
-            
-            if stores_df is None or stores_df.empty:
-                raise Exception("Failed to read stores CSV or no stores found")
-                
-            self.log_message.emit(f"Found {len(stores_df)} stores in CSV")
-            
-            # Update status
-            self.progress_update.emit("Reading Excel file...", 20)
-            
-            # Read Excel file
-            xlsx_df = self.file_processor.load_xlsx_file(self.excel_path, self.sheet_name)
-            
-            if xlsx_df is None or xlsx_df.empty:
-                raise Exception("Failed to read Excel file or no data found")
-                
-            self.log_message.emit(f"Read Excel file with {len(xlsx_df)} rows and {len(xlsx_df.columns)} columns")
-            
-            # Process each store
-            total_stores = len(stores_df)
-            processed_count = 0
-            
-            for _, store_row in stores_df.iterrows():
-                store_name = store_row['store_name']
-                
-                # Update status
-                progress = 20 + (70 * processed_count / total_stores)
-                self.progress_update.emit(f"Processing store: {store_name}", int(progress))
-                
-                # Process the store
-                self.file_processor.process_store(store_name, xlsx_df, Path(self.output_dir))
-                
-                processed_count += 1
-                self.log_message.emit(f"Processed store: {store_name}")
-            
-            self.progress_update.emit("Processing completed successfully!", 100)
-            self.log_message.emit(f"Processing completed successfully. Output saved to: {self.output_dir}")
-            
-            # Signal success
-            self.finished.emit(True, f"Successfully processed {processed_count} stores.\nOutput files saved to: {self.output_dir}")
-            
-        except Exception as e:
-            self.progress_update.emit(f"Error: {e}", 0)
-            self.log_message.emit(f"Error processing files: {e}")
-            self.finished.emit(False, str(e))
+
+def __getattr__(name):
+    # ProcessingWorker moved to src.ui.processing_worker and is imported lazily
+    if name == "ProcessingWorker":
+        from src.ui.processing_worker import ProcessingWorker
+        return ProcessingWorker
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 class ExcelProcessorApp(QMainWindow):
     """Main application window for Excel File Processor (PySide6 version)"""
@@ -154,17 +77,57 @@ class ExcelProcessorApp(QMainWindow):
         self.output_dir = ""
         self.sheet_name = "PRE ALLOCATION"
         self.same_folder = True
-        self.processing = False
-        
-        # Create file processor instance
-        self.file_processor = FileProcessor()
+        # One worker writes the stores on the writer-thread pipeline; a process
+        # pool is only used when more workers are chosen in the spin box
+        self.workers = 1
+        self.incremental = False
+        self.resume = False
+        # Hidden diagnostics option, toggled with Ctrl+Shift+P
+        self.profile = os.environ.get("EXCEL_PROCESSOR_PROFILE") == "1"
+        # Output directory of every queued or running job
+        self.job_output_dirs = {}
+        
+        # File processor, created on first use (see the file_processor property)
+        self._file_processor = None
+        self._file_processor_lock = threading.Lock()
+        
+        # Run the processing jobs in the background, one at a time
+        self.scheduler = JobScheduler(self)
+        self.scheduler.job_started.connect(self.job_started)
+        self.scheduler.job_progress.connect(self.update_progress)
+        self.scheduler.job_messages.connect(self.log_job_messages)
+        self.scheduler.job_finished.connect(self.processing_finished)
+        self.scheduler.job_cancelled.connect(self.processing_cancelled)
+        self.scheduler.queue_changed.connect(self.update_queue_state)
+        
+        # Create the runs once the processing modules are loaded, without importing
+        # them on the UI thread
+        self.processing_loader = ProcessingLoader(lambda: self.file_processor, self)
+        self.processing_loader.loaded.connect(self.submit_processing_job)
+        
+        # Check the selected files in the background as soon as they are selected
+        self.previewer = InputPreviewer(lambda: self.file_processor, self)
+        self.previewer.preview_ready.connect(self.show_input_preview)
+        self.previewer.cache_warmed.connect(self.input_cache_warmed)
         
         # Set up the UI
         self.setup_ui()
         
+        profile_shortcut = QShortcut(QKeySequence("Ctrl+Shift+P"), self)
+        profile_shortcut.activated.connect(self.toggle_profile)
+        
         # Initialize with a log message
         self.log("Application started. Ready to process files.")
     
+    @property
+    def file_processor(self):
+        """File processor shared by the runs, created on first use by the UI thread or a preview"""
+        with self._file_processor_lock:
+            if self._file_processor is None:
+                from src.core.processors.file_processor import FileProcessor
+                self._file_processor = FileProcessor()
+            return self._file_processor
+    
     def center_window(self):
         """Center the window on the screen"""
         # Get the available geometry of the screen
@@ -404,6 +367,52 @@ class ExcelProcessorApp(QMainWindow):
         
         file_layout.addWidget(sheet_frame)
         
+        # Worker processes frame
+        workers_frame = QFrame()
+        workers_layout = QHBoxLayout(workers_frame)
+        workers_layout.setContentsMargins(0, 0, 0, 0)
+        
+        workers_label = QLabel("Worker Processes:")
+        workers_label.setFixedWidth(180)  # Same width as the other labels
+        workers_label.setStyleSheet("font-size: 13pt; font-weight: bold;")
+        workers_layout.addWidget(workers_label)
+        
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, (os.cpu_count() or 1) * 2)
+        self.workers_spin.setValue(self.workers)
+        self.workers_spin.setMinimumHeight(36)
+        self.workers_spin.setFixedWidth(100)
+        self.workers_spin.valueChanged.connect(self.set_workers)
+        workers_layout.addWidget(self.workers_spin)
+        workers_layout.addStretch()  # Align the spin box to the left
+        
+        file_layout.addWidget(workers_frame)
+        
+        # Incremental mode checkbox
+        incremental_frame = QFrame()
+        incremental_layout = QHBoxLayout(incremental_frame)
+        incremental_layout.setContentsMargins(0, 0, 0, 0)
+        
+        # Add a spacer with the same width as the labels for alignment
+        incremental_spacer = QWidget()
+        incremental_spacer.setFixedWidth(180)
+        incremental_layout.addWidget(incremental_spacer)
+        
+        self.incremental_check = QCheckBox("Only regenerate stores that changed since the last run")
+        self.incremental_check.setStyleSheet("font-size: 13pt;")
+        self.incremental_check.setChecked(self.incremental)
+        self.incremental_check.toggled.connect(self.set_incremental)
+        incremental_layout.addWidget(self.incremental_check)
+        
+        self.resume_check = QCheckBox("Resume the last interrupted run")
+        self.resume_check.setStyleSheet("font-size: 13pt;")
+        self.resume_check.setChecked(self.resume)
+        self.resume_check.toggled.connect(self.set_resume)
+        incremental_layout.addWidget(self.resume_check)
+        incremental_layout.addStretch()  # Align the checkboxes to the left
+        
+        file_layout.addWidget(incremental_frame)
+        
         #
         # PROCESSING SECTION
         #
@@ -455,6 +464,31 @@ class ExcelProcessorApp(QMainWindow):
         """)
         self.process_files_btn.clicked.connect(self.start_processing)
         process_layout.addWidget(self.process_files_btn)
+        
+        # Cancel button, enabled while runs are queued or running
+        self.cancel_btn = QPushButton("CANCEL")
+        self.cancel_btn.setStyleSheet("""
+            QPushButton {
+                background-color: white;
+                color: black;
+                border: 1px solid black;
+                border-radius: 3px;
+                padding: 8px 16px;
+                font-size: 12pt;
+                font-weight: bold;
+                text-transform: uppercase;
+            }
+            QPushButton:hover {
+                background-color: #eee;
+            }
+            QPushButton:disabled {
+                color: #aaa;
+                border: 1px solid #ddd;
+            }
+        """)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_processing)
+        process_layout.addWidget(self.cancel_btn)
         process_layout.addStretch()
         
         processing_layout.addWidget(process_frame)
@@ -522,11 +556,12 @@ class ExcelProcessorApp(QMainWindow):
         log_title.setStyleSheet("font-size: 13pt; font-weight: bold;")
         results_layout.addWidget(log_title)
         
-        # Log text area
-        self.log_text = QTextEdit()
+        # Log text area, written in batches by the log sink and capped in lines
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_sink = LogSink(self.log_text)
         self.log_text.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #f8f8f8;
                 border: 1px solid #ddd;
                 border-radius: 3px;
@@ -592,6 +627,7 @@ class ExcelProcessorApp(QMainWindow):
             self.stores_csv_path = filename
             self.stores_entry.setText(filename)
             self.log(f"Selected stores CSV file: {filename}")
+            self.preview_inputs()
     
     def browse_excel_file(self):
         """Browse for an Excel file"""
@@ -611,6 +647,34 @@ class ExcelProcessorApp(QMainWindow):
                 self.output_entry.setText(self.output_dir)
                 
             self.log(f"Selected Excel file: {filename}")
+            self.preview_inputs()
+    
+    def preview_inputs(self):
+        """
+        Check the selected files in the background: read the stores and the workbook
+        header, report the unmatched stores and parse the workbook into the cache.
+        """
+        if not self.excel_file_path and not self.stores_csv_path:
+            return
+        self.previewer.request(self.excel_file_path, self.stores_csv_path, self.sheet_name)
+    
+    def show_input_preview(self, preview):
+        """Log the result of the input check"""
+        for message in preview.describe():
+            self.log(message)
+        if preview.resolution is None or self.scheduler.has_jobs():
+            return
+        unmatched = len(preview.resolution.unmatched) + len(preview.resolution.ambiguous)
+        if unmatched:
+            self.status_label.setText(f"{unmatched} of {len(preview.resolution.columns)} stores "
+                                      f"not matched in the workbook (see log)")
+        else:
+            self.status_label.setText(f"All {len(preview.resolution.columns)} stores found. Ready to process")
+    
+    def input_cache_warmed(self, excel_path, cached):
+        """Log that the selected workbook was parsed ahead of the run"""
+        if cached:
+            self.log(f"{os.path.basename(excel_path)} is parsed and ready to process")
     
     def show_stores_template(self):
         """Show an example template for the stores CSV file"""
@@ -643,6 +707,24 @@ class ExcelProcessorApp(QMainWindow):
             self.output_dir = os.path.dirname(self.excel_file_path)
             self.output_entry.setText(self.output_dir)
     
+    def set_workers(self, value):
+        """Set the number of worker processes used for processing"""
+        self.workers = value
+    
+    def set_incremental(self, checked):
+        """Enable or disable incremental processing"""
+        self.incremental = checked
+    
+    def set_resume(self, checked):
+        """Enable or disable resuming the last interrupted run"""
+        self.resume = checked
+    
+    def toggle_profile(self):
+        """Enable or disable profiling of the next runs"""
+        self.profile = not self.profile
+        self.log(f"Profiling {'enabled' if self.profile else 'disabled'}: "
+                 f"runs save a profile to the output folder and use a single worker")
+    
     def show_process_diagram(self):
         """Show diagram illustrating the process flow"""
         process_svg_path = Path("process_bpmn/process.svg")
@@ -657,6 +739,7 @@ class ExcelProcessorApp(QMainWindow):
             
         try:
             # Try to open the SVG file with the default browser
+            import webbrowser
             webbrowser.open('file://' + str(process_svg_path.absolute()))
             self.log(f"Opened process diagram: {process_svg_path}")
         except Exception as e:
@@ -680,6 +763,7 @@ class ExcelProcessorApp(QMainWindow):
             
         try:
             # Open the HTML file with the default browser
+            import webbrowser
             webbrowser.open('file://' + str(guide_path.absolute()))
             self.log(f"Opened user guide: {guide_path}")
         except Exception as e:
@@ -724,53 +808,94 @@ class ExcelProcessorApp(QMainWindow):
             )
             return
             
-        if self.processing:
-            QMessageBox.warning(
-                self,
-                "Processing in Progress",
-                "Please wait for the current processing to complete."
-            )
-            return
+        if not self.scheduler.has_jobs():
+            self.status_label.setText("Processing...")
+            self.progress_bar.setValue(0)
             
-        # Start processing
-        self.processing = True
-        self.process_files_btn.setEnabled(False)
-        self.status_label.setText("Processing...")
-        self.progress_bar.setValue(0)
-        
-        # Clear log
-        self.log_text.clear()
-        self.log("Starting processing...")
+            # Clear log
+            self.log_sink.clear()
         
-        # Create worker thread for processing
-        self.worker = ProcessingWorker(
-            self.file_processor,
+        # Settings of the run, taken now in case they change while the
+        # processing modules are loading
+        settings = (
             self.stores_csv_path,
             self.excel_file_path,
             self.output_dir,
-            self.sheet_name
+            self.sheet_name,
+            self.workers,
+            self.incremental,
+            self.profile,
+            self.resume
         )
-        
-        # Connect signals
-        self.worker.progress_update.connect(self.update_progress)
-        self.worker.finished.connect(self.processing_finished)
-        self.worker.log_message.connect(self.log)
-        
-        # Create thread and start processing
-        self.thread = threading.Thread(target=self.worker.process)
-        self.thread.daemon = True
-        self.thread.start()
+        if not self.processing_loader.ready:
+            # Usually already loaded by the background warm-up
+            self.process_files_btn.setEnabled(False)
+            self.status_label.setText("Loading the processing modules...")
+        self.processing_loader.load(settings)
+    
+    def submit_processing_job(self, settings):
+        """Create the worker of a run and queue it, once the processing modules are loaded"""
+        self.process_files_btn.setEnabled(True)
+        from src.ui.processing_worker import ProcessingWorker
+        worker = ProcessingWorker(self.file_processor, *settings)
+        
+        # Queue the job; it starts once the running job finished
+        queued = self.scheduler.has_jobs()
+        excel_file_path, output_dir = settings[1], settings[2]
+        description = f"{os.path.basename(excel_file_path)} -> {output_dir}"
+        job_id = self.scheduler.submit(worker, description)
+        self.job_output_dirs[job_id] = output_dir
+        if queued:
+            self.log(f"Run {job_id} queued: {description} ({self.scheduler.job_count - 1} runs ahead of it)")
+        else:
+            self.log("Starting processing...")
+    
+    def cancel_processing(self):
+        """Cancel the running job and the queued ones"""
+        if not self.scheduler.has_jobs():
+            return
+        self.log("Cancelling: the running job stops before its next store")
+        self.status_label.setText("Cancelling...")
+        self.scheduler.cancel_all()
+    
+    def job_started(self, job_id, description):
+        """Reset the progress when a queued job starts"""
+        self.progress_bar.setValue(0)
+        self.status_label.setText("Processing...")
+        self.log(f"Run {job_id} started: {description}")
     
-    def update_progress(self, message, value):
+    def update_queue_state(self, job_count):
+        """Enable the cancel button while jobs are queued or running"""
+        self.cancel_btn.setEnabled(job_count > 0)
+    
+    def update_progress(self, job_id, message, value):
         """Update the progress bar and status message"""
         self.status_label.setText(message)
         self.progress_bar.setValue(value)
-        
-    def processing_finished(self, success, message):
+    
+    def log_job_messages(self, job_id, messages):
+        """Add the log messages delivered for a job in one update"""
+        for message in messages:
+            logger.info(message)
+        self.log_sink.extend(messages)
+    
+    def processing_cancelled(self, job_id, message):
+        """Handle a cancelled job"""
+        self.job_output_dirs.pop(job_id, None)
+        self.log(f"Run {job_id} cancelled: {message}")
+        if not self.scheduler.has_jobs():
+            self.status_label.setText("Processing cancelled")
+    
+    def processing_finished(self, job_id, success, message):
         """Handle the completion of processing"""
-        self.processing = False
-        self.process_files_btn.setEnabled(True)
+        output_dir = self.job_output_dirs.pop(job_id, self.output_dir)
+        if self.scheduler.has_jobs():
+            # Do not interrupt the queued runs with a dialog
+            self.log(f"Run {job_id} finished: {'SUCCESS' if success else 'FAILED - ' + message}")
+            return
         
+        # Show the last lines of the run before the dialog
+        self.log_sink.flush()
         if success:
             QMessageBox.information(
                 self,
@@ -778,14 +903,14 @@ class ExcelProcessorApp(QMainWindow):
                 message
             )
             # Open output directory
-            if os.path.exists(self.output_dir):
+            if os.path.exists(output_dir):
                 try:
                     if sys.platform == 'win32':
-                        os.startfile(self.output_dir)
+                        os.startfile(output_dir)
                     elif sys.platform == 'darwin':  # macOS
-                        os.system(f'open "{self.output_dir}"')
+                        os.system(f'open "{output_dir}"')
                     else:  # Linux
-                        os.system(f'xdg-open "{self.output_dir}"')
+                        os.system(f'xdg-open "{output_dir}"')
                 except Exception as e:
                     self.log(f"Could not open output directory: {e}")
         else:
@@ -797,14 +922,27 @@ class ExcelProcessorApp(QMainWindow):
             
         self.log(f"Processing finished: {'SUCCESS' if success else 'FAILED - ' + message}")
         
+    def closeEvent(self, event):
+        """Cancel the queued and running jobs before the window closes"""
+        if self.scheduler.has_jobs():
+            answer = QMessageBox.question(
+                self,
+                "Processing in Progress",
+                "Processing is still running. Cancel it and quit?\n\n"
+                "The stores already written are kept and the run can be resumed."
+            )
+            if answer != QMessageBox.Yes:
+                event.ignore()
+                return
+            self.scheduler.cancel_all()
+            # The running job stops after the store it is writing
+            self.scheduler.wait_for_done()
+        event.accept()
+    
     def log(self, message):
         """Add a message to the log text area"""
         # Log to console
         logger.info(message)
         
-        # Add to log text area
-        self.log_text.append(message)
-        
-        # Scroll to the bottom
-        self.log_text.moveCursor(QTextCursor.End)
-        self.log_text.ensureCursorVisible()
\ No newline at end of file
+        # Add to log text area on the next frame
+        self.log_sink.append(message)
\ No newline at end of file
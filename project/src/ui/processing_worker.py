@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Processing worker module for Excel File Processor GUI (PySide6 version).
+
+This module defines the ProcessingWorker class that runs a processing job in the
+background: it reads the stores CSV and the Excel file, writes the store files
+and reports progress, log messages and the result through Qt signals.
+
+It imports the processing modules (pandas, openpyxl and the allocation engine),
+so the main window only imports it once the first run starts, or in the
+background warm-up after the window is shown.
+"""
+
+import os
+import logging
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+
+from PySide6.QtCore import Signal, QObject, Slot
+
+from src.core.processors.allocation_engine import STATUS_UNCHANGED, STATUS_RESUMED, STATUS_CANCELLED
+from src.core.utils.output_pipeline import DEFAULT_WRITER_THREADS
+from src.core.utils.profiling import RunProfiler
+from src.core.utils.progress_model import ProgressModel, format_duration
+from src.core.utils.instrumentation import (
+    RunRecorder, recording, format_report_table, write_report, REPORT_FILENAME
+)
+from src.ui.ui_updates import RateLimiter
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Share of the progress bar taken by reading the input files; the stores take the rest
+STORES_PROGRESS_START = 20
+
+class ProcessingCancelled(Exception):
+    """Raised when a run is cancelled before its stores are written"""
+
+# Worker class for background processing
+class ProcessingWorker(QObject):
+    """Worker object that runs the file processing in a separate thread"""
+    progress_update = Signal(str, int)
+    finished = Signal(bool, str)
+    log_message = Signal(str)
+    
+    def __init__(self, file_processor, stores_path, excel_path, output_dir, sheet_name, workers=1,
+                 incremental=False, profile=False, resume=False):
+        super().__init__()
+        self.file_processor = file_processor
+        self.stores_path = stores_path
+        self.excel_path = excel_path
+        self.output_dir = output_dir
+        self.sheet_name = sheet_name
+        self.workers = workers
+        self.incremental = incremental
+        self.profile = profile
+        self.resume = resume
+        # Write the store files on background threads while the next stores are prepared
+        self.writer_threads = DEFAULT_WRITER_THREADS
+        if profile:
+            # Only the processing thread is profiled, so write the stores in it
+            self.workers = 1
+            self.writer_threads = 0
+        # Error message of every store whose files could not be written
+        self.store_errors = {}
+        # Set from the UI thread to stop the run before its next store
+        self._cancel_event = threading.Event()
+        # Per-store progress updates are limited to a few per second
+        self.progress_limiter = RateLimiter()
+        # Work-weighted progress of the stores, created once their work is known
+        self.progress_model = None
+    
+    def cancel(self):
+        """Ask the run to stop before its next store (thread-safe)"""
+        self._cancel_event.set()
+    
+    def is_cancelled(self):
+        """Return True once the run was asked to stop"""
+        return self._cancel_event.is_set()
+    
+    def check_cancelled(self):
+        """Stop the run if it was cancelled before any store was written"""
+        if self.is_cancelled():
+            raise ProcessingCancelled("Processing was cancelled before any store was written")
+    
+    @Slot()
+    def process(self):
+        """Process the files (runs in a separate thread)"""
+        # Time the phases of the run for the run report
+        with recording(RunRecorder()) as recorder:
+            try:
+                # Create output directory if it doesn't exist
+                os.makedirs(self.output_dir, exist_ok=True)
+                
+                self.log_message.emit(f"Starting processing with:")
+                self.log_message.emit(f"- Stores CSV: {self.stores_path}")
+                self.log_message.emit(f"- Excel File: {self.excel_path}")
+                self.log_message.emit(f"- Output Dir: {self.output_dir}")
+                self.log_message.emit(f"- Sheet Name: {self.sheet_name}")
+                self.log_message.emit(f"- Worker Processes: {self.workers}")
+                self.log_message.emit(f"- Incremental: {'Yes' if self.incremental else 'No'}")
+                self.log_message.emit(f"- Resume Interrupted Run: {'Yes' if self.resume else 'No'}")
+                if self.profile:
+                    self.log_message.emit("- Profiling: Yes")
+                
+                # Profile the run when profiling is enabled
+                profiler = RunProfiler(self.output_dir) if self.profile else nullcontext()
+                with profiler:
+                    # Update status
+                    self.progress_update.emit("Reading stores CSV...", 10)
+                    
+                    # Read stores from CSV file
+                    stores_df = self.file_processor.read_stores_csv(self.stores_path)
+                    
+                    if stores_df is None or stores_df.empty:
+                        raise Exception("Failed to read stores CSV or no stores found")
+                        
+                    self.log_message.emit(f"Found {len(stores_df)} stores in CSV")
+                    self.check_cancelled()
+                    
+                    # Update status
+                    self.progress_update.emit("Reading Excel file...", 20)
+                    
+                    # Read Excel file, loading only the columns needed for the stores
+                    store_names = stores_df['store_name'].tolist()
+                    xlsx_df = self.file_processor.load_allocation_sheet(self.excel_path, self.sheet_name, store_names)
+                    
+                    if xlsx_df is None or len(xlsx_df) == 0:
+                        raise Exception("Failed to read Excel file or no data found")
+                        
+                    if self.file_processor.last_cache_status == "hit":
+                        self.log_message.emit("Workbook cache hit: loaded the parsed sheet from the cache")
+                    elif self.file_processor.last_cache_status == "miss":
+                        self.log_message.emit("Workbook cache miss: parsed the Excel file and cached the sheet")
+                    self.log_message.emit(f"Read Excel file with {len(xlsx_df)} rows and {len(xlsx_df.columns)} columns")
+                    self.check_cancelled()
+                    
+                    # Report the stores that cannot be processed before writing anything
+                    resolution = self.file_processor.resolve_store_columns(xlsx_df, store_names)
+                    for store_name, matches in resolution.ambiguous.items():
+                        self.log_message.emit(f"Warning: store '{store_name}' matches several columns and will be skipped: {matches}")
+                    if resolution.unmatched:
+                        self.log_message.emit(f"Warning: {len(resolution.unmatched)} stores not found in the Excel file: {', '.join(resolution.unmatched)}")
+                    
+                    # Process all stores in a single pass
+                    self.progress_update.emit(f"Processing {len(store_names)} stores...", STORES_PROGRESS_START)
+                    
+                    statuses = self.file_processor.process_stores(
+                        store_names, xlsx_df, Path(self.output_dir), self.store_processed, self.workers,
+                        incremental=self.incremental, writer_threads=self.writer_threads,
+                        error_callback=self.store_failed, journal=True, resume=self.resume,
+                        cancel_check=self.is_cancelled, work_callback=self.work_planned
+                    )
+                    processed_count = len(statuses)
+                    unchanged_count = sum(1 for status in statuses.values() if status == STATUS_UNCHANGED)
+                    if self.incremental:
+                        self.log_message.emit(f"Incremental run: {unchanged_count} unchanged stores skipped, "
+                                              f"{processed_count - unchanged_count} stores regenerated")
+                    model = self.progress_model
+                    if model is not None and model.done_rows:
+                        self.log_message.emit(
+                            f"Wrote {model.done_rows:,} rows and {model.done_units:,} label units in "
+                            f"{format_duration(model.elapsed)} ({model.rows_per_second:,.0f} rows/s, "
+                            f"{model.units_per_second:,.0f} units/s)")
+                    resumed_count = sum(1 for status in statuses.values() if status == STATUS_RESUMED)
+                    if resumed_count:
+                        self.log_message.emit(f"Resumed run: {resumed_count} stores completed by the "
+                                              f"interrupted run skipped")
+                
+                if self.profile:
+                    self.log_message.emit(f"Profile saved to: {profiler.prof_path}")
+                    self.log_message.emit(f"Collapsed stacks saved to: {profiler.collapsed_path}")
+                    for line in profiler.summary():
+                        self.log_message.emit(line)
+                
+                self.report_run(recorder)
+                
+                cancelled_count = sum(1 for status in statuses.values() if status == STATUS_CANCELLED)
+                if cancelled_count:
+                    self.progress_update.emit("Processing cancelled", 100)
+                    self.log_message.emit(f"Processing cancelled: {cancelled_count} of {processed_count} stores "
+                                          f"were not written")
+                    self.finished.emit(False, f"Processing was cancelled: {cancelled_count} of {processed_count} "
+                                              f"stores were not written.\nTick 'Resume the last interrupted run' "
+                                              f"to continue from the first unwritten store.")
+                    return
+                
+                if self.store_errors:
+                    failed_list = ', '.join(self.store_errors)
+                    self.progress_update.emit("Processing finished with errors", 100)
+                    self.log_message.emit(f"Processing finished with errors: {len(self.store_errors)} stores "
+                                          f"could not be written: {failed_list}")
+                    first_error = next(iter(self.store_errors.values()))
+                    self.finished.emit(False, f"{len(self.store_errors)} of {processed_count} stores could not "
+                                              f"be written: {failed_list}\n\nFirst error: {first_error}")
+                    return
+                
+                self.progress_update.emit("Processing completed successfully!", 100)
+                self.log_message.emit(f"Processing completed successfully. Output saved to: {self.output_dir}")
+                
+                # Signal success
+                self.finished.emit(True, f"Successfully processed {processed_count} stores.\nOutput files saved to: {self.output_dir}")
+                
+            except ProcessingCancelled as e:
+                self.progress_update.emit("Processing cancelled", 0)
+                self.log_message.emit(str(e))
+                self.finished.emit(False, str(e))
+            except Exception as e:
+                self.progress_update.emit(f"Error: {e}", 0)
+                self.log_message.emit(f"Error processing files: {e}")
+                self.finished.emit(False, str(e))
+    
+    def report_run(self, recorder):
+        """Write the JSON run report to the output directory and log its summary table"""
+        report = recorder.report(
+            stores_csv=str(self.stores_path),
+            excel_file=str(self.excel_path),
+            sheet_name=self.sheet_name,
+            workers=self.workers,
+            writer_threads=self.writer_threads,
+            incremental=self.incremental,
+            resume=self.resume,
+            cache=self.file_processor.last_cache_status
+        )
+        report_path = Path(self.output_dir) / REPORT_FILENAME
+        if write_report(report, report_path):
+            self.log_message.emit(f"Run report saved to: {report_path}")
+        for line in format_report_table(report):
+            self.log_message.emit(line)
+    
+    def store_failed(self, store_name, message):
+        """Record a store whose files could not be written"""
+        self.store_errors[store_name] = message
+        self.log_message.emit(f"Error writing store {store_name}: {message}")
+    
+    def work_planned(self, work):
+        """Start the work-weighted progress once the work of the stores is known"""
+        self.progress_model = ProgressModel(work)
+        self.log_message.emit(f"Writing {len(work)} stores: {self.progress_model.total_rows:,} rows and "
+                              f"{self.progress_model.total_units:,} label units")
+    
+    def store_processed(self, store_name, processed_count, total_stores):
+        """Report progress after a store has been processed"""
+        self.log_message.emit(f"Processed store: {store_name}")
+        model = self.progress_model
+        if model is not None:
+            model.complete(store_name)
+        if processed_count == total_stores or self.progress_limiter.ready():
+            status = f"Processed store: {store_name}"
+            if model is not None and model.total_weight:
+                # Weighted by the rows and units of the stores, not their count
+                fraction = model.fraction
+                status = f"{status} | {model.describe()}"
+            else:
+                fraction = processed_count / total_stores
+            progress = STORES_PROGRESS_START + (100 - STORES_PROGRESS_START - 1) * fraction
+            self.progress_update.emit(status, int(progress))
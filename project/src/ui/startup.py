@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Startup module for a fast application start (PySide6 version).
+
+This module provides functionality to:
+1. Import the processing modules (pandas, openpyxl and the allocation engine) in
+   a background thread once the main window is shown, so that the first run does
+   not wait for them
+2. Load the processing modules and the file processor on a thread of the pool
+   when a run is started before the warm-up finished, so that the window does
+   not freeze while they are imported
+3. Parse the output of `python -X importtime` to measure the cost of importing
+   a module, for the startup tests
+"""
+
+import time
+import logging
+import importlib
+import threading
+from typing import Any, Callable, Dict, Iterable, NamedTuple
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Modules imported after the window is shown, heaviest dependencies first
+WARMUP_MODULES = (
+    "pandas",
+    "openpyxl",
+    "src.core.processors.file_processor",
+    "src.ui.processing_worker",
+)
+
+
+class ImportTime(NamedTuple):
+    """Import time of a module reported by -X importtime, in microseconds."""
+    self_us: int
+    cumulative_us: int
+
+
+def warm_up_imports(modules: Iterable[str] = WARMUP_MODULES) -> None:
+    """
+    Import modules ahead of their first use.
+
+    Args:
+        modules (Iterable[str]): Names of the modules to import
+    """
+    started = time.perf_counter()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            # The import is retried, and reported, when the module is used
+            logger.warning(f"Could not preload {name}: {e}")
+    logger.info(f"Processing modules loaded in the background in {time.perf_counter() - started:.2f} s")
+
+
+def start_warmup(modules: Iterable[str] = WARMUP_MODULES) -> threading.Thread:
+    """
+    Import modules in a background thread.
+
+    Args:
+        modules (Iterable[str]): Names of the modules to import
+
+    Returns:
+        threading.Thread: The started warm-up thread
+    """
+    thread = threading.Thread(target=warm_up_imports, args=(tuple(modules),), name="import-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+class LoaderSignals(QObject):
+    """Signals of a load task, delivered on the UI thread."""
+    loaded = Signal(object)
+
+
+class LoadTask(QRunnable):
+    """Runnable that imports the processing modules and creates the file processor."""
+
+    def __init__(self, modules: Iterable[str], file_processor_factory: Callable[[], object], request: Any,
+                 signals: LoaderSignals):
+        super().__init__()
+        self.modules = tuple(modules)
+        self.file_processor_factory = file_processor_factory
+        self.request = request
+        self.signals = signals
+
+    def run(self) -> None:
+        """Import the modules, then create the file processor (runs on a thread of the pool)"""
+        warm_up_imports(self.modules)
+        try:
+            self.file_processor_factory()
+        except Exception as e:
+            # Reported again when the run creates it
+            logger.warning(f"Could not create the file processor: {e}")
+        self.signals.loaded.emit(self.request)
+
+
+class ProcessingLoader(QObject):
+    """Delivers run requests once the processing modules are loaded."""
+    loaded = Signal(object)
+
+    def __init__(self, file_processor_factory: Callable[[], object], parent: QObject = None,
+                 pool: QThreadPool = None, modules: Iterable[str] = WARMUP_MODULES):
+        """
+        Create the loader.
+
+        Args:
+            file_processor_factory (Callable[[], object]): Returns the file processor
+                of the runs; called on a thread of the pool the first time
+            parent (QObject): Parent object, such as the main window
+            pool (QThreadPool): Thread pool of the load task (default: the global pool)
+            modules (Iterable[str]): Names of the modules a run needs
+        """
+        super().__init__(parent)
+        self._file_processor_factory = file_processor_factory
+        self._pool = pool or QThreadPool.globalInstance()
+        self._modules = tuple(modules)
+        self._signals = LoaderSignals(self)
+        self._signals.loaded.connect(self._deliver)
+        self._ready = False
+
+    @property
+    def ready(self) -> bool:
+        """True once the modules and the file processor are loaded"""
+        return self._ready
+
+    def load(self, request: Any) -> None:
+        """
+        Deliver a run request through the loaded signal once the modules are loaded.
+
+        The request is delivered right away when they already are, and after a
+        load task on the pool otherwise; the UI thread never imports them.
+
+        Args:
+            request (Any): Settings of the run, passed on to the loaded signal
+        """
+        if self._ready:
+            self.loaded.emit(request)
+            return
+        self._pool.start(LoadTask(self._modules, self._file_processor_factory, request, self._signals))
+
+    def _deliver(self, request: Any) -> None:
+        self._ready = True
+        self.loaded.emit(request)
+
+
+def parse_importtime(output: str) -> Dict[str, ImportTime]:
+    """
+    Parse the report printed to stderr by `python -X importtime`.
+
+    Args:
+        output (str): Lines such as "import time:   self [us] | cumulative | module"
+
+    Returns:
+        Dict[str, ImportTime]: Import time of every imported module
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # Header line
+            continue
+        times[fields[2].strip()] = ImportTime(int(fields[0]), int(fields[1]))
+    return times
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+UI updates module for throttling log and progress delivery (PySide6 version).
+
+This module provides functionality to:
+1. Buffer log messages in a bounded ring buffer that any thread can append to,
+   dropping the oldest messages when the UI falls behind
+2. Flush the buffered messages to a QPlainTextEdit in one batch per frame, with
+   the number of retained lines capped by maximumBlockCount
+3. Rate-limit progress updates by time
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Iterable, List, Optional
+
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtWidgets import QPlainTextEdit
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Messages buffered between two flushes before the oldest ones are dropped
+MAX_BUFFERED_MESSAGES = 2000
+
+# Lines kept in the log widget; older lines are removed as new ones arrive
+MAX_LOG_LINES = 5000
+
+# Interval at which buffered messages are written to the log widget (~30 fps)
+LOG_FRAME_INTERVAL_MS = 33
+
+# Minimum interval between two progress updates of a run
+PROGRESS_INTERVAL_SECONDS = 0.1
+
+
+class MessageRing:
+    """Thread-safe ring buffer of log messages."""
+
+    def __init__(self, capacity: int = MAX_BUFFERED_MESSAGES):
+        self._lock = threading.Lock()
+        self._messages: deque = deque(maxlen=capacity)
+        self._dropped = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._messages)
+
+    def append(self, message: str) -> None:
+        with self._lock:
+            if len(self._messages) == self._messages.maxlen:
+                self._dropped += 1
+            self._messages.append(message)
+
+    def extend(self, messages: Iterable[str]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._messages.clear()
+            self._dropped = 0
+
+    def drain(self) -> List[str]:
+        """
+        Take the buffered messages.
+
+        Returns:
+            List[str]: Buffered messages, oldest first, preceded by a note with the
+                number of messages dropped since the last drain
+        """
+        with self._lock:
+            messages = list(self._messages)
+            dropped = self._dropped
+            self._messages.clear()
+            self._dropped = 0
+        if dropped:
+            messages.insert(0, f"... {dropped} log lines skipped ...")
+        return messages
+
+
+class LogSink(QObject):
+    """
+    Writes the messages of a ring buffer to a log widget at a fixed frame rate.
+
+    The sink is used from the UI thread; the messages of background jobs reach it
+    through the job scheduler.
+    """
+
+    def __init__(self, widget: QPlainTextEdit, frame_interval_ms: int = LOG_FRAME_INTERVAL_MS,
+                 capacity: int = MAX_BUFFERED_MESSAGES, max_lines: int = MAX_LOG_LINES):
+        """
+        Cap the lines of the widget and create the flush timer.
+
+        Args:
+            widget (QPlainTextEdit): Log widget
+            frame_interval_ms (int): Interval at which messages are written
+            capacity (int): Messages buffered between two flushes
+            max_lines (int): Lines kept in the widget
+        """
+        super().__init__(widget)
+        self.widget = widget
+        self.widget.setMaximumBlockCount(max_lines)
+        self._messages = MessageRing(capacity)
+        self._timer = QTimer(self)
+        self._timer.setInterval(frame_interval_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def append(self, message: str) -> None:
+        """Buffer a message until the next frame"""
+        self._messages.append(message)
+        self._schedule()
+
+    def extend(self, messages: Iterable[str]) -> None:
+        """Buffer messages until the next frame"""
+        self._messages.extend(messages)
+        self._schedule()
+
+    def clear(self) -> None:
+        """Drop the buffered messages and clear the widget"""
+        self._messages.clear()
+        self.widget.clear()
+
+    def _schedule(self) -> None:
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Write the buffered messages to the widget in one update (runs on the UI thread)"""
+        messages = self._messages.drain()
+        if not messages:
+            self._timer.stop()
+            return
+        self.widget.appendPlainText("\n".join(messages))
+        scroll_bar = self.widget.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+
+class RateLimiter:
+    """Allows an action at most once per interval."""
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.interval = interval
+        self._last: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def ready(self) -> bool:
+        """
+        Check whether the interval passed since the last allowed action.
+
+        Returns:
+            bool: True if the action may run now; the interval restarts
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._last is not None and now - self._last < self.interval:
+                return False
+            self._last = now
+            return True
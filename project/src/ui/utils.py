@@ -14,14 +14,14 @@ import logging
 import tempfile
 import io
 from pathlib import Path
-from PIL import Image
 from PySide6.QtWidgets import (
     QLabel, QFrame, QVBoxLayout, QHBoxLayout, QLineEdit, 
     QPushButton, QProgressBar, QTextEdit, QScrollBar
 )
 from PySide6.QtGui import QPixmap, QImage, QIcon
 from PySide6.QtCore import Qt, QSize
-from PySide6.QtSvg import QSvgRenderer
+# PIL and QtSvg are only needed to load images and are imported on first use,
+# so that the main window starts without them
 
 # Setup logging
 logging.basicConfig(
@@ -46,6 +46,8 @@ def load_svg_to_pixmap(svg_path, width=None, height=None):
     
     if svg_path.exists():
         try:
+            from PySide6.QtSvg import QSvgRenderer
+            
             # Create SVG renderer
             renderer = QSvgRenderer(str(svg_path))
             
@@ -100,6 +102,8 @@ def load_image_to_pixmap(image_path, height=80):
     
     if image_path.exists():
         try:
+            from PIL import Image
+            
             # Load the image using PIL
             pil_image = Image.open(image_path)
             
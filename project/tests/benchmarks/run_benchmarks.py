@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark harness for the allocation pipeline.
+
+This module provides functionality to:
+1. Generate a synthetic PRE ALLOCATION workbook and stores CSV at a given scale
+2. Time every phase of a run: CSV read, Excel load, column resolution,
+   per-store xlsx write, TXT write and the end-to-end engine run
+3. Write the timings with the scale and environment to a JSON file so that
+   results can be compared between releases
+
+Usage:
+    python -m tests.benchmarks.run_benchmarks --rows 5000 --stores 40 --output results.json
+"""
+
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.core.processors.allocation_engine import process_all_stores, resolve_store_columns, split_store_frames
+from src.core.processors.file_processor import FileProcessor
+from src.core.processors.store_processor import (
+    identify_required_columns,
+    get_valid_filename,
+    get_valid_sheet_name,
+    get_txt_filename,
+    open_excel_writer,
+    write_excel_sheet,
+    create_txt_file_with_repeated_eancodes,
+    EXCEL_WRITERS,
+    DEFAULT_EXCEL_WRITER
+)
+from src.core.utils.file_utils import load_allocation_sheet
+from src.core.utils.xlsx_reader import READER_BACKENDS, READER_VERSION
+from tests.benchmarks.workbook_generator import WorkbookSpec, QUANTITY_DISTRIBUTIONS, write_benchmark_inputs
+
+# Bumped whenever the phases or the layout of the results change
+BENCHMARK_VERSION = 1
+
+PHASES = ['csv_read', 'excel_load', 'column_resolution', 'xlsx_write', 'txt_write', 'end_to_end']
+
+
+def timed(func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, float]:
+    """Call a function and return its result and wall time in seconds."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def write_store_workbooks(store_frames: Dict[str, pd.DataFrame], ean_col: str, season_col: str,
+                          output_dir: Path, excel_writer: str) -> None:
+    """Write the xlsx file of every store, as write_store_outputs does."""
+    for store_col, store_df in store_frames.items():
+        excel_file_path = output_dir / f"{get_valid_filename(store_col)}.xlsx"
+        with open_excel_writer(excel_file_path, excel_writer) as writer:
+            write_excel_sheet(writer, store_df, 'ALL_SEASONS')
+            for season, season_df in store_df.groupby(season_col, sort=False):
+                write_excel_sheet(writer, season_df, get_valid_sheet_name(season))
+
+
+def write_store_txt_files(store_frames: Dict[str, pd.DataFrame], ean_col: str, season_col: str,
+                          output_dir: Path) -> None:
+    """Write the TXT file of every store-season combination, as write_store_outputs does."""
+    for store_col, store_df in store_frames.items():
+        valid_filename = get_valid_filename(store_col)
+        for season, season_df in store_df.groupby(season_col, sort=False):
+            create_txt_file_with_repeated_eancodes(
+                season_df, ean_col, store_col, output_dir / get_txt_filename(valid_filename, season)
+            )
+
+
+def run_iteration(excel_path: Path, stores_path: Path, work_dir: Path, backend: str,
+                  excel_writer: str, workers: int) -> Dict[str, float]:
+    """
+    Run every phase once and return its wall time.
+
+    Args:
+        excel_path (Path): Path to the allocation workbook
+        stores_path (Path): Path to the stores CSV
+        work_dir (Path): Scratch directory for the outputs
+        backend (str): Excel reader backend
+        excel_writer (str): Excel writer mode
+        workers (int): Worker processes of the end-to-end run
+
+    Returns:
+        Dict[str, float]: Seconds spent in every phase
+    """
+    file_processor = FileProcessor(reader_backend=backend, cache_dir=None)
+    timings = {}
+
+    stores_df, timings['csv_read'] = timed(file_processor.read_stores_csv, stores_path)
+    store_names = stores_df['store_name'].tolist()
+
+    xlsx_df, timings['excel_load'] = timed(load_allocation_sheet, excel_path, 'PRE ALLOCATION', store_names, backend)
+
+    resolution, timings['column_resolution'] = timed(resolve_store_columns, xlsx_df, store_names)
+    ean_col, season_col = identify_required_columns(xlsx_df)
+    matched_columns = list(dict.fromkeys(col for col in resolution.columns.values() if col is not None))
+    store_frames = split_store_frames(xlsx_df, ean_col, season_col, matched_columns)
+
+    phase_runs = {
+        'xlsx_write': lambda output_dir: write_store_workbooks(
+            store_frames, ean_col, season_col, output_dir, excel_writer
+        ),
+        'txt_write': lambda output_dir: write_store_txt_files(store_frames, ean_col, season_col, output_dir),
+        'end_to_end': lambda output_dir: process_all_stores(
+            store_names, xlsx_df, output_dir, workers=workers, excel_writer=excel_writer
+        )
+    }
+    for phase, run_phase in phase_runs.items():
+        output_dir = work_dir / phase
+        output_dir.mkdir(parents=True, exist_ok=True)
+        _, timings[phase] = timed(run_phase, output_dir)
+        shutil.rmtree(output_dir)
+
+    return timings
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Summarize the timings of a phase across the repeats."""
+    return {
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'max': max(samples),
+        'samples': samples
+    }
+
+
+def run_benchmarks(spec: WorkbookSpec, repeat: int = 3, backend: str = 'xml',
+                   excel_writer: str = DEFAULT_EXCEL_WRITER, workers: int = 1,
+                   work_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Generate the inputs for a spec and time every phase.
+
+    Args:
+        spec (WorkbookSpec): Scale of the synthetic workbook
+        repeat (int): Number of timed iterations
+        backend (str): Excel reader backend
+        excel_writer (str): Excel writer mode
+        workers (int): Worker processes of the end-to-end run
+        work_dir (Optional[Path]): Scratch directory; a temporary directory if None
+
+    Returns:
+        Dict[str, Any]: JSON-serializable benchmark results
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        temp_dir = Path(temp_dir)
+        (excel_path, stores_path), generation_time = timed(write_benchmark_inputs, spec, temp_dir / 'inputs')
+
+        iterations = [
+            run_iteration(excel_path, stores_path, temp_dir / f'run{i}', backend, excel_writer, workers)
+            for i in range(repeat)
+        ]
+        workbook_bytes = excel_path.stat().st_size
+
+    return {
+        'benchmark_version': BENCHMARK_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'reader_version': READER_VERSION
+        },
+        'config': {
+            'workbook': spec.to_dict(),
+            'repeat': repeat,
+            'backend': backend,
+            'excel_writer': excel_writer,
+            'workers': workers
+        },
+        'workbook_bytes': workbook_bytes,
+        'generation_seconds': generation_time,
+        'phases': {phase: summarize([timings[phase] for timings in iterations]) for phase in PHASES}
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse the command-line arguments.
+
+    Args:
+        argv (list, optional): Arguments to parse (default: sys.argv[1:])
+
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    defaults = WorkbookSpec()
+    parser = argparse.ArgumentParser(description="Benchmark the allocation pipeline on a synthetic workbook.")
+    parser.add_argument("--rows", type=int, default=defaults.rows, help="rows of the allocation sheet")
+    parser.add_argument("--stores", type=int, default=defaults.stores, help="number of store columns")
+    parser.add_argument("--seasons", type=int, default=defaults.seasons, help="number of distinct seasons")
+    parser.add_argument("--fill-rate", type=float, default=defaults.fill_rate,
+                        help="share of store cells holding a quantity")
+    parser.add_argument("--distribution", choices=QUANTITY_DISTRIBUTIONS, default=defaults.quantity_distribution,
+                        help="distribution of the allocated quantities")
+    parser.add_argument("--mean-quantity", type=float, default=defaults.mean_quantity,
+                        help="mean allocated quantity (poisson and geometric)")
+    parser.add_argument("--max-quantity", type=int, default=defaults.max_quantity,
+                        help="largest allocated quantity")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="random seed")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed iterations")
+    parser.add_argument("--backend", choices=sorted(READER_BACKENDS), default='xml', help="Excel reader backend")
+    parser.add_argument("--excel-writer", choices=EXCEL_WRITERS, default=DEFAULT_EXCEL_WRITER,
+                        help="Excel writer mode")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes of the end-to-end run")
+    parser.add_argument("--output", type=Path, help="JSON file to write the results to (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    """Run the benchmarks and write the results as JSON."""
+    args = parse_args(argv)
+
+    spec = WorkbookSpec(
+        rows=args.rows,
+        stores=args.stores,
+        seasons=args.seasons,
+        fill_rate=args.fill_rate,
+        quantity_distribution=args.distribution,
+        mean_quantity=args.mean_quantity,
+        max_quantity=args.max_quantity,
+        seed=args.seed
+    )
+    # Keep the per-store log output out of the measured time
+    logging.disable(logging.INFO)
+    try:
+        benchmark_results = run_benchmarks(spec, args.repeat, args.backend, args.excel_writer, args.workers)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    output = json.dumps(benchmark_results, indent=2)
+    if args.output:
+        args.output.write_text(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic PRE ALLOCATION workbook generator for benchmarks.
+
+This module provides functionality to:
+1. Generate allocation sheets laid out like the production template
+   (sku + size, SKU, SIZE, EANCode, SEASON, QTY, STOCK and one column per store)
+2. Control the number of rows, stores and seasons, the share of filled store
+   cells and the distribution of the allocated quantities
+3. Write the sheet to an xlsx file and the store names to a stores CSV
+"""
+
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.core.utils.xlsx_writer import StreamingWorkbookWriter
+
+QUANTITY_DISTRIBUTIONS = ('poisson', 'uniform', 'geometric')
+
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL', 44, 46, 48, 50, 52]
+COUNTRIES = ['IT', 'DE', 'ES', 'NL', 'AT', 'CH', 'US', 'RU', 'FR', 'UK']
+
+
+@dataclass
+class WorkbookSpec:
+    """Scale and value distribution of a synthetic allocation workbook."""
+    rows: int = 1000
+    stores: int = 28
+    seasons: int = 10
+    fill_rate: float = 0.7
+    quantity_distribution: str = 'poisson'
+    mean_quantity: float = 1.8
+    max_quantity: int = 10
+    seed: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the spec as a JSON-serializable dict."""
+        return asdict(self)
+
+
+def make_season_names(count: int) -> List[str]:
+    """Build season names in the styles used by the template ('S25 07', 'W24', 'W21 Main')."""
+    suffixes = [' 07', '', ' Main']
+    return [f"{'SW'[i % 2]}{25 - i // 2}{suffixes[i % 3]}" for i in range(count)]
+
+
+def make_store_names(count: int) -> List[str]:
+    """Build unique store names in the style of the template columns."""
+    return [f"PP {COUNTRIES[i % len(COUNTRIES)]} City {i + 1} Outlet 25" for i in range(count)]
+
+
+def draw_quantities(spec: WorkbookSpec, rng: np.random.Generator, size: Tuple[int, int]) -> np.ndarray:
+    """
+    Draw the allocated quantities of the store cells.
+
+    Args:
+        spec (WorkbookSpec): Workbook spec
+        rng (np.random.Generator): Random generator
+        size (Tuple[int, int]): Shape of the store block (rows, stores)
+
+    Returns:
+        np.ndarray: Float quantities between 1 and max_quantity
+    """
+    if spec.quantity_distribution == 'poisson':
+        quantities = 1 + rng.poisson(max(spec.mean_quantity - 1, 0), size)
+    elif spec.quantity_distribution == 'uniform':
+        quantities = rng.integers(1, spec.max_quantity + 1, size)
+    elif spec.quantity_distribution == 'geometric':
+        quantities = rng.geometric(1 / max(spec.mean_quantity, 1), size)
+    else:
+        raise ValueError(f"Unknown quantity distribution '{spec.quantity_distribution}', "
+                         f"expected one of {QUANTITY_DISTRIBUTIONS}")
+    return np.minimum(quantities, spec.max_quantity).astype(np.float64)
+
+
+def generate_allocation_frame(spec: WorkbookSpec) -> pd.DataFrame:
+    """
+    Generate a PRE ALLOCATION sheet.
+
+    Args:
+        spec (WorkbookSpec): Workbook spec
+
+    Returns:
+        pd.DataFrame: Allocation sheet with blank (NaN) store cells
+    """
+    rng = np.random.default_rng(spec.seed)
+    seasons = make_season_names(spec.seasons)
+    sizes = [SIZES[i % len(SIZES)] for i in range(spec.rows)]
+    skus = [f"UAEC-MDB{1000 + i // len(SIZES):04d}-PDE004N_09GD" for i in range(spec.rows)]
+
+    # Earlier seasons hold most of the rows, as in the template
+    season_weights = 1 / np.arange(1, spec.seasons + 1)
+    season_index = rng.choice(spec.seasons, size=spec.rows, p=season_weights / season_weights.sum())
+
+    quantities = draw_quantities(spec, rng, (spec.rows, spec.stores))
+    quantities[rng.random((spec.rows, spec.stores)) >= spec.fill_rate] = np.nan
+
+    df = pd.DataFrame({
+        'sku + size': [f"{sku}_{size}" for sku, size in zip(skus, sizes)],
+        'SKU': skus,
+        'SIZE': pd.Series(sizes, dtype=object),
+        'EANCode': 4069622400000 + np.arange(spec.rows, dtype=np.int64),
+        'SEASON': [seasons[i] for i in season_index],
+        'QTY': rng.integers(1, 300, spec.rows),
+        'STOCK': rng.integers(0, 200, spec.rows)
+    })
+    store_df = pd.DataFrame(quantities, columns=make_store_names(spec.stores))
+    return pd.concat([df, store_df], axis=1)
+
+
+def write_benchmark_inputs(spec: WorkbookSpec, directory: Path) -> Tuple[Path, Path]:
+    """
+    Write a synthetic allocation workbook and its stores CSV.
+
+    Args:
+        spec (WorkbookSpec): Workbook spec
+        directory (Path): Directory to write the files to
+
+    Returns:
+        Tuple[Path, Path]: Paths of the xlsx file and the stores CSV
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    excel_path = directory / 'PRE ALLOCATION BENCHMARK.xlsx'
+    stores_path = directory / 'stores.csv'
+
+    with StreamingWorkbookWriter(excel_path) as writer:
+        writer.write_sheet(generate_allocation_frame(spec), 'PRE ALLOCATION')
+    stores_path.write_text(''.join(f"{name}\n" for name in make_store_names(spec.stores)))
+    return excel_path, stores_path
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Shared helpers of the tests: a small allocation sheet and the comparison of output directories.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "resources" / "templates"
+ALLOCATION_WORKBOOK = TEMPLATES_DIR / "PRE ALLOCATION PP OUTLET PRODUCTION.xlsx"
+
+
+def make_allocation_frame() -> pd.DataFrame:
+    """Build a small PRE ALLOCATION sheet with blank cells and several seasons."""
+    return pd.DataFrame({
+        "SKU": ["A", "A", "B", "C", "D", "E"],
+        "EANCode": [4069622413304, 4069622413311, 4069622413328, 4069622413335, 4069622413342, 4069622413359],
+        "SEASON": ["S25 07", "S25 07", "W24", None, "W24", "S23"],
+        "PP IT Leccio Outlet 25": [1.0, np.nan, 3.0, 2.0, np.nan, 1.0],
+        "Shanghai Outlet": [np.nan, 2.0, np.nan, np.nan, 4.0, np.nan],
+        "FRANCO VAGO": [np.nan] * 6
+    })
+
+
+def write_allocation_workbook(path: Path, df: Optional[pd.DataFrame] = None) -> Path:
+    """Write a sheet (by default the one of make_allocation_frame) as the PRE ALLOCATION sheet of a workbook."""
+    (make_allocation_frame() if df is None else df).to_excel(path, sheet_name="PRE ALLOCATION", index=False)
+    return path
+
+
+def make_allocation_frame() -> pd.DataFrame:
+    """Build a small PRE ALLOCATION sheet with blank cells and several seasons."""
+    return pd.DataFrame({
+        "SKU": ["A", "A", "B", "C", "D", "E"],
+        "EANCode": [4069622413304, 4069622413311, 4069622413328, 4069622413335, 4069622413342, 4069622413359],
+        "SEASON": ["S25 07", "S25 07", "W24", None, "W24", "S23"],
+        "PP IT Leccio Outlet 25": [1.0, np.nan, 3.0, 2.0, np.nan, 1.0],
+        "Shanghai Outlet": [np.nan, 2.0, np.nan, np.nan, 4.0, np.nan],
+        "FRANCO VAGO": [np.nan] * 6
+    })
+
+
+def read_outputs(output_dir):
+    """Read every output file so that runs can be compared."""
+    outputs = {}
+    for path in sorted(output_dir.iterdir()):
+        if path.suffix == ".xlsx":
+            outputs[path.name] = pd.read_excel(path, sheet_name=None)
+        else:
+            outputs[path.name] = path.read_bytes()
+    return outputs
+
+
+def assert_same_outputs(expected, actual):
+    assert list(expected) == list(actual)
+    for name, content in expected.items():
+        if not name.endswith(".xlsx"):
+            assert content == actual[name]
+        else:
+            assert list(content) == list(actual[name])
+            for sheet_name, sheet_df in content.items():
+                pd.testing.assert_frame_equal(sheet_df, actual[name][sheet_name])
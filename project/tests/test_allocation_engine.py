@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the single-pass allocation engine.
+"""
+
+import pytest
+
+from src.core.processors.allocation_engine import (
+    process_all_stores,
+    STATUS_WRITTEN,
+    STATUS_NOT_FOUND,
+    STATUS_EMPTY,
+    STATUS_UNCHANGED
+)
+from src.core.processors.store_processor import process_store
+from tests.helpers import make_allocation_frame, read_outputs, assert_same_outputs
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_engine_matches_per_store_processing(tmp_path, workers):
+    """The engine writes the same files as process_store, for any worker count."""
+    df = make_allocation_frame()
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet", "FRANCO VAGO", "Unknown Outlet"]
+
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    for store_name in store_names:
+        process_store(store_name, df, expected_dir)
+
+    actual_dir = tmp_path / "actual"
+    actual_dir.mkdir()
+    statuses = process_all_stores(store_names, df, actual_dir, workers=workers)
+
+    assert statuses == {
+        "PP IT Leccio Outlet 25": STATUS_WRITTEN,
+        "Shanghai Outlet": STATUS_WRITTEN,
+        "FRANCO VAGO": STATUS_EMPTY,
+        "Unknown Outlet": STATUS_NOT_FOUND
+    }
+    assert_same_outputs(read_outputs(expected_dir), read_outputs(actual_dir))
+
+
+def test_streaming_writer_matches_pandas_writer(tmp_path):
+    """The streaming and pd.ExcelWriter modes write workbooks with the same content."""
+    df = make_allocation_frame()
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+
+    outputs = {}
+    for excel_writer in ("pandas", "streaming"):
+        output_dir = tmp_path / excel_writer
+        output_dir.mkdir()
+        process_all_stores(store_names, df, output_dir, excel_writer=excel_writer)
+        outputs[excel_writer] = read_outputs(output_dir)
+
+    assert_same_outputs(outputs["pandas"], outputs["streaming"])
+
+
+def test_incremental_run_only_rewrites_changed_stores(tmp_path):
+    """Unchanged stores are skipped; edited stores and stores with missing outputs are rewritten."""
+    df = make_allocation_frame()
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+
+    statuses = process_all_stores(store_names, df, tmp_path, incremental=True)
+    assert set(statuses.values()) == {STATUS_WRITTEN}
+    assert (tmp_path / ".allocation_manifest.json").exists()
+
+    statuses = process_all_stores(store_names, df, tmp_path, incremental=True)
+    assert set(statuses.values()) == {STATUS_UNCHANGED}
+
+    df.loc[1, "Shanghai Outlet"] = 5.0
+    (tmp_path / "PP_IT_Leccio_Outlet_25-W24.txt").unlink()
+    statuses = process_all_stores(store_names, df, tmp_path, incremental=True)
+    assert statuses == {"PP IT Leccio Outlet 25": STATUS_WRITTEN, "Shanghai Outlet": STATUS_WRITTEN}
+    assert (tmp_path / "PP_IT_Leccio_Outlet_25-W24.txt").exists()
+    assert (tmp_path / "Shanghai_Outlet-S25_07.txt").read_text().count("\n") == 5
+
+    statuses = process_all_stores(store_names, df, tmp_path, incremental=True)
+    assert set(statuses.values()) == {STATUS_UNCHANGED}
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the typed allocation matrix.
+"""
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.styles import Font
+
+from src.core.processors.allocation_engine import process_all_stores
+from src.core.processors.store_processor import process_store
+from src.core.utils.allocation_matrix import AllocationMatrix, MatrixConversionError
+from src.core.utils.file_utils import (
+    find_required_columns,
+    find_store_columns,
+    load_allocation_sheet,
+    load_xlsx_file,
+    read_allocation_matrix
+)
+from tests.helpers import (
+    TEMPLATES_DIR,
+    make_allocation_frame,
+    write_allocation_workbook,
+    read_outputs,
+    assert_same_outputs
+)
+
+
+STORE_COLUMNS = ["PP IT Leccio Outlet 25", "Shanghai Outlet", "FRANCO VAGO"]
+
+
+def test_matrix_uses_compact_dtypes():
+    """EANCodes and seasons are stored as typed arrays and quantities in CSC layout; empty columns are left out."""
+    matrix = AllocationMatrix.from_frame(make_allocation_frame(), "EANCode", "SEASON", STORE_COLUMNS)
+
+    assert matrix.eancodes.dtype == np.uint64
+    assert matrix.season_codes.tolist() == [0, 0, 1, -1, 1, 2]
+    assert list(matrix.seasons) == ["S25 07", "W24", "S23"]
+    assert matrix.quantity_values.dtype == np.int32
+    assert matrix.store_columns == STORE_COLUMNS[:2]
+    assert matrix.quantity_indptr.tolist() == [0, 4, 6]
+    assert matrix.quantity_rows.tolist() == [0, 2, 3, 5, 1, 4]
+    assert matrix.nnz == 6
+
+    rows, quantities = matrix.store_entries("Shanghai Outlet")
+    assert rows.tolist() == [1, 4]
+    assert quantities.tolist() == [2, 4]
+
+    dense = matrix.to_dense()
+    df = make_allocation_frame()
+    np.testing.assert_array_equal(dense, df[STORE_COLUMNS[:2]].to_numpy(dtype=np.float64))
+
+
+def test_store_frames_match_filtered_sheet():
+    """Every store slice has the values and dtypes of the filtered sheet."""
+    df = make_allocation_frame()
+    store_frames = AllocationMatrix.from_frame(df, "EANCode", "SEASON", STORE_COLUMNS).store_frames()
+
+    assert list(store_frames) == ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+    for store_col, store_df in store_frames.items():
+        expected = df.loc[df[store_col].notna(), ["EANCode", "SEASON", store_col]]
+        pd.testing.assert_frame_equal(store_df, expected, check_index_type=False)
+
+
+@pytest.mark.parametrize("column, values", [
+    ("EANCode", ["4069622413304", "A", "B", "C", "D", "E"]),
+    ("PP IT Leccio Outlet 25", [1.5, np.nan, 3.0, 2.0, np.nan, 1.0]),
+    ("PP IT Leccio Outlet 25", ["1", None, "3", "2", " ", "1"])
+])
+def test_inexact_values_are_rejected(column, values):
+    """Values the typed arrays cannot restore exactly raise MatrixConversionError."""
+    df = make_allocation_frame()
+    df[column] = values
+    with pytest.raises(MatrixConversionError):
+        AllocationMatrix.from_frame(df, "EANCode", "SEASON", STORE_COLUMNS)
+
+
+def test_engine_falls_back_for_text_quantities(tmp_path):
+    """Sheets with text quantities are split without the matrix, with the same outputs."""
+    df = make_allocation_frame()
+    df["Shanghai Outlet"] = [None, "2", None, None, " 4 ", None]
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    for store_name in store_names:
+        process_store(store_name, df, expected_dir)
+
+    actual_dir = tmp_path / "actual"
+    actual_dir.mkdir()
+    process_all_stores(store_names, df, actual_dir)
+
+    assert_same_outputs(read_outputs(expected_dir), read_outputs(actual_dir))
+
+
+def test_sheet_is_loaded_as_the_matrix(tmp_path):
+    """The loader returns the matrix, and the stores sliced from it give the outputs of the sheet."""
+    df = make_allocation_frame()
+    workbook_path = tmp_path / "allocation.xlsx"
+    write_allocation_workbook(workbook_path, df)
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+
+    matrix = load_allocation_sheet(workbook_path, store_names=store_names)
+
+    assert isinstance(matrix, AllocationMatrix)
+    assert len(matrix) == len(df)
+
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    process_all_stores(store_names, df, expected_dir)
+    actual_dir = tmp_path / "actual"
+    actual_dir.mkdir()
+    statuses = process_all_stores(store_names, matrix, actual_dir)
+
+    assert set(statuses.values()) == {"written"}
+    assert_same_outputs(read_outputs(expected_dir), read_outputs(actual_dir))
+
+
+def assert_same_matrix(expected, actual):
+    """Both matrices hold the same arrays, dtypes and columns."""
+    assert actual.store_columns == expected.store_columns
+    assert actual.columns == expected.columns
+    for name in ("eancodes", "season_codes", "quantity_indptr", "quantity_rows", "quantity_values"):
+        np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name))
+    assert list(actual.seasons) == list(expected.seasons)
+    assert (actual.ean_dtype, actual.season_dtype) == (expected.ean_dtype, expected.season_dtype)
+    assert actual.quantity_dtypes == expected.quantity_dtypes
+
+
+def test_streamed_matrix_matches_the_loaded_sheet():
+    """The matrix built while reading equals the matrix of the loaded DataFrame."""
+    store_names = pd.read_csv(TEMPLATES_DIR / "stores.csv", header=None)[0].tolist() + ["No Such Store"]
+    workbook_path = TEMPLATES_DIR / "PRE ALLOCATION PP OUTLET PRODUCTION.xlsx"
+    df = load_xlsx_file(workbook_path, "PRE ALLOCATION", store_names)
+    ean_col, season_col = find_required_columns(list(df.columns))
+    expected = AllocationMatrix.from_frame(df, ean_col, season_col, find_store_columns(list(df.columns), store_names))
+
+    assert_same_matrix(expected, read_allocation_matrix(workbook_path, "PRE ALLOCATION", store_names))
+
+
+def test_streamed_matrix_keeps_dtypes_and_trims_blank_rows(tmp_path):
+    """Full columns stay int64, columns with blanks float64, and rows after the data are dropped."""
+    df = make_allocation_frame()
+    df["PP IT Leccio Outlet 25"] = [1, 2, 3, 2, 5, 1]
+    workbook_path = tmp_path / "allocation.xlsx"
+    write_allocation_workbook(workbook_path, df)
+    # A formatted cell without a value adds a row without data
+    workbook = openpyxl.load_workbook(workbook_path)
+    workbook["PRE ALLOCATION"].cell(row=12, column=4).font = Font(bold=True)
+    workbook.save(workbook_path)
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet", "FRANCO VAGO"]
+
+    matrix = read_allocation_matrix(workbook_path, store_names=store_names)
+
+    assert len(matrix) == len(df)
+    assert matrix.store_columns == store_names[:2]
+    assert matrix.quantity_dtypes == {"PP IT Leccio Outlet 25": np.dtype(np.int64),
+                                      "Shanghai Outlet": np.dtype(np.float64)}
+    expected = AllocationMatrix.from_frame(load_xlsx_file(workbook_path, store_names=store_names), "EANCode", "SEASON")
+    assert_same_matrix(expected, matrix)
+
+
+def test_text_quantities_are_loaded_as_a_dataframe(tmp_path):
+    """Sheets the matrix cannot represent are loaded as the DataFrame of load_xlsx_file."""
+    df = make_allocation_frame()
+    df["Shanghai Outlet"] = [None, "2", None, None, "four", None]
+    workbook_path = tmp_path / "allocation.xlsx"
+    write_allocation_workbook(workbook_path, df)
+
+    with pytest.raises(MatrixConversionError):
+        read_allocation_matrix(workbook_path)
+    pd.testing.assert_frame_equal(load_allocation_sheet(workbook_path), load_xlsx_file(workbook_path))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the batch runner and the batch command line.
+"""
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.cli.worker import main, parse_args
+from src.core.processors.batch_runner import plan_batch_jobs, run_batch_jobs
+from src.core.utils.run_journal import JOURNAL_FILENAME
+from tests.helpers import write_allocation_workbook, read_outputs, assert_same_outputs
+
+
+def read_store_outputs(output_dir):
+    """Read the store files of a run, without its timestamped run journal."""
+    outputs = read_outputs(output_dir)
+    del outputs[JOURNAL_FILENAME]
+    return outputs
+
+
+def test_output_directories_follow_the_combinations(tmp_path):
+    stores = {Path("stores.csv"): ["A"], Path("stores_2.csv"): ["B"]}
+
+    single = plan_batch_jobs([Path("in/week.xlsx")], {Path("stores.csv"): ["A"]}, tmp_path)
+    assert [job.output_dir for job in single] == [tmp_path]
+
+    jobs = plan_batch_jobs([Path("a/week.xlsx"), Path("b/week.xlsx")], stores, tmp_path)
+    assert [job.output_dir.relative_to(tmp_path).as_posix() for job in jobs] == [
+        "week/stores", "week/stores_2", "week-2/stores", "week-2/stores_2"
+    ]
+
+
+def test_workbooks_are_loaded_once_for_all_stores_files(tmp_path):
+    stores = {Path("stores.csv"): ["A", "B"], Path("stores_2.csv"): ["B", "C"]}
+    jobs = plan_batch_jobs([Path("one.xlsx"), Path("two.xlsx"), Path("bad.xlsx")], stores, tmp_path)
+    loads = []
+    lock = threading.Lock()
+
+    def load_workbook(workbook, store_names):
+        with lock:
+            loads.append((workbook.name, store_names))
+        return None if workbook.name == "bad.xlsx" else workbook.name
+
+    def run_job(job, df):
+        assert df == job.workbook.name
+        return job.stores_file.name == "stores.csv"
+
+    results = run_batch_jobs(jobs, run_job, load_workbook, parallel=3)
+
+    assert sorted(loads) == [(name, ["A", "B", "C"]) for name in ["bad.xlsx", "one.xlsx", "two.xlsx"]]
+    assert [(job.workbook.name, job.stores_file.name) for job, ok in results.items() if ok] == [
+        ("one.xlsx", "stores.csv"), ("two.xlsx", "stores.csv")
+    ]
+    assert len(results) == len(jobs)
+
+
+def test_batch_command_processes_every_combination(tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for name in ["week_1.xlsx", "week_2.xlsx"]:
+        write_allocation_workbook(source_dir / name)
+    (tmp_path / "stores.csv").write_text("PP IT Leccio Outlet 25\nShanghai Outlet\n")
+    (tmp_path / "stores_2.csv").write_text("Shanghai Outlet\n")
+
+    output_dir = tmp_path / "output"
+    status = main([str(source_dir / "*.xlsx"), "--stores", str(tmp_path / "stores.csv"),
+                   "--stores", str(tmp_path / "stores_2.csv"), "--output", str(output_dir),
+                   "--jobs", "2", "--writer-threads", "0"])
+    assert status == 0
+
+    single_dir = tmp_path / "single"
+    assert main([str(source_dir / "week_1.xlsx"), "--stores", str(tmp_path / "stores_2.csv"),
+                 "--output", str(single_dir)]) == 0
+    for week in ["week_1", "week_2"]:
+        assert_same_outputs(read_store_outputs(single_dir), read_store_outputs(output_dir / week / "stores_2"))
+        assert len(list((output_dir / week / "stores").glob("*.xlsx"))) == 2
+
+    assert main([str(source_dir / "*.xlsx"), "--stores", str(tmp_path / "missing.csv"),
+                 "--output", str(output_dir)]) == 1
+
+
+def test_streamed_run_with_a_failed_store_exits_with_an_error(tmp_path):
+    workbook = tmp_path / "week_1.xlsx"
+    write_allocation_workbook(workbook)
+    (tmp_path / "stores.csv").write_text("PP IT Leccio Outlet 25\nShanghai Outlet\n")
+    output_dir = tmp_path / "output"
+    # A directory in place of the store workbook makes its write fail
+    (output_dir / "Shanghai_Outlet.xlsx").mkdir(parents=True)
+
+    assert main([str(workbook), "--stores", str(tmp_path / "stores.csv"), "--output", str(output_dir),
+                 "--stream"]) == 1
+
+
+@pytest.mark.parametrize("option, value", [("--chunk-rows", "0"), ("--workers", "-1"), ("--writer-threads", "-2")])
+def test_invalid_counts_are_rejected(option, value):
+    with pytest.raises(SystemExit):
+        parse_args([option, value])
+
+
+@pytest.mark.parametrize("options", [["--resume"], ["--incremental"], ["--workers", "2"]])
+def test_stream_rejects_options_it_ignores(options):
+    with pytest.raises(SystemExit):
+        parse_args(["--stream"] + options)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Smoke tests for the benchmark harness and the synthetic workbook generator.
+"""
+
+import json
+
+import pandas as pd
+
+from src.core.utils.file_utils import load_xlsx_file
+from tests.benchmarks.run_benchmarks import PHASES, main
+from tests.benchmarks.workbook_generator import WorkbookSpec, generate_allocation_frame, write_benchmark_inputs
+
+
+def test_generated_workbook_reads_back(tmp_path):
+    """The synthetic workbook loads with the same values it was generated from."""
+    spec = WorkbookSpec(rows=50, stores=4, seasons=3, quantity_distribution='uniform')
+    excel_path, stores_path = write_benchmark_inputs(spec, tmp_path)
+
+    expected = generate_allocation_frame(spec)
+    pd.testing.assert_frame_equal(load_xlsx_file(excel_path), expected, check_dtype=False)
+    assert stores_path.read_text().splitlines() == list(expected.columns[7:])
+
+
+def test_benchmark_writes_json_results(tmp_path):
+    """A small benchmark run reports every phase."""
+    output_path = tmp_path / "results.json"
+    main(["--rows", "40", "--stores", "3", "--seasons", "2", "--repeat", "1", "--output", str(output_path)])
+
+    results = json.loads(output_path.read_text())
+    assert list(results["phases"]) == PHASES
+    assert results["config"]["workbook"]["rows"] == 40
+    assert all(len(phase["samples"]) == 1 for phase in results["phases"].values())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the input preview run when files are selected.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from src.core.processors.file_processor import FileProcessor
+from src.core.utils.file_utils import load_xlsx_file
+from src.core.utils.input_preview import read_workbook_preview, resolve_preview_stores
+from tests.helpers import ALLOCATION_WORKBOOK
+
+
+def test_preview_resolves_stores_like_the_loaded_sheet():
+    workbook = read_workbook_preview(ALLOCATION_WORKBOOK, "PRE ALLOCATION")
+    store_names = ["Shanghai Outlet", "PP RU Novaya Riga Outlet 25", "No Such Store"]
+
+    resolution = resolve_preview_stores(workbook, store_names)
+
+    assert workbook.sheet_name in workbook.sheet_names
+    assert workbook.header == list(load_xlsx_file(ALLOCATION_WORKBOOK, "PRE ALLOCATION").columns)
+    assert resolution.unmatched == ["No Such Store"]
+    assert resolution.columns["Shanghai Outlet"] is not None
+
+
+def test_warmed_sheet_is_loaded_from_the_cache(tmp_path):
+    file_processor = FileProcessor(cache_dir=tmp_path)
+
+    assert file_processor.warm_sheet_cache(ALLOCATION_WORKBOOK, "PRE ALLOCATION")
+    file_processor.load_xlsx_file(ALLOCATION_WORKBOOK, "PRE ALLOCATION", ["Shanghai Outlet"])
+
+    assert file_processor.last_cache_status == "hit"
+    assert not FileProcessor(cache_dir=None).warm_sheet_cache(ALLOCATION_WORKBOOK)
+
+
+def test_previewer_reports_unmatched_stores_and_warms_the_cache(tmp_path):
+    pytest.importorskip("PySide6")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtWidgets import QApplication
+    from src.ui.input_preview import InputPreviewer
+
+    app = QApplication.instance() or QApplication([])
+    stores_path = tmp_path / "stores.csv"
+    stores_path.write_text("Shanghai Outlet\nNo Such Store\n")
+    file_processor = FileProcessor(cache_dir=tmp_path / "cache")
+    previewer = InputPreviewer(lambda: file_processor)
+    previews, warmed = [], []
+    previewer.preview_ready.connect(previews.append)
+    previewer.cache_warmed.connect(lambda path, cached: warmed.append(cached))
+
+    # Only the latest selection is reported
+    previewer.request(str(ALLOCATION_WORKBOOK), "", "PRE ALLOCATION", warm_cache=False)
+    previewer.request(str(ALLOCATION_WORKBOOK), str(stores_path), "PRE ALLOCATION")
+    deadline = time.monotonic() + 30
+    while not warmed:
+        assert time.monotonic() < deadline, "timed out"
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+
+    assert len(previews) == 1
+    assert previews[0].resolution.unmatched == ["No Such Store"]
+    assert any("No Such Store" in message for message in previews[0].describe())
+    assert warmed == [True]
+
+
+def test_previewer_warms_a_modified_workbook_again(tmp_path):
+    pytest.importorskip("PySide6")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QCoreApplication, QThreadPool
+    from PySide6.QtWidgets import QApplication
+    from src.ui.input_preview import InputPreviewer
+
+    app = QApplication.instance() or QApplication([])
+    workbook_path = tmp_path / "allocation.xlsx"
+    shutil.copyfile(ALLOCATION_WORKBOOK, workbook_path)
+    file_processor = FileProcessor(cache_dir=tmp_path / "cache")
+    factory_threads = []
+
+    def file_processor_factory():
+        factory_threads.append(threading.current_thread())
+        return file_processor
+
+    pool = QThreadPool()
+    previewer = InputPreviewer(file_processor_factory, pool=pool)
+    warmed = []
+    previewer.cache_warmed.connect(lambda path, cached: warmed.append(cached))
+
+    def preview():
+        previewer.request(str(workbook_path), "", "PRE ALLOCATION")
+        assert pool.waitForDone(30000), "timed out"
+        QCoreApplication.processEvents()
+
+    preview()
+    preview()
+    assert warmed == [True]
+
+    stat = workbook_path.stat()
+    os.utime(workbook_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    preview()
+    assert warmed == [True, True]
+    assert threading.main_thread() not in factory_threads
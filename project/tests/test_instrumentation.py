@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the run instrumentation spans and report.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from src.core.processors.allocation_engine import process_all_stores
+from src.core.utils.instrumentation import RunRecorder, format_report_table, recording, span, write_report
+from tests.helpers import make_allocation_frame
+
+
+def test_spans_are_noops_without_recorder():
+    """Spans outside a recording context do not fail and record nothing."""
+    with span('load') as current:
+        current.add_bytes(10)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_engine_run_is_recorded(tmp_path, workers):
+    """The engine records its phases, including the spans of worker processes."""
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+    with recording(RunRecorder()) as recorder:
+        process_all_stores(store_names, make_allocation_frame(), tmp_path, workers=workers)
+
+    report = recorder.report(workers=workers)
+    spans = report['spans']
+    assert list(spans) == ['resolve', 'filter', 'xlsx_write', 'txt_write']
+    assert spans['xlsx_write']['count'] == 2
+    assert spans['txt_write']['count'] == 5
+    written = sum(path.stat().st_size for path in tmp_path.iterdir())
+    assert spans['xlsx_write']['bytes_written'] + spans['txt_write']['bytes_written'] == written
+
+    report_path = tmp_path / "report.json"
+    assert write_report(report, report_path)
+    assert json.loads(report_path.read_text())['details'] == {'workers': workers}
+    assert len(format_report_table(report)) == len(spans) + 2
+
+
+def test_span_cpu_excludes_other_threads():
+    """A span is only charged for the CPU time of its own thread."""
+    stop = threading.Event()
+
+    def spin():
+        while not stop.is_set():
+            pass
+
+    spinner = threading.Thread(target=spin)
+    with recording(RunRecorder()) as recorder:
+        spinner.start()
+        try:
+            with span('wait'):
+                time.sleep(0.3)
+        finally:
+            stop.set()
+            spinner.join()
+
+    totals = recorder.spans['wait']
+    assert totals['wall_seconds'] >= 0.3
+    assert totals['cpu_seconds'] < 0.1
+    assert recorder.report()['cpu_seconds'] > totals['cpu_seconds']
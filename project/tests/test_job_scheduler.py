@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the background job scheduler of the GUI.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QCoreApplication, QObject, Signal
+from PySide6.QtWidgets import QApplication
+
+from src.ui.job_scheduler import JobScheduler
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+class FakeWorker(QObject):
+    """Worker that logs a message per store and checks for cancellation between stores."""
+    progress_update = Signal(str, int)
+    finished = Signal(bool, str)
+    log_message = Signal(str)
+
+    def __init__(self, stores=50, release=None):
+        super().__init__()
+        self.stores = stores
+        self.release = release
+        self.started = False
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def process(self):
+        self.started = True
+        if self.release is not None:
+            self.release.wait(5)
+        for store in range(self.stores):
+            if self.is_cancelled():
+                self.finished.emit(False, "cancelled")
+                return
+            self.log_message.emit(f"store {store}")
+            self.progress_update.emit(f"store {store}", store * 100 // self.stores)
+        self.finished.emit(True, "done")
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        QCoreApplication.processEvents()
+        time.sleep(0.01)
+
+
+def record_events(scheduler):
+    events = []
+    scheduler.job_started.connect(lambda job_id, description: events.append(("started", job_id)))
+    scheduler.job_messages.connect(lambda job_id, messages: events.append(("messages", job_id, messages)))
+    scheduler.job_finished.connect(lambda job_id, success, message: events.append(("finished", job_id, success)))
+    scheduler.job_cancelled.connect(lambda job_id, message: events.append(("cancelled", job_id)))
+    return events
+
+
+def test_queued_jobs_run_in_order_with_coalesced_messages(app):
+    scheduler = JobScheduler(flush_interval_ms=20)
+    events = record_events(scheduler)
+    first = scheduler.submit(FakeWorker(), "first")
+    second = scheduler.submit(FakeWorker(), "second")
+    assert scheduler.job_count == 2
+
+    wait_until(lambda: not scheduler.has_jobs())
+
+    assert [event for event in events if event[0] != "messages"] == [
+        ("started", first), ("finished", first, True), ("started", second), ("finished", second, True)
+    ]
+    batches = [event[2] for event in events if event[0] == "messages" and event[1] == first]
+    assert sum(batches, []) == [f"store {store}" for store in range(50)]
+    assert len(batches) < 50
+
+
+def test_cancel_stops_the_running_job_and_drops_queued_jobs(app):
+    scheduler = JobScheduler(flush_interval_ms=20)
+    events = record_events(scheduler)
+    release = threading.Event()
+    running = FakeWorker(release=release)
+    queued = FakeWorker()
+    running_id = scheduler.submit(running)
+    queued_id = scheduler.submit(queued)
+    wait_until(lambda: running.started)
+
+    scheduler.cancel_all()
+    release.set()
+    assert scheduler.wait_for_done(5000)
+
+    assert not queued.started
+    assert ("cancelled", queued_id) in events
+    assert ("cancelled", running_id) in events
+    assert not scheduler.has_jobs()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the compact label file formats.
+"""
+
+import numpy as np
+import pytest
+
+from src.core.processors.allocation_engine import process_all_stores
+from src.core.processors.streaming_engine import process_workbook_streaming
+from src.core.utils.label_formats import (
+    LABEL_SUFFIXES,
+    BINARY_MAGIC,
+    expand_label_file,
+    iter_label_lines,
+    write_labels,
+    main
+)
+from src.core.utils.output_shards import ShardLimits
+from tests.helpers import make_allocation_frame, write_allocation_workbook
+
+STORE_NAMES = ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+
+
+def expand_outputs(output_dir, suffix):
+    """Expand every label file of a run, keyed by its TXT file name."""
+    return {
+        path.name[:-len(suffix)] + ".txt": "".join(iter_label_lines(path))
+        for path in sorted(output_dir.glob(f"*{suffix}"))
+    }
+
+
+@pytest.mark.parametrize("label_format", [fmt for fmt in LABEL_SUFFIXES if fmt != "txt"])
+def test_label_files_expand_to_txt_files(tmp_path, label_format):
+    """Every format expands back to the TXT files of a default run."""
+    if label_format == "zstd":
+        pytest.importorskip("zstandard")
+    df = make_allocation_frame()
+    txt_dir = tmp_path / "txt"
+    txt_dir.mkdir()
+    process_all_stores(STORE_NAMES, df, txt_dir)
+
+    compact_dir = tmp_path / label_format
+    compact_dir.mkdir()
+    process_all_stores(STORE_NAMES, df, compact_dir, label_format=label_format)
+
+    expected = {path.name: path.read_text() for path in sorted(txt_dir.glob("*.txt"))}
+    assert expand_outputs(compact_dir, LABEL_SUFFIXES[label_format]) == expected
+    assert sorted(path.name for path in compact_dir.glob("*.xlsx")) == sorted(
+        path.name for path in txt_dir.glob("*.xlsx"))
+
+
+@pytest.mark.parametrize("label_format", ["csv", "gzip", "binary"])
+def test_streamed_label_files_match_engine(tmp_path, label_format):
+    """Label files appended chunk by chunk expand to the engine's label files."""
+    workbook_path = tmp_path / "allocation.xlsx"
+    write_allocation_workbook(workbook_path)
+
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    process_all_stores(STORE_NAMES, make_allocation_frame(), expected_dir, label_format=label_format)
+
+    actual_dir = tmp_path / "actual"
+    actual_dir.mkdir()
+    process_workbook_streaming(workbook_path, STORE_NAMES, actual_dir, chunk_rows=1, label_format=label_format)
+
+    suffix = LABEL_SUFFIXES[label_format]
+    assert expand_outputs(actual_dir, suffix) == expand_outputs(expected_dir, suffix)
+
+
+def test_binary_records_are_packed(tmp_path):
+    path = tmp_path / "labels.bin"
+    write_labels(path, np.array(["4069622413304", "4069622413311"], dtype=object), np.array([3, 0]), "binary")
+    write_labels(path, np.array(["4069622413328"], dtype=object), np.array([1]), "binary", append=True)
+
+    data = path.read_bytes()
+    assert data.startswith(BINARY_MAGIC)
+    assert len(data) == len(BINARY_MAGIC) + 2 * 12
+    assert list(iter_label_lines(path)) == ["4069622413304\n"] * 3 + ["4069622413328\n"]
+
+    with pytest.raises(ValueError):
+        write_labels(tmp_path / "zeros.bin", np.array(["0123"], dtype=object), np.array([1]), "binary")
+
+
+def test_expand_command_writes_txt_files(tmp_path):
+    path = tmp_path / "Store-S25.csv"
+    write_labels(path, np.array(["111", "222"], dtype=object), np.array([2, 1]), "csv")
+    assert path.read_text() == "111,2\n222,1\n"
+
+    assert main([str(path)]) == 0
+    assert (tmp_path / "Store-S25.txt").read_text() == "111\n111\n222\n"
+    assert expand_label_file(path, tmp_path / "copy.txt").read_text() == "111\n111\n222\n"
+
+
+def test_line_limits_require_txt_format(tmp_path):
+    with pytest.raises(ValueError):
+        process_all_stores(STORE_NAMES, make_allocation_frame(), tmp_path,
+                           limits=ShardLimits(max_lines=2), label_format="gzip")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the background output writer pipeline.
+"""
+
+import threading
+
+import pytest
+
+from src.core.processors import store_processor
+from src.core.processors.allocation_engine import process_all_stores, STATUS_WRITTEN, STATUS_FAILED
+from src.core.utils.output_pipeline import OutputPipeline, OutputWriteCancelled
+from src.core.utils.output_shards import ShardLimits
+from tests.helpers import make_allocation_frame, read_outputs, assert_same_outputs
+
+STORE_NAMES = ["PP IT Leccio Outlet 25", "Shanghai Outlet", "FRANCO VAGO", "Unknown Outlet"]
+
+
+def test_pipeline_reports_groups_with_their_first_error():
+    written = []
+
+    def fail():
+        raise OSError("share unavailable")
+
+    pipeline = OutputPipeline(writer_threads=2)
+    pipeline.submit("a", [(written.append, (1,)), (written.append, (2,))])
+    pipeline.submit("b", [(written.append, (3,)), (fail, ())])
+    pipeline.submit("c", [])
+    completed = dict(pipeline.close())
+
+    assert sorted(written) == [1, 2, 3]
+    assert completed["a"] is None and completed["c"] is None
+    assert isinstance(completed["b"], OSError)
+
+
+def test_submit_blocks_while_the_queue_is_full():
+    """The producer waits for the writers once max_pending writes are queued."""
+    release = threading.Event()
+    pipeline = OutputPipeline(writer_threads=1, max_pending=1)
+    pipeline.submit("running", [(release.wait, ())])
+    pipeline.submit("queued", [(len, ((),))])
+
+    producer = threading.Thread(target=pipeline.submit, args=("blocked", [(len, ((),))]))
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()
+
+    release.set()
+    producer.join(timeout=5)
+    assert not producer.is_alive()
+    assert sorted(key for key, error in pipeline.close()) == ["blocked", "queued", "running"]
+
+
+def test_abort_cancels_queued_writes():
+    """Aborting waits for the running write and cancels the queued ones."""
+    release = threading.Event()
+    pipeline = OutputPipeline(writer_threads=1, max_pending=2)
+    pipeline.submit("running", [(release.wait, ())])
+    pipeline.submit("queued", [(len, ((),))])
+
+    threading.Timer(0.1, release.set).start()
+    completed = dict(pipeline.abort())
+
+    assert completed["running"] is None
+    assert isinstance(completed["queued"], OutputWriteCancelled)
+
+
+@pytest.mark.parametrize("limits", [None, ShardLimits(max_lines=2, max_rows=3)])
+def test_writer_threads_match_sequential_writes(tmp_path, limits):
+    """The files are the same whether written in order or on writer threads."""
+    df = make_allocation_frame()
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    process_all_stores(STORE_NAMES, df, expected_dir, limits=limits)
+
+    actual_dir = tmp_path / "actual"
+    actual_dir.mkdir()
+    statuses = process_all_stores(STORE_NAMES, df, actual_dir, limits=limits, writer_threads=3)
+
+    assert statuses["PP IT Leccio Outlet 25"] == STATUS_WRITTEN
+    assert_same_outputs(read_outputs(expected_dir), read_outputs(actual_dir))
+
+
+def test_write_errors_reach_the_error_callback(tmp_path, monkeypatch):
+    """A failed write marks only its store as failed and reports the error message."""
+    write_label_file = store_processor.write_label_file
+
+    def failing_write(output_path, content):
+        if output_path.name.startswith("Shanghai"):
+            raise OSError("share unavailable")
+        write_label_file(output_path, content)
+
+    monkeypatch.setattr(store_processor, "write_label_file", failing_write)
+    errors = {}
+    statuses = process_all_stores(STORE_NAMES[:2], make_allocation_frame(), tmp_path, writer_threads=2,
+                                  error_callback=errors.__setitem__)
+
+    assert statuses == {"PP IT Leccio Outlet 25": STATUS_WRITTEN, "Shanghai Outlet": STATUS_FAILED}
+    assert errors == {"Shanghai Outlet": "share unavailable"}
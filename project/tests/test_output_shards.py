@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for splitting oversized store files into parts.
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from src.core.processors.allocation_engine import process_all_stores, STATUS_UNCHANGED
+from src.core.processors.store_processor import get_store_output_files
+from src.core.processors.streaming_engine import process_workbook_streaming
+from src.core.utils.output_shards import ShardLimits, split_ranges, get_part_filename
+from tests.helpers import make_allocation_frame, write_allocation_workbook, read_outputs, assert_same_outputs
+
+STORE_NAMES = ["PP IT Leccio Outlet 25", "Shanghai Outlet"]
+LIMITS = ShardLimits(max_lines=2, max_rows=3)
+
+
+def test_split_ranges_and_part_names():
+    assert split_ranges(5, None) == [(0, 5)]
+    assert split_ranges(5, 5) == [(0, 5)]
+    assert split_ranges(5, 2) == [(0, 2), (2, 4), (4, 5)]
+    assert get_part_filename("Store-W24", ".txt", 0, 1) == "Store-W24.txt"
+    assert get_part_filename("Store-W24", ".txt", 1, 3) == "Store-W24-part02.txt"
+    assert get_part_filename("Store", ".xlsx", 99, 100) == "Store-part100.xlsx"
+    with pytest.raises(ValueError):
+        ShardLimits(max_lines=0)
+
+
+def test_parts_hold_the_unsplit_outputs(tmp_path):
+    """The parts listed in the index concatenate to the files of an unlimited run."""
+    df = make_allocation_frame()
+    whole_dir = tmp_path / "whole"
+    whole_dir.mkdir()
+    process_all_stores(STORE_NAMES, df, whole_dir)
+
+    parts_dir = tmp_path / "parts"
+    parts_dir.mkdir()
+    process_all_stores(STORE_NAMES, df, parts_dir, limits=LIMITS)
+
+    expected_files = []
+    for store_name in STORE_NAMES:
+        store_df = df.loc[df[store_name].notna(), ["EANCode", "SEASON", store_name]]
+        expected_files += get_store_output_files(store_name, store_df, "SEASON", "EANCode", store_name, LIMITS)
+    assert sorted(expected_files) == sorted(path.name for path in parts_dir.iterdir())
+
+    index = json.loads((parts_dir / "PP_IT_Leccio_Outlet_25-parts.json").read_text())
+    assert index["limits"] == {"max_lines": 2, "max_rows": 3}
+    assert [(part["file"], part["first_row"], part["last_row"]) for part in index["workbooks"]] == [
+        ("PP_IT_Leccio_Outlet_25-part01.xlsx", 1, 3),
+        ("PP_IT_Leccio_Outlet_25-part02.xlsx", 4, 4)
+    ]
+    workbook = pd.concat(pd.read_excel(parts_dir / part["file"], sheet_name="ALL_SEASONS")
+                         for part in index["workbooks"])
+    pd.testing.assert_frame_equal(
+        workbook.reset_index(drop=True),
+        pd.read_excel(whole_dir / "PP_IT_Leccio_Outlet_25.xlsx", sheet_name="ALL_SEASONS")
+    )
+
+    for store_name in STORE_NAMES:
+        valid_name = store_name.replace(" ", "_")
+        index = json.loads((parts_dir / f"{valid_name}-parts.json").read_text())
+        for whole_txt in whole_dir.glob(f"{valid_name}-*.txt"):
+            season = whole_txt.stem[len(valid_name) + 1:]
+            parts = [part for part in index["txt_files"] if part["season"].replace(" ", "_") == season]
+            assert all(part["lines"] <= 2 for part in parts)
+            content = b"".join((parts_dir / part["file"]).read_bytes() for part in parts)
+            assert content == whole_txt.read_bytes()
+
+
+def test_streaming_parts_match_engine(tmp_path):
+    """Streaming with limits writes the same parts and index files as the engine."""
+    workbook_path = tmp_path / "allocation.xlsx"
+    write_allocation_workbook(workbook_path)
+
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    process_all_stores(STORE_NAMES, make_allocation_frame(), expected_dir, limits=LIMITS)
+
+    actual_dir = tmp_path / "actual"
+    actual_dir.mkdir()
+    process_workbook_streaming(workbook_path, STORE_NAMES, actual_dir, chunk_rows=2, limits=LIMITS)
+
+    assert_same_outputs(read_outputs(expected_dir), read_outputs(actual_dir))
+
+
+def test_changed_limits_rewrite_incremental_outputs(tmp_path):
+    """The limits are part of the incremental fingerprint of a store."""
+    df = make_allocation_frame()
+    process_all_stores(STORE_NAMES, df, tmp_path, incremental=True, limits=LIMITS)
+
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, incremental=True, limits=LIMITS)
+    assert set(statuses.values()) == {STATUS_UNCHANGED}
+
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, incremental=True, limits=ShardLimits(max_lines=3))
+    assert STATUS_UNCHANGED not in statuses.values()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the profiling mode.
+"""
+
+import pstats
+
+from src.core.processors.allocation_engine import process_all_stores
+from src.core.utils.profiling import RunProfiler
+from tests.helpers import make_allocation_frame
+
+
+def test_profiled_run_writes_profile_files(tmp_path):
+    """A profiled run saves a loadable .prof file, collapsed stacks and a summary."""
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    with RunProfiler(output_dir, interval=0.001) as profiler:
+        process_all_stores(["PP IT Leccio Outlet 25", "Shanghai Outlet"], make_allocation_frame(), output_dir)
+
+    stats = pstats.Stats(str(profiler.prof_path))
+    assert stats.total_tt > 0
+
+    for line in profiler.collapsed_path.read_text().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert stack and int(count) > 0
+
+    summary = "\n".join(profiler.summary())
+    assert "(write_store_outputs)" in summary
+    assert "(create_txt_file_with_repeated_eancodes)" in summary
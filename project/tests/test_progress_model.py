@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the work-weighted progress model.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.processors.allocation_engine import process_all_stores
+from src.core.utils.progress_model import (
+    ROW_WEIGHT,
+    ProgressModel,
+    StoreWork,
+    estimate_store_work,
+    format_duration
+)
+from tests.helpers import make_allocation_frame
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_store_work_counts_rows_and_positive_units():
+    store_df = pd.DataFrame({"Store": [2.0, np.nan, "3", -1, "x"]})
+    assert estimate_store_work(store_df, "Store") == StoreWork(rows=5, units=5)
+
+
+def test_progress_is_weighted_by_work_with_throughput_and_eta():
+    clock = FakeClock()
+    model = ProgressModel({"big": StoreWork(90, 900), "small": StoreWork(10, 100)}, clock=clock)
+    assert model.eta_seconds is None
+    assert "ETA estimating..." in model.describe()
+
+    clock.now += 9
+    model.complete("big")
+    model.complete("big")
+    model.complete("skipped")
+    assert model.fraction == pytest.approx(0.9)
+    assert model.rows_per_second == pytest.approx(10)
+    assert model.units_per_second == pytest.approx(100)
+    assert model.eta_seconds == pytest.approx(1)
+    assert model.total_weight == 100 * ROW_WEIGHT + 1000
+
+    model.complete("small")
+    assert model.fraction == 1.0
+    assert model.describe().endswith("ETA 0:00")
+
+
+def test_format_duration():
+    assert format_duration(42) == "0:42"
+    assert format_duration(3725) == "1:02:05"
+
+
+def test_engine_reports_the_work_of_the_stores_to_write(tmp_path):
+    store_names = ["PP IT Leccio Outlet 25", "Shanghai Outlet", "FRANCO VAGO"]
+    reported = []
+    process_all_stores(store_names, make_allocation_frame(), tmp_path, work_callback=reported.append)
+
+    assert reported == [{
+        "PP IT Leccio Outlet 25": StoreWork(rows=4, units=7),
+        "Shanghai Outlet": StoreWork(rows=2, units=6)
+    }]
+
+    # Unchanged stores are skipped before the work is reported
+    reported.clear()
+    process_all_stores(store_names, make_allocation_frame(), tmp_path, incremental=True)
+    process_all_stores(store_names, make_allocation_frame(), tmp_path, incremental=True,
+                       work_callback=reported.append)
+    assert reported == [{}]
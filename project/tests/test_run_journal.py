@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for atomic output writes and resuming interrupted runs.
+"""
+
+import pytest
+
+from src.core.processors import allocation_engine, store_processor
+from src.core.processors.allocation_engine import (
+    process_all_stores,
+    STATUS_WRITTEN,
+    STATUS_EMPTY,
+    STATUS_FAILED,
+    STATUS_RESUMED,
+    STATUS_CANCELLED
+)
+from src.core.utils.atomic_files import atomic_write_path, get_partial_path, remove_partial_files
+from src.core.utils.run_manifest import load_manifest
+from src.core.utils.run_journal import JOURNAL_FILENAME, RunJournal, load_interrupted_run
+from tests.helpers import make_allocation_frame, read_outputs, assert_same_outputs
+
+STORE_NAMES = ["PP IT Leccio Outlet 25", "Shanghai Outlet", "FRANCO VAGO"]
+
+
+def fail_store_writes(monkeypatch, store_prefix):
+    """Make the label writes of one store fail, as when a run dies mid-way."""
+    write_label_file = store_processor.write_label_file
+
+    def failing_write(output_path, content):
+        if output_path.name.startswith(store_prefix):
+            raise OSError("disk full")
+        write_label_file(output_path, content)
+
+    monkeypatch.setattr(store_processor, "write_label_file", failing_write)
+
+
+def block_label_file(output_dir, store_name, season):
+    """Make a label file of a store unwritable by putting a directory in its place."""
+    path = output_dir / store_processor.get_txt_filename(store_processor.get_valid_filename(store_name), season)
+    path.mkdir(parents=True)
+    return path
+
+
+def test_failed_label_write_fails_the_store(tmp_path):
+    """A label file that cannot be written fails the store and leaves it out of the journal."""
+    df = make_allocation_frame()
+    block_label_file(tmp_path, "Shanghai Outlet", "W24")
+
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, journal=True)
+    assert statuses["Shanghai Outlet"] == STATUS_FAILED
+    assert statuses["PP IT Leccio Outlet 25"] == STATUS_WRITTEN
+    assert list(load_interrupted_run(tmp_path / JOURNAL_FILENAME)) == ["PP IT Leccio Outlet 25"]
+
+
+@pytest.mark.parametrize("workers, writer_threads", [(2, 0), (1, 2)])
+def test_failed_label_write_is_not_journaled_by_parallel_writers(tmp_path, workers, writer_threads):
+    """The process pool and the writer threads fail the store too, and keep it out of the manifest."""
+    df = make_allocation_frame()
+    blocked_path = block_label_file(tmp_path, "Shanghai Outlet", "W24")
+
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, workers=workers, writer_threads=writer_threads,
+                                  incremental=True, journal=True)
+    assert statuses["Shanghai Outlet"] == STATUS_FAILED
+    assert list(load_interrupted_run(tmp_path / JOURNAL_FILENAME)) == ["PP IT Leccio Outlet 25"]
+    assert "Shanghai Outlet" not in load_manifest(tmp_path)
+
+    # Resuming writes the store once its label file can be written
+    blocked_path.rmdir()
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, journal=True, resume=True)
+    assert statuses["Shanghai Outlet"] == STATUS_WRITTEN
+
+
+def test_store_with_missing_files_is_not_journaled(tmp_path, monkeypatch):
+    """A store reported written is only journaled once all of its files exist."""
+    monkeypatch.setattr(allocation_engine, "write_store_outputs", lambda *task: True)
+
+    statuses = process_all_stores(STORE_NAMES, make_allocation_frame(), tmp_path, journal=True)
+    assert statuses["Shanghai Outlet"] == STATUS_FAILED
+    assert list(load_interrupted_run(tmp_path / JOURNAL_FILENAME)) == []
+
+
+def test_failed_write_keeps_the_previous_file(tmp_path):
+    path = tmp_path / "Store-S25.txt"
+    path.write_text("previous\n")
+
+    with pytest.raises(OSError):
+        with atomic_write_path(path) as partial_path:
+            partial_path.write_text("half")
+            raise OSError("disk full")
+
+    assert path.read_text() == "previous\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["Store-S25.txt"]
+
+    with atomic_write_path(path) as partial_path:
+        partial_path.write_text("complete\n")
+    assert path.read_text() == "complete\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["Store-S25.txt"]
+
+
+def test_partial_files_are_removed(tmp_path):
+    get_partial_path(tmp_path / "Store-S25.xlsx").write_bytes(b"half")
+    (tmp_path / "Store-S25.txt").write_text("kept\n")
+
+    assert remove_partial_files(tmp_path) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["Store-S25.txt"]
+
+
+def test_resume_skips_the_stores_the_interrupted_run_completed(tmp_path, monkeypatch):
+    df = make_allocation_frame()
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    process_all_stores(STORE_NAMES, df, expected_dir)
+
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    with monkeypatch.context() as patch:
+        fail_store_writes(patch, "Shanghai")
+        statuses = process_all_stores(STORE_NAMES, df, output_dir, writer_threads=2, journal=True)
+    assert statuses["Shanghai Outlet"] == STATUS_FAILED
+
+    statuses = process_all_stores(STORE_NAMES, df, output_dir, journal=True, resume=True)
+    assert statuses == {
+        "PP IT Leccio Outlet 25": STATUS_RESUMED,
+        "Shanghai Outlet": STATUS_WRITTEN,
+        "FRANCO VAGO": STATUS_EMPTY
+    }
+    outputs = read_outputs(output_dir)
+    outputs.pop(JOURNAL_FILENAME, None)
+    assert_same_outputs(read_outputs(expected_dir), outputs)
+
+    # The resumed run finished, so the next resume processes every store again
+    statuses = process_all_stores(STORE_NAMES, df, output_dir, journal=True, resume=True)
+    assert STATUS_RESUMED not in statuses.values()
+
+
+def test_resume_rewrites_stores_whose_data_changed(tmp_path):
+    df = make_allocation_frame()
+    with RunJournal(tmp_path) as journal:
+        journal.record("Shanghai Outlet", "stale fingerprint", [])
+
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, journal=True, resume=True)
+    assert statuses["Shanghai Outlet"] == STATUS_WRITTEN
+
+
+def test_truncated_last_journal_line_is_ignored(tmp_path):
+    with RunJournal(tmp_path) as journal:
+        journal.record("Shanghai Outlet", "abc", ["Shanghai Outlet.txt"])
+    journal_path = tmp_path / JOURNAL_FILENAME
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"store": "FRANCO')
+
+    assert list(load_interrupted_run(journal_path)) == ["Shanghai Outlet"]
+
+    with RunJournal(tmp_path, resume=True) as journal:
+        journal.finish()
+    assert load_interrupted_run(journal_path) is None
+
+
+def test_cancelled_run_can_be_resumed(tmp_path):
+    """A cancelled run stops before the next store and stays resumable."""
+    df = make_allocation_frame()
+    written = []
+
+    def store_done(store_name, processed_count, total_stores):
+        written.append(store_name)
+
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, progress_callback=store_done, journal=True,
+                                  cancel_check=lambda: "PP IT Leccio Outlet 25" in written)
+    assert statuses == {
+        "PP IT Leccio Outlet 25": STATUS_WRITTEN,
+        "Shanghai Outlet": STATUS_CANCELLED,
+        "FRANCO VAGO": STATUS_EMPTY
+    }
+    assert not list(tmp_path.glob("Shanghai*"))
+
+    statuses = process_all_stores(STORE_NAMES, df, tmp_path, journal=True, resume=True)
+    assert statuses["PP IT Leccio Outlet 25"] == STATUS_RESUMED
+    assert statuses["Shanghai Outlet"] == STATUS_WRITTEN
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the persistent parsed-sheet cache.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.core.processors.file_processor import FileProcessor
+from src.core.utils.file_utils import load_xlsx_file
+from src.core.utils.sheet_cache import SheetCache
+from tests.helpers import ALLOCATION_WORKBOOK
+
+
+def test_cached_frame_round_trips(tmp_path):
+    """Mixed object, string and numeric columns come back with the same values and dtypes."""
+    df = pd.DataFrame({
+        "EANCode": [4064124917336, 4064124917428, 4064124917435],
+        "SEASON": pd.Series(["FW24", np.nan, "SS25"], dtype="str"),
+        "Store": pd.Series([2, " ", None], dtype=object),
+        1: pd.Series([1.5, True, "x "], dtype=object),
+        "QTY": [1.0, np.nan, 3.0]
+    })
+    cache = SheetCache(tmp_path)
+
+    assert cache.put("key", df)
+    pd.testing.assert_frame_equal(cache.get("key"), df)
+    assert cache.get("other") is None
+
+
+def test_file_processor_hits_cache_on_second_load(tmp_path):
+    """The second load comes from the cache and matches the parsed sheet."""
+    file_processor = FileProcessor(cache_dir=tmp_path)
+    store_names = ["Shanghai Outlet", "PP RU Novaya Riga Outlet 25"]
+
+    first = file_processor.load_xlsx_file(ALLOCATION_WORKBOOK, "PRE ALLOCATION", store_names)
+    assert file_processor.last_cache_status == "miss"
+    second = file_processor.load_xlsx_file(ALLOCATION_WORKBOOK, "PRE ALLOCATION", store_names)
+    assert file_processor.last_cache_status == "hit"
+
+    expected = load_xlsx_file(ALLOCATION_WORKBOOK, "PRE ALLOCATION", store_names)
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+
+    # Loading every column also hits the cache
+    full = file_processor.load_xlsx_file(ALLOCATION_WORKBOOK, "PRE ALLOCATION")
+    assert file_processor.last_cache_status == "hit"
+    pd.testing.assert_frame_equal(full, load_xlsx_file(ALLOCATION_WORKBOOK, "PRE ALLOCATION"))
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    """Entries are removed oldest use first once the size limit is exceeded."""
+    df = pd.DataFrame({"EANCode": np.arange(1000, dtype=np.int64)})
+    cache = SheetCache(tmp_path, max_bytes=10**9)
+    for key in ("a", "b", "c"):
+        cache.put(key, df)
+    for age, key in enumerate(("b", "a", "c")):
+        os.utime(tmp_path / f"{key}.npz", (1000 + age, 1000 + age))
+
+    entry_size = (tmp_path / "a.npz").stat().st_size
+    cache.max_bytes = 2 * entry_size
+    removed = cache.evict()
+
+    assert [path.stem for path in removed] == ["b"]
+    assert sorted(path.stem for path in tmp_path.glob("*.npz")) == ["a", "c"]
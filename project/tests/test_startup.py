@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Startup tests: importing app.py must not load the processing modules.
+
+The wall-clock budget of the import depends on the machine, so it is only
+checked when EXCEL_PROCESSOR_STARTUP_BUDGET_MS is set, for example:
+
+    EXCEL_PROCESSOR_STARTUP_BUDGET_MS=600 python -m pytest tests/test_startup.py
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from src.ui.startup import ImportTime, ProcessingLoader, WARMUP_MODULES, parse_importtime, warm_up_imports
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must only load after the window is shown
+DEFERRED_MODULES = ("pandas", "numpy", "openpyxl", "PIL", "src.core.processors.file_processor",
+                    "src.ui.processing_worker")
+
+# Opt-in budget of the cumulative import time of app.py, Qt included (about
+# 250 ms when measured; the heavy modules add more than a second on a cold start)
+STARTUP_BUDGET_MS = os.environ.get("EXCEL_PROCESSOR_STARTUP_BUDGET_MS")
+
+
+def test_parse_importtime():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |   _io",
+        "import time:      2300 |       2420 | app",
+        "some other stderr line",
+    ])
+    assert parse_importtime(output) == {"_io": ImportTime(120, 120), "app": ImportTime(2300, 2420)}
+
+
+def import_app() -> dict:
+    """Import app.py in a fresh interpreter and return the import time of every module."""
+    environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=PROJECT_ROOT,
+                            env=environment, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return parse_importtime(result.stderr)
+
+
+def test_app_import_defers_heavy_modules():
+    times = import_app()
+
+    assert "src.ui.main_window" in times
+    assert [module for module in DEFERRED_MODULES if module in times] == []
+
+
+@pytest.mark.skipif(STARTUP_BUDGET_MS is None, reason="set EXCEL_PROCESSOR_STARTUP_BUDGET_MS to check the budget")
+def test_app_import_fits_the_startup_budget():
+    times = import_app()
+
+    assert times["app"].cumulative_us / 1000 < float(STARTUP_BUDGET_MS)
+
+
+def test_warm_up_imports_the_processing_modules():
+    warm_up_imports(WARMUP_MODULES + ("module_that_does_not_exist",))
+    assert all(module in sys.modules for module in WARMUP_MODULES)
+
+
+def test_processing_loader_loads_off_the_ui_thread():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import QCoreApplication, QThreadPool
+    from PySide6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    factory_threads, delivered = [], []
+    pool = QThreadPool()
+    loader = ProcessingLoader(lambda: factory_threads.append(threading.current_thread()), pool=pool)
+    loader.loaded.connect(delivered.append)
+
+    # The first request waits for the load task, later ones are delivered right away
+    loader.load("first")
+    assert delivered == [] and not loader.ready
+    assert pool.waitForDone(30000), "timed out"
+    QCoreApplication.processEvents()
+    loader.load("second")
+
+    assert delivered == ["first", "second"]
+    assert loader.ready
+    assert len(factory_threads) == 1 and factory_threads[0] is not threading.main_thread()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for resolving store names to workbook columns.
+"""
+
+import pytest
+
+from src.core.utils.store_index import StoreColumnIndex
+
+COLUMNS = [
+    "sku + size", "EANCode", "SEASON", "QTY",
+    "PP IT Leccio Outlet 25", "PP US Las Vegas Outlet 25", "Shanghai Outlet",
+    " PP RU Novaya Riga Outlet 25", "FLUSC001", "PP ES La Roca Outlet 25", "PP ES Las Rozas Outlet 25"
+]
+
+
+@pytest.mark.parametrize(
+    "store_name, expected",
+    [
+        ("Shanghai Outlet", "Shanghai Outlet"),
+        ("PP RU Novaya Riga Outlet 25", " PP RU Novaya Riga Outlet 25"),
+        ("pp it  leccio outlet 25 ", "PP IT Leccio Outlet 25"),
+        ("PP IT Leccio", "PP IT Leccio Outlet 25"),
+        ("Shanghai", "Shanghai Outlet"),
+        ("Las Vegas", "PP US Las Vegas Outlet 25"),
+        ("FL", "FLUSC001"),
+        ("Unknown Outlet", None),
+    ]
+)
+def test_resolve_store(store_name, expected):
+    """Stores resolve by exact, normalized, suffix-free, whole-word and substring matches."""
+    assert StoreColumnIndex(COLUMNS).resolve(store_name) == expected
+
+
+def test_resolve_all_reports_ambiguous_and_unmatched_stores():
+    """Stores matching several columns are reported and left unresolved."""
+    resolution = StoreColumnIndex(COLUMNS).resolve_all(["PP ES", "Shanghai Outlet", "FL", "Milan"])
+
+    assert resolution.columns == {
+        "PP ES": None,
+        "Shanghai Outlet": "Shanghai Outlet",
+        "FL": "FLUSC001",
+        "Milan": None
+    }
+    assert resolution.ambiguous == {"PP ES": ["PP ES La Roca Outlet 25", "PP ES Las Rozas Outlet 25"]}
+    assert resolution.unmatched == ["Milan"]
+
+
+def test_substring_matching_several_columns_is_ambiguous():
+    """A substring of several columns is reported as ambiguous."""
+    resolution = StoreColumnIndex(COLUMNS + ["FLUSC002"]).resolve_all(["FL"])
+
+    assert resolution.columns == {"FL": None}
+    assert resolution.ambiguous == {"FL": ["FLUSC001", "FLUSC002"]}
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the streaming engine.
+"""
+
+import pandas as pd
+import pytest
+
+from src.core.processors.allocation_engine import process_all_stores, STATUS_WRITTEN, STATUS_EMPTY, STATUS_NOT_FOUND
+from src.core.processors.streaming_engine import ColumnSpool, process_workbook_streaming
+from src.core.utils.file_utils import load_xlsx_file
+from src.core.utils.xlsx_reader import XlsxSheetReader, UnsupportedWorkbookError
+from tests.helpers import make_allocation_frame, write_allocation_workbook, read_outputs, assert_same_outputs
+
+STORE_NAMES = ["PP IT Leccio Outlet 25", "Shanghai Outlet", "FRANCO VAGO", "Unknown Outlet"]
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    path = tmp_path / "allocation.xlsx"
+    write_allocation_workbook(path)
+    return path
+
+
+def test_iter_frames_matches_read_frame(workbook_path):
+    """The chunks hold the rows of the whole sheet, indexed by sheet row position."""
+    with XlsxSheetReader(workbook_path) as reader:
+        chunks = list(reader.iter_frames("PRE ALLOCATION", 4))
+        expected = reader.read_frame("PRE ALLOCATION")
+
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 4, 1000])
+def test_streaming_matches_engine(tmp_path, workbook_path, chunk_rows):
+    """Streaming in chunks writes the same files as processing the loaded sheet."""
+    expected_dir = tmp_path / "expected"
+    expected_dir.mkdir()
+    process_all_stores(STORE_NAMES, load_xlsx_file(workbook_path), expected_dir)
+
+    actual_dir = tmp_path / "actual"
+    actual_dir.mkdir()
+    statuses = process_workbook_streaming(workbook_path, STORE_NAMES, actual_dir, chunk_rows=chunk_rows)
+
+    assert statuses == {
+        "PP IT Leccio Outlet 25": STATUS_WRITTEN,
+        "Shanghai Outlet": STATUS_WRITTEN,
+        "FRANCO VAGO": STATUS_EMPTY,
+        "Unknown Outlet": STATUS_NOT_FOUND
+    }
+    assert_same_outputs(read_outputs(expected_dir), read_outputs(actual_dir))
+
+
+def test_column_spool_partitions_rows_by_season(tmp_path):
+    """Rows are spooled per season, blank seasons included, and read back in sheet order."""
+    store_col = "PP IT Leccio Outlet 25"
+    df = make_allocation_frame()[["EANCode", "SEASON", store_col]].dropna(subset=[store_col])
+    spool = ColumnSpool(store_col, "EANCode", "SEASON", tmp_path / "spool")
+    for start in range(0, len(df), 2):
+        spool.append(df.iloc[start:start + 2])
+
+    assert list(spool.spool_paths) == ["S25 07", "W24", None, "S23"]
+    assert list(spool.seasons) == ["S25 07", "W24", "S23"]
+    assert [row[0] for row in spool.iter_rows()] == df["EANCode"].tolist()
+    assert [row[0] for row in spool.iter_season_rows("W24")] == df.loc[df["SEASON"] == "W24", "EANCode"].tolist()
+
+
+def test_unsupported_workbook_leaves_output_untouched(tmp_path):
+    """A workbook that cannot be streamed raises without leaving staged files behind."""
+    not_xlsx = tmp_path / "allocation.xlsx"
+    not_xlsx.write_text("not a workbook")
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    with pytest.raises(UnsupportedWorkbookError):
+        process_workbook_streaming(not_xlsx, STORE_NAMES, output_dir)
+    assert list(output_dir.iterdir()) == []
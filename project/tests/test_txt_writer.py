@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the TXT label writer against the reference files in resources/templates/test.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.core.processors.store_processor import create_txt_file_with_repeated_eancodes
+
+TEST_TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "resources" / "templates" / "test"
+
+
+@pytest.mark.parametrize(
+    "workbook_path",
+    sorted(TEST_TEMPLATES_DIR.glob("*.xlsx")),
+    ids=lambda path: path.stem
+)
+def test_txt_matches_reference_file(workbook_path, tmp_path):
+    """The writer reproduces every reference TXT file byte for byte."""
+    df = pd.read_excel(workbook_path, sheet_name="test")
+    ean_col, _, store_col = df.columns
+    output_path = tmp_path / f"{workbook_path.stem}-test.txt"
+
+    assert create_txt_file_with_repeated_eancodes(df, ean_col, store_col, output_path)
+
+    reference_path = TEST_TEMPLATES_DIR / f"{workbook_path.stem}-test.txt"
+    assert output_path.read_bytes() == reference_path.read_bytes()
+
+
+def test_txt_handles_blank_and_invalid_quantities(tmp_path):
+    """Blank, missing, invalid and negative quantities produce no lines."""
+    df = pd.DataFrame({
+        "EANCode": [4064124917336.0, 4064124917428.0, 4064124917435.0, 4064124917466.0, 4064124917473.0],
+        "Store": [2, " ", None, "abc", -1]
+    }, dtype=object)
+    output_path = tmp_path / "store.txt"
+
+    assert create_txt_file_with_repeated_eancodes(df, "EANCode", "Store", output_path)
+    assert output_path.read_text() == "4064124917336\n4064124917336\n"
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the throttled log and progress delivery of the GUI.
+"""
+
+import os
+import time
+
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication, QPlainTextEdit
+
+from src.ui.ui_updates import LogSink, MessageRing, RateLimiter
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_ring_keeps_the_newest_messages():
+    ring = MessageRing(capacity=3)
+    ring.extend(f"line {i}" for i in range(5))
+
+    assert ring.drain() == ["... 2 log lines skipped ...", "line 2", "line 3", "line 4"]
+    assert ring.drain() == []
+
+
+def test_sink_writes_batches_and_caps_the_lines(app):
+    widget = QPlainTextEdit()
+    sink = LogSink(widget, capacity=100, max_lines=50)
+    for i in range(80):
+        sink.append(f"line {i}")
+    assert widget.toPlainText() == ""
+
+    sink.flush()
+    lines = widget.toPlainText().splitlines()
+    assert len(lines) == 50
+    assert lines[-1] == "line 79"
+
+    sink.clear()
+    sink.flush()
+    assert widget.toPlainText() == ""
+
+
+def test_rate_limiter_allows_one_update_per_interval():
+    limiter = RateLimiter(interval=0.05)
+    assert limiter.ready()
+    assert not limiter.ready()
+    time.sleep(0.06)
+    assert limiter.ready()
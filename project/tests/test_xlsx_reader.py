@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the fast XML reader backend against pd.read_excel.
+"""
+
+import io
+import weakref
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.core.utils.file_utils import get_allocation_columns, load_xlsx_file
+from src.core.utils.xlsx_reader import (
+    MAIN_NS,
+    UnsupportedWorkbookError,
+    XlsxSheetReader,
+    read_sheet_pandas,
+    read_sheet_xml,
+    resolve_sheet_name
+)
+from tests.helpers import ALLOCATION_WORKBOOK, TEMPLATES_DIR
+
+
+@pytest.mark.parametrize(
+    "workbook_path, sheet_name",
+    [(ALLOCATION_WORKBOOK, "PRE ALLOCATION")] + [
+        (path, "test") for path in sorted((TEMPLATES_DIR / "test").glob("*.xlsx"))[:5]
+    ],
+    ids=lambda value: value.stem if isinstance(value, Path) else value
+)
+def test_xml_reader_matches_read_excel(workbook_path, sheet_name):
+    """The XML reader produces the same values and dtypes as pd.read_excel."""
+    expected = pd.read_excel(workbook_path, sheet_name=sheet_name)
+    pd.testing.assert_frame_equal(read_sheet_xml(workbook_path, sheet_name), expected)
+
+
+def test_parsed_rows_are_released():
+    """Every row is complete when processed and dropped from the parsed tree afterwards."""
+    rows_xml = "".join(f'<row r="{i}"><c r="A{i}"><v>{i}</v></c><c r="B{i}"><v>1</v></c></row>'
+                       for i in range(1, 1001))
+    source = io.BytesIO(f'<worksheet xmlns="{MAIN_NS}"><sheetData>{rows_xml}</sheetData></worksheet>'.encode())
+
+    parsed = []
+    for element in XlsxSheetReader._iter_row_elements(source):
+        assert len(element) == 2
+        parsed.append(weakref.ref(element))
+        # Only the current row is still alive while the sheet is parsed
+        assert sum(ref() is not None for ref in parsed) == 1
+
+    assert len(parsed) == 1000
+
+
+def test_xml_reader_loads_only_selected_columns():
+    """With store names, only the EANCode, SEASON and store columns are loaded."""
+    store_names = ["Shanghai Outlet", "PP RU Novaya Riga Outlet 25"]
+    df = read_sheet_xml(
+        ALLOCATION_WORKBOOK, "PRE ALLOCATION",
+        lambda header: get_allocation_columns(header, store_names)
+    )
+
+    assert list(df.columns) == ["EANCode", "SEASON", "Shanghai Outlet", " PP RU Novaya Riga Outlet 25"]
+    expected = pd.read_excel(ALLOCATION_WORKBOOK, sheet_name="PRE ALLOCATION")
+    pd.testing.assert_frame_equal(df, expected[df.columns])
+
+
+def test_unsupported_sheet_falls_back_to_read_excel():
+    """Sheets the XML reader does not support are loaded with pd.read_excel."""
+    with pytest.raises(UnsupportedWorkbookError):
+        read_sheet_xml(ALLOCATION_WORKBOOK, "Sheet1")
+
+    expected = pd.read_excel(ALLOCATION_WORKBOOK, sheet_name="Sheet1")
+    pd.testing.assert_frame_equal(load_xlsx_file(ALLOCATION_WORKBOOK, "Sheet1"), expected)
+
+
+@pytest.mark.parametrize(
+    "sheet_name, expected",
+    [
+        ("PRE ALLOCATION", "PRE ALLOCATION"),
+        ("PRE ALLOCATION", "PRE_ALLOCATION"),
+        ("pre allocation", "Pre Allocation"),
+        ("PRE ALLOCATION", "Sheet1"),
+    ]
+)
+def test_resolve_sheet_name(sheet_name, expected):
+    """Sheets resolve by exact name, underscore variant, case or to the first sheet."""
+    sheet_names = [expected] if expected == "Sheet1" else ["Sheet1", expected]
+    assert resolve_sheet_name(sheet_name, sheet_names) == expected
+
+
+@pytest.mark.parametrize("reader", [read_sheet_xml, read_sheet_pandas], ids=["xml", "pandas"])
+def test_readers_resolve_sheet_variants(reader):
+    """Both backends load the same sheet for its underscore and lower-case variants."""
+    expected = pd.read_excel(ALLOCATION_WORKBOOK, sheet_name="PRE ALLOCATION")
+    pd.testing.assert_frame_equal(reader(ALLOCATION_WORKBOOK, "PRE_ALLOCATION"), expected)
+    pd.testing.assert_frame_equal(reader(ALLOCATION_WORKBOOK, "pre allocation"), expected)